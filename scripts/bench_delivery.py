@@ -0,0 +1,150 @@
+"""Benchmark automation webhook delivery against a local stub HTTP server.
+
+Compares the previous serial path (one ``requests.post`` per delivery, new
+connection every time) with the pooled delivery engine, and reports
+throughput and p50/p99 latency from enqueue to completion.
+
+    PYTHONPATH=src python scripts/bench_delivery.py --deliveries 2000 --latency-ms 20
+"""
+
+import argparse
+import os
+import statistics
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import requests
+
+os.environ.setdefault("AUTOMATION_RATE_LIMIT_PER_MINUTE", "100000000")
+os.environ.setdefault("AUTOMATION_DESTINATION_SECRET_BENCH", "bench-secret")
+
+from services.automation import audit as automation_audit  # noqa: E402
+from services.automation import publisher  # noqa: E402
+from services.automation.delivery import DeliveryEngine, HostSessionPool  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency_seconds = 0.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class NullDB:
+    def add(self, item):
+        pass
+
+    def commit(self):
+        pass
+
+
+class NullAuditWriter:
+    def record(self, user_id, action, conversation_id=None):
+        pass
+
+
+class UnpooledPost:
+    def post(self, url, **kwargs):
+        return requests.post(url, **kwargs)
+
+
+def build_items(count: int, destinations: int, url: str):
+    now = datetime.now(timezone.utc)
+    items = []
+    for index in range(count):
+        destination = SimpleNamespace(
+            id=f"dest-{index % destinations}",
+            url=f"{url}/hooks/{index % destinations}",
+            secret_env_key="AUTOMATION_DESTINATION_SECRET_BENCH",
+            secret_encrypted=None,
+        )
+        event = SimpleNamespace(
+            id=f"event-{index}",
+            user_id="tenant-bench",
+            type="message.ingested",
+            payload={"message_id": str(index), "body": "hello"},
+            occurred_at=now,
+        )
+        delivery = SimpleNamespace(attempts=0, last_error=None, next_retry_at=None, status="pending")
+        items.append((delivery, destination, event))
+    return items
+
+
+def report(name: str, latencies: list[float], elapsed: float, items) -> None:
+    latencies.sort()
+    sent = sum(1 for delivery, _, _ in items if delivery.status == "sent")
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{name:>8}: {len(items) / elapsed:8.1f} deliveries/s  "
+        f"p50={statistics.median(latencies) * 1000:7.1f}ms  p99={p99 * 1000:7.1f}ms  sent={sent}/{len(items)}"
+    )
+
+
+def run_serial(items) -> None:
+    publisher.http_sessions = UnpooledPost()
+    latencies = []
+    started = time.perf_counter()
+    for delivery, destination, event in items:
+        publisher.send_delivery(NullDB(), delivery, destination, event)
+        latencies.append(time.perf_counter() - started)
+    report("serial", latencies, time.perf_counter() - started, items)
+
+
+def run_engine(items, workers: int, per_destination: int) -> None:
+    publisher.http_sessions = HostSessionPool(pool_maxsize=workers)
+    engine = DeliveryEngine(max_workers=workers)
+    latencies = []
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    def deliver(delivery, destination, event):
+        publisher.send_delivery(NullDB(), delivery, destination, event)
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    for index, (delivery, destination, event) in enumerate(items):
+        engine.submit(destination.id, index, lambda item=(delivery, destination, event): deliver(*item), per_destination)
+    engine.wait()
+    report("engine", latencies, time.perf_counter() - started, items)
+    engine.stop()
+    publisher.http_sessions.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deliveries", type=int, default=1000)
+    parser.add_argument("--destinations", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--per-destination", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="Artificial stub response delay")
+    args = parser.parse_args()
+
+    StubHandler.latency_seconds = args.latency_ms / 1000
+    automation_audit.audit_writer = NullAuditWriter()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        run_serial(build_items(args.deliveries, args.destinations, url))
+        run_engine(build_items(args.deliveries, args.destinations, url), args.workers, args.per_destination)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Measure matching one event against a tenant's builder automations.
+
+Compares the previous per-event work (``AutomationFlow.model_validate`` on every
+``flow_json`` followed by two condition passes) with the compiled flows served
+by ``FlowRegistry``. The database is left out: with the registry warm, the
+per-event automation query is gone as well.
+
+    PYTHONPATH=src python scripts/bench_flow_registry.py --automations 200 --events 200
+"""
+
+import argparse
+import random
+import time
+import uuid
+
+from services.automation_builder import (
+    AutomationFlow,
+    check_conditions,
+    compile_flow,
+    evaluate_conditions,
+    evaluate_conditions_detailed,
+    event_facts,
+)
+
+WORDS = ["pix", "boleto", "desconto", "entrega", "urgente", "preço", "cancelar", "troca", "garantia", "frete"]
+
+
+def flow_json(rng: random.Random) -> dict:
+    return {
+        "trigger": {"type": "message.ingested"},
+        "conditions": [
+            {"type": "contains_text", "text": rng.choice(WORDS).upper()},
+            {"type": "urgency_is", "value": rng.choice(["low", "medium", "high"])},
+            {"type": "lead_score_gte", "value": rng.random()},
+        ],
+        "actions": [{"type": "create_task", "title": "Retornar", "priority": "high"}],
+    }
+
+
+def uncached(flows: list[dict], payload: dict) -> int:
+    matched = 0
+    for data in flows:
+        flow = AutomationFlow.model_validate(data)
+        evaluate_conditions_detailed(flow.conditions, payload)
+        matched += evaluate_conditions(flow.conditions, payload)
+    return matched
+
+
+def compiled(flows: list, payload: dict) -> int:
+    facts = event_facts(payload)
+    return sum(check_conditions(flow.conditions, facts)[0] for flow in flows)
+
+
+def per_event_microseconds(fn, flows, payloads) -> float:
+    started = time.perf_counter()
+    for payload in payloads:
+        fn(flows, payload)
+    return (time.perf_counter() - started) / len(payloads) * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--automations", type=int, default=200)
+    parser.add_argument("--events", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    raw = [flow_json(rng) for _ in range(args.automations)]
+    flows = [compile_flow(uuid.uuid4(), None, data) for data in raw]
+    payloads = [
+        {
+            "body": " ".join(rng.choices(WORDS, k=12)) + " Olá, tudo bem?",
+            "urgency": rng.choice(["low", "medium", "high"]),
+            "lead_score": rng.random(),
+        }
+        for _ in range(args.events)
+    ]
+    assert [uncached(raw, p) for p in payloads] == [compiled(flows, p) for p in payloads]
+
+    before = per_event_microseconds(uncached, raw, payloads)
+    after = per_event_microseconds(compiled, flows, payloads)
+    print(f"validate + evaluate twice per event: {before:10.1f} us")
+    print(f"compiled flows per event:            {after:10.1f} us")
+    print(f"speedup:                             {before / after:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compare keyword matching strategies for one tenant.
+
+The previous path called ``evaluate_rule`` for every active rule (lowercasing
+the message once per keyword) and checked each ``contains_text`` condition on
+its own. The new path scans the lowercased message once with the tenant's
+Aho-Corasick automaton.
+
+    PYTHONPATH=src python scripts/bench_keyword_matcher.py --rules 300 --automations 200
+"""
+
+import argparse
+import random
+import string
+import time
+import uuid
+from types import SimpleNamespace
+
+from services.automation.keyword_matcher import build_keywords
+from services.automation.rules_engine import evaluate_rule
+from services.automation_builder import compile_flow
+
+
+def word(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+
+
+def per_message_microseconds(fn, messages) -> float:
+    started = time.perf_counter()
+    for message in messages:
+        fn(message)
+    return (time.perf_counter() - started) / len(messages) * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=300)
+    parser.add_argument("--automations", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--length", type=int, default=280, help="characters per message")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    vocabulary = [word(rng) for _ in range(2000)]
+    rules = [
+        SimpleNamespace(id=uuid.uuid4(), compiled_json={"keywords": rng.sample(vocabulary, 3)}) for _ in range(args.rules)
+    ]
+    flows = [
+        compile_flow(
+            uuid.uuid4(),
+            None,
+            {
+                "trigger": {"type": "message.ingested"},
+                "conditions": [{"type": "contains_text", "text": rng.choice(vocabulary).upper()}],
+                "actions": [{"type": "create_task", "title": "Retornar"}],
+            },
+        )
+        for _ in range(args.automations)
+    ]
+    messages = []
+    for _ in range(args.messages):
+        text = ""
+        while len(text) < args.length:
+            text += rng.choice(vocabulary).capitalize() + " "
+        messages.append(text[: args.length])
+
+    keywords = build_keywords(rules, flows)
+
+    def loop(message: str) -> tuple[set, set]:
+        rule_ids = {rule.id for rule in rules if evaluate_rule(rule.compiled_json, message)}
+        automation_ids = {
+            flow.automation_id
+            for flow in flows
+            if any(condition.spec["text"].lower() in message.lower() for condition in flow.conditions)
+        }
+        return rule_ids, automation_ids
+
+    def automaton(message: str) -> tuple[set, set]:
+        hits = keywords.scan(message)
+        return hits.rule_ids, hits.automation_ids
+
+    assert all(loop(m) == automaton(m) for m in messages)
+
+    before = per_message_microseconds(loop, messages)
+    after = per_message_microseconds(automaton, messages)
+    print(f"needles:                  {len(keywords.indexed):10d}")
+    print(f"per-rule/condition loop:  {before:10.1f} us")
+    print(f"single automaton scan:    {after:10.1f} us")
+    print(f"speedup:                  {before / after:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
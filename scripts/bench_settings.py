@@ -0,0 +1,35 @@
+"""Measure the per-call cost of ``get_settings()``.
+
+Compares building ``Settings()`` on every call (the previous behaviour, which
+re-reads the environment and ``.env``) with the cached process-wide instance.
+
+    PYTHONPATH=src python scripts/bench_settings.py --calls 20000
+"""
+
+import argparse
+import time
+
+from core.config import Settings, get_settings
+
+
+def per_call_microseconds(fn, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    uncached = per_call_microseconds(Settings, args.calls)
+    cached = per_call_microseconds(get_settings, args.calls)
+    print(f"Settings() per call:     {uncached:10.2f} us")
+    print(f"get_settings() per call: {cached:10.2f} us")
+    print(f"speedup:                 {uncached / cached:10.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 import uuid
-from datetime import datetime, timezone
 
 from core.security import get_password_hash
 from db.session import SessionLocal
 from db.models import User, Channel, Contact, ContactSettings, Conversation, Message
+from services.inbox import record_last_message
+import services.timeline  # noqa: F401  (registers the flush hook that writes timeline entries)
 
 
 def main():
@@ -36,14 +37,16 @@ def main():
         db.refresh(convo)
 
         msg = Message(
+            id=uuid.uuid4(),
             conversation_id=convo.id,
+            user_id=user.id,
             direction="inbound",
             body="Hi, can we discuss pricing and timeline?",
             raw_payload={"seed": True},
             ai_classification={"sentiment": "neutral", "urgency": "normal"},
         )
         db.add(msg)
-        convo.last_message_at = datetime.now(timezone.utc)
+        record_last_message(convo, msg)
         convo.unread_count = 1
         db.commit()
         print("Seeded demo user with inbox")
@@ -1,36 +1,93 @@
+import uuid
+from dataclasses import dataclass
 from datetime import timedelta
-from typing import Annotated
+from typing import Annotated, Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
 
+from core.cache import LRUCache
 from core.config import get_settings
 from core.security import TokenError, create_token, decode_token, verify_password
 from db.models import User
 from db.session import get_db
 
 security_scheme = HTTPBearer()
+_UNDECODED = object()
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Snapshot of the authenticated user; routes only need these columns."""
+
+    id: uuid.UUID
+    name: str
+    email: str
+    role: str
+
+
+user_cache = LRUCache(get_settings().auth_user_cache_size, get_settings().auth_user_cache_ttl_seconds)
+
+
+def request_user_id(request: Request, token: Optional[str]) -> Optional[str]:
+    """Decode the access token once per request; later callers reuse ``request.state``."""
+    cached = getattr(request.state, "user_id", _UNDECODED)
+    if cached is not _UNDECODED:
+        return cached
+    user_id = None
+    if token:
+        try:
+            user_id = decode_token(token, expected_type="access")
+        except TokenError:
+            user_id = None
+    request.state.user_id = user_id
+    return user_id
 
 
 def get_current_user(
+    request: Request,
     credentials: Annotated[HTTPAuthorizationCredentials, Depends(security_scheme)],
     db: Session = Depends(get_db),
-) -> User:
-    token = credentials.credentials
-    try:
-        user_id = decode_token(token, expected_type="access")
-    except TokenError:
+) -> CurrentUser:
+    user_id = request_user_id(request, credentials.credentials)
+    if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    row = db.query(User.id, User.name, User.email, User.role).filter(User.id == user_uuid).first()
+    if not row:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    user = CurrentUser(id=row.id, name=row.name, email=row.email, role=row.role)
+    # Both limits are read on every set, so a settings reload applies to the next cached user.
+    settings = get_settings()
+    user_cache.maxsize = settings.auth_user_cache_size
+    user_cache.ttl_seconds = settings.auth_user_cache_ttl_seconds
+    user_cache.set(user_id, user)
     return user
 
 
+@event.listens_for(User, "after_update")
+def _forget_changed_user(mapper, connection, target: User) -> None:
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ("name", "email", "role", "password_hash")):
+        user_cache.pop(str(target.id))
+
+
+@event.listens_for(User, "after_delete")
+def _forget_deleted_user(mapper, connection, target: User) -> None:
+    user_cache.pop(str(target.id))
+
+
 def require_roles(*roles: str):
-    def dependency(current_user: User = Depends(get_current_user)) -> User:
+    def dependency(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
         if current_user.role not in roles:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient role")
         return current_user
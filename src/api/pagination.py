@@ -0,0 +1,80 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Select, tuple_
+
+
+def encode_cursor(at: Optional[datetime], row_id: uuid.UUID) -> str:
+    payload = {"at": at.isoformat() if at else None, "id": str(row_id)}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def encode_rank_cursor(rank: float, row_id: uuid.UUID) -> str:
+    payload = {"rank": rank, "id": str(row_id)}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, uuid.UUID]:
+    payload = _decode(cursor)
+    try:
+        return float(payload["rank"]), uuid.UUID(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _decode(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return payload
+
+
+def decode_cursor(cursor: str) -> tuple[Optional[datetime], uuid.UUID]:
+    """Return the ``(timestamp, id)`` keyset position encoded by :func:`encode_cursor`."""
+    payload = _decode(cursor)
+    try:
+        at = datetime.fromisoformat(payload["at"]) if payload["at"] else None
+        return at, uuid.UUID(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def keyset_window(statement: Select, at_column, id_column, before: Optional[str], after: Optional[str], limit: int) -> Select:
+    """Bound ``statement`` to the ``limit + 1`` rows next to a ``before`` or ``after`` cursor.
+
+    ``after`` reads forward, oldest first; otherwise rows are read backwards from
+    ``before``, or from the newest row, and :func:`window_rows` puts them back in order.
+    """
+    position = tuple_(at_column, id_column)
+    if after:
+        statement = statement.where(position > tuple_(*decode_cursor(after)))
+        return statement.order_by(at_column.asc(), id_column.asc()).limit(limit + 1)
+    if before:
+        statement = statement.where(position < tuple_(*decode_cursor(before)))
+    return statement.order_by(at_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def window_rows(rows: list, limit: int, after: Optional[str], response: Response) -> list:
+    """Trim a :func:`keyset_window` result to one page, oldest first, and link its neighbours.
+
+    ``X-Before-Cursor`` is set when older rows exist. ``X-After-Cursor`` points past
+    the newest row on the page and doubles as the cursor to poll for new ones.
+    """
+    has_more = len(rows) > limit
+    rows = list(rows[:limit])
+    if not after:
+        rows.reverse()
+    if rows:
+        # Paging forward from a cursor always leaves older rows behind it.
+        if after or has_more:
+            response.headers["X-Before-Cursor"] = encode_cursor(rows[0].created_at, rows[0].id)
+        response.headers["X-After-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows
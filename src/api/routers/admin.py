@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends
+
+from api.deps import CurrentUser, require_roles
+from core.config import reload_settings
+from core.logging import get_logger
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+logger = get_logger(__name__)
+
+
+@router.post("/settings/reload")
+def reload_settings_endpoint(current_user: CurrentUser = Depends(require_roles("admin"))):
+    settings = reload_settings()
+    logger.info("Settings reloaded", extra={"user_id": str(current_user.id), "environment": settings.environment})
+    return {"status": "reloaded"}
@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, Request
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from api.deps import get_current_user
-from db.models import AIEvent, Conversation, Flow, User
+from api.deps import CurrentUser, get_current_user
+from db.models import AIEvent, Conversation, Flow
 from db.session import get_db
 from services.ai import AIProvider, get_ai_provider
 
@@ -43,7 +43,7 @@ class VoiceTTSRequest(BaseModel):
 @router.post("/classify-message")
 def classify_message(
     payload: MessageBody,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
     ai_provider: AIProvider = Depends(get_configured_ai_provider),
 ):
@@ -64,7 +64,7 @@ def classify_message(
 @router.post("/suggest-reply")
 def suggest_reply(
     payload: MessageBody,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     ai_provider: AIProvider = Depends(get_configured_ai_provider),
 ):
     return ai_provider.suggest_reply(payload.message)
@@ -73,7 +73,7 @@ def suggest_reply(
 @router.post("/suggest-price")
 def suggest_price(
     payload: MessageBody,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     ai_provider: AIProvider = Depends(get_configured_ai_provider),
 ):
     return ai_provider.suggest_price(payload.message)
@@ -82,7 +82,7 @@ def suggest_price(
 @router.post("/suggest-followup")
 def suggest_followup(
     payload: MessageBody,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     ai_provider: AIProvider = Depends(get_configured_ai_provider),
 ):
     return ai_provider.suggest_followup(payload.message)
@@ -92,7 +92,7 @@ def suggest_followup(
 @router_ia.post("/summary/{conversation_id}", response_model=SummaryResponse)
 def summarize_conversation(
     conversation_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
     ai_provider: AIProvider = Depends(get_configured_ai_provider),
 ):
@@ -121,7 +121,7 @@ def summarize_conversation(
 @router_ia.post("/flow/create")
 def create_flow(
     payload: FlowCreateRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
     ai_provider: AIProvider = Depends(get_configured_ai_provider),
 ):
@@ -151,7 +151,7 @@ def create_flow(
 @router_ia.post("/voice/transcribe")
 def voice_transcribe(
     payload: VoiceTranscribeRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
     ai_provider: AIProvider = Depends(get_configured_ai_provider),
 ):
@@ -172,7 +172,7 @@ def voice_transcribe(
 @router_ia.post("/voice/tts")
 def voice_tts(
     payload: VoiceTTSRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
     ai_provider: AIProvider = Depends(get_configured_ai_provider),
 ):
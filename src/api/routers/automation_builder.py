@@ -1,13 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from api.deps import get_current_user
-from db.models import AutomationBuilderAutomation, User
+from api.deps import CurrentUser, get_current_user
+from db.models import AutomationBuilderAutomation
 from db.session import get_db
+from services.automation.keyword_matcher import keyword_index
 from services.automation_builder import (
     AutomationBuilderCreate,
     AutomationBuilderPatch,
     AutomationBuilderTestRunInput,
+    flow_registry,
     get_builder_catalog,
     run_automation,
 )
@@ -16,13 +18,13 @@ router = APIRouter(prefix="/automation-builder/automations", tags=["automation-b
 
 
 @router.get("/catalog", response_model=dict)
-def get_catalog(current_user: User = Depends(get_current_user)):
+def get_catalog(current_user: CurrentUser = Depends(get_current_user)):
     _ = current_user
     return get_builder_catalog()
 
 
 @router.get("", response_model=list[dict])
-def list_automations(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def list_automations(current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     automations = (
         db.query(AutomationBuilderAutomation)
         .filter(AutomationBuilderAutomation.user_id == current_user.id)
@@ -46,7 +48,7 @@ def list_automations(current_user: User = Depends(get_current_user), db: Session
 @router.post("", response_model=dict)
 def create_automation(
     payload: AutomationBuilderCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     automation = AutomationBuilderAutomation(
@@ -58,6 +60,8 @@ def create_automation(
     )
     db.add(automation)
     db.commit()
+    flow_registry.invalidate(current_user.id)
+    keyword_index.invalidate(current_user.id)
     db.refresh(automation)
     return {
         "id": str(automation.id),
@@ -69,7 +73,7 @@ def create_automation(
 
 
 @router.get("/{automation_id}", response_model=dict)
-def get_automation(automation_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_automation(automation_id: str, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     automation = (
         db.query(AutomationBuilderAutomation)
         .filter(AutomationBuilderAutomation.id == automation_id, AutomationBuilderAutomation.user_id == current_user.id)
@@ -92,7 +96,7 @@ def get_automation(automation_id: str, current_user: User = Depends(get_current_
 def patch_automation(
     automation_id: str,
     payload: AutomationBuilderPatch,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     automation = (
@@ -113,6 +117,8 @@ def patch_automation(
         automation.trigger_type = payload.flow_json.trigger.type
 
     db.commit()
+    flow_registry.invalidate(current_user.id)
+    keyword_index.invalidate(current_user.id)
     db.refresh(automation)
     return {
         "id": str(automation.id),
@@ -124,7 +130,7 @@ def patch_automation(
 
 
 @router.delete("/{automation_id}")
-def delete_automation(automation_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def delete_automation(automation_id: str, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     automation = (
         db.query(AutomationBuilderAutomation)
         .filter(AutomationBuilderAutomation.id == automation_id, AutomationBuilderAutomation.user_id == current_user.id)
@@ -134,6 +140,8 @@ def delete_automation(automation_id: str, current_user: User = Depends(get_curre
         raise HTTPException(status_code=404, detail="Automation not found")
     db.delete(automation)
     db.commit()
+    flow_registry.invalidate(current_user.id)
+    keyword_index.invalidate(current_user.id)
     return {"status": "ok"}
 
 
@@ -141,7 +149,7 @@ def delete_automation(automation_id: str, current_user: User = Depends(get_curre
 def test_run_automation(
     automation_id: str,
     payload: AutomationBuilderTestRunInput,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     automation = (
@@ -8,12 +8,13 @@ from pydantic import BaseModel, Field
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from api.deps import get_current_user, require_roles
+from api.deps import CurrentUser, get_current_user, require_roles
 from core.config import get_settings
-from db.models import AutomationCallbackEvent, AutomationDestination, User
+from db.models import AutomationCallbackEvent, AutomationDestination
 from db.session import get_db
 from services.automation.audit import record_automation_audit
 from services.automation.callbacks import execute_action, record_callback_event, validate_callback_request
+from services.automation.circuit_breaker import circuit_state
 from services.automation.signing import (
     build_env_key,
     build_signature_base_string,
@@ -34,6 +35,10 @@ class DestinationCreate(BaseModel):
     secret_env_key: Optional[str] = None
     enabled: bool = True
     event_types: list[str] = Field(default_factory=list)
+    max_concurrency: Optional[int] = Field(None, ge=1, le=64)
+    batch_enabled: bool = False
+    batch_max_size: int = Field(100, ge=1, le=1000)
+    batch_linger_seconds: float = Field(2, ge=0, le=300)
 
 
 class DestinationUpdate(BaseModel):
@@ -43,6 +48,10 @@ class DestinationUpdate(BaseModel):
     secret_env_key: Optional[str] = None
     enabled: Optional[bool] = None
     event_types: Optional[list[str]] = None
+    max_concurrency: Optional[int] = Field(None, ge=1, le=64)
+    batch_enabled: Optional[bool] = None
+    batch_max_size: Optional[int] = Field(None, ge=1, le=1000)
+    batch_linger_seconds: Optional[float] = Field(None, ge=0, le=300)
 
 
 class DestinationResponse(BaseModel):
@@ -53,6 +62,13 @@ class DestinationResponse(BaseModel):
     secret_env_key: str
     enabled: bool
     event_types: list[str]
+    max_concurrency: Optional[int] = None
+    batch_enabled: bool = False
+    batch_max_size: int = 100
+    batch_linger_seconds: float = 2
+    circuit_state: str = "closed"
+    circuit_failures: int = 0
+    circuit_open_until: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
@@ -85,6 +101,27 @@ class DebugSignResponse(BaseModel):
     signature_expected: str
 
 
+def serialize_destination(destination: AutomationDestination) -> DestinationResponse:
+    return DestinationResponse(
+        id=str(destination.id),
+        name=destination.name,
+        url=destination.url,
+        secret_masked=destination.secret_masked,
+        secret_env_key=destination.secret_env_key,
+        enabled=destination.enabled,
+        event_types=destination.event_types,
+        max_concurrency=destination.max_concurrency,
+        batch_enabled=destination.batch_enabled,
+        batch_max_size=destination.batch_max_size,
+        batch_linger_seconds=destination.batch_linger_seconds,
+        circuit_state=circuit_state(destination),
+        circuit_failures=destination.circuit_failures or 0,
+        circuit_open_until=destination.circuit_open_until,
+        created_at=destination.created_at,
+        updated_at=destination.updated_at,
+    )
+
+
 def serialize_callback_body(body: dict) -> str:
     return json.dumps(body, separators=(",", ":"), sort_keys=True)
 
@@ -92,7 +129,7 @@ def serialize_callback_body(body: dict) -> str:
 @router.post("/destinations", response_model=DestinationResponse)
 def create_destination(
     payload: DestinationCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     destination_id = uuid.uuid4()
@@ -111,27 +148,21 @@ def create_destination(
         secret_encrypted=encrypt_secret(secret_value),
         enabled=payload.enabled,
         event_types=payload.event_types,
+        max_concurrency=payload.max_concurrency,
+        batch_enabled=payload.batch_enabled,
+        batch_max_size=payload.batch_max_size,
+        batch_linger_seconds=payload.batch_linger_seconds,
         updated_at=datetime.now(timezone.utc),
     )
     db.add(destination)
     db.commit()
     db.refresh(destination)
-    return DestinationResponse(
-        id=str(destination.id),
-        name=destination.name,
-        url=destination.url,
-        secret_masked=destination.secret_masked,
-        secret_env_key=destination.secret_env_key,
-        enabled=destination.enabled,
-        event_types=destination.event_types,
-        created_at=destination.created_at,
-        updated_at=destination.updated_at,
-    )
+    return serialize_destination(destination)
 
 
 @router.get("/destinations", response_model=list[DestinationResponse])
 def list_destinations(
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     items = (
@@ -140,27 +171,14 @@ def list_destinations(
         .order_by(AutomationDestination.created_at.desc())
         .all()
     )
-    return [
-        DestinationResponse(
-            id=str(item.id),
-            name=item.name,
-            url=item.url,
-            secret_masked=item.secret_masked,
-            secret_env_key=item.secret_env_key,
-            enabled=item.enabled,
-            event_types=item.event_types,
-            created_at=item.created_at,
-            updated_at=item.updated_at,
-        )
-        for item in items
-    ]
+    return [serialize_destination(item) for item in items]
 
 
 @router.patch("/destinations/{destination_id}", response_model=DestinationResponse)
 def update_destination(
     destination_id: str,
     payload: DestinationUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     destination = (
@@ -184,23 +202,13 @@ def update_destination(
     destination.updated_at = datetime.now(timezone.utc)
     db.commit()
     db.refresh(destination)
-    return DestinationResponse(
-        id=str(destination.id),
-        name=destination.name,
-        url=destination.url,
-        secret_masked=destination.secret_masked,
-        secret_env_key=destination.secret_env_key,
-        enabled=destination.enabled,
-        event_types=destination.event_types,
-        created_at=destination.created_at,
-        updated_at=destination.updated_at,
-    )
+    return serialize_destination(destination)
 
 
 @router.delete("/destinations/{destination_id}")
 def delete_destination(
     destination_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     destination = (
@@ -299,7 +307,7 @@ async def automation_callback(request: Request, db: Session = Depends(get_db)):
 @router.post("/debug/sign", response_model=DebugSignResponse)
 def debug_sign_callback(
     payload: DebugSignRequest,
-    current_user: User = Depends(require_roles("admin")),
+    current_user: CurrentUser = Depends(require_roles("admin")),
     db: Session = Depends(get_db),
 ):
     settings = get_settings()
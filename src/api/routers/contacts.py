@@ -1,13 +1,18 @@
 import hashlib
 import json
+import uuid
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from pydantic import BaseModel
+from sqlalchemy import Select, select, tuple_
 from sqlalchemy.orm import Session
 
-from api.deps import get_current_user
-from db.models import Contact, ContactSettings, User
+from api.deps import CurrentUser, get_current_user
+from api.pagination import decode_cursor, decode_rank_cursor, encode_cursor, encode_rank_cursor
+from db.models import Contact, ContactSettings
 from db.session import get_db
+from services import contact_search
 from services.automation.publisher import publish_event
 
 router = APIRouter(prefix="/contacts", tags=["contacts"])
@@ -34,30 +39,82 @@ class ContactSettingsUpdate(BaseModel):
     preferred_tone: str | None = None
 
 
-@router.get("", response_model=list[dict])
-def list_contacts(q: str | None = None, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    query = db.query(Contact).filter(Contact.user_id == current_user.id)
+def build_contact_query(
+    user_id,
+    q: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    typeahead: bool = False,
+) -> Select:
+    """Contacts for one page, fetching ``limit + 1`` rows so the caller can tell if more follow.
+
+    Without ``q`` contacts are newest first, keyed on ``(created_at, id)``. With ``q``
+    they are ranked by :func:`services.contact_search.rank` and keyed on ``(rank, id)``.
+    """
+    columns = [Contact.id, Contact.name]
+    if not typeahead:
+        columns += [Contact.handle, Contact.avatar_url, Contact.tags]
+    statement = select(*columns).where(Contact.user_id == user_id)
+
     if q:
-        query = query.filter(Contact.name.ilike(f"%{q}%"))
-    contacts = query.order_by(Contact.created_at.desc()).all()
+        rank = contact_search.rank(q)
+        statement = statement.add_columns(rank.label("rank")).where(contact_search.match(q))
+        if cursor:
+            after_rank, after_id = decode_rank_cursor(cursor)
+            statement = statement.where(tuple_(rank, Contact.id) < tuple_(after_rank, after_id))
+        return statement.order_by(rank.desc(), Contact.id.desc()).limit(limit + 1)
+
+    statement = statement.add_columns(Contact.created_at)
+    if cursor:
+        after_at, after_id = decode_cursor(cursor)
+        statement = statement.where(tuple_(Contact.created_at, Contact.id) < tuple_(after_at, after_id))
+    return statement.order_by(Contact.created_at.desc(), Contact.id.desc()).limit(limit + 1)
+
+
+@router.get("", response_model=list[dict])
+def list_contacts(
+    response: Response,
+    q: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    typeahead: bool = Query(False),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Contacts matching ``q`` by name, handle or tag, best match first.
+
+    ``typeahead`` trims each result to ``id`` and ``name``. The ``X-Next-Cursor``
+    response header carries the cursor for the following page.
+    """
+    q = q.strip() if q and q.strip() else None
+    rows = db.execute(build_contact_query(current_user.id, q, cursor, limit, typeahead)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = (
+            encode_rank_cursor(float(last.rank), last.id) if q else encode_cursor(last.created_at, last.id)
+        )
+    if typeahead:
+        return [{"id": str(row.id), "name": row.name} for row in rows]
     return [
         {
-            "id": str(c.id),
-            "name": c.name,
-            "handle": c.handle,
-            "avatar_url": c.avatar_url,
-            "tags": c.tags,
+            "id": str(row.id),
+            "name": row.name,
+            "handle": row.handle,
+            "avatar_url": row.avatar_url,
+            "tags": row.tags,
         }
-        for c in contacts
+        for row in rows
     ]
 
 
 @router.post("", response_model=dict)
-def create_contact(payload: ContactCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def create_contact(payload: ContactCreate, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     existing = db.query(Contact).filter(Contact.user_id == current_user.id, Contact.handle == payload.handle).first()
     if existing:
         raise HTTPException(status_code=400, detail="Handle already exists")
     contact = Contact(
+        id=uuid.uuid4(),
         user_id=current_user.id,
         name=payload.name,
         handle=payload.handle,
@@ -65,10 +122,8 @@ def create_contact(payload: ContactCreate, current_user: User = Depends(get_curr
         tags=payload.tags,
     )
     db.add(contact)
-    db.commit()
-    db.refresh(contact)
     db.add(ContactSettings(contact_id=contact.id))
-    db.commit()
+    db.flush()
     publish_event(
         db,
         str(current_user.id),
@@ -76,18 +131,17 @@ def create_contact(payload: ContactCreate, current_user: User = Depends(get_curr
         {"contact_id": str(contact.id), "name": contact.name, "handle": contact.handle},
         source_event_id=str(contact.id),
     )
+    db.commit()
     return {"id": str(contact.id), "name": contact.name, "handle": contact.handle}
 
 
 @router.patch("/{contact_id}", response_model=dict)
-def update_contact(contact_id: str, payload: ContactUpdate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def update_contact(contact_id: str, payload: ContactUpdate, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     contact = db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == current_user.id).first()
     if not contact:
         raise HTTPException(status_code=404, detail="Contact not found")
     for field, value in payload.model_dump(exclude_unset=True).items():
         setattr(contact, field, value)
-    db.commit()
-    db.refresh(contact)
     changed_fields = payload.model_dump(exclude_unset=True)
     fields_fingerprint = hashlib.sha256(json.dumps(changed_fields, sort_keys=True).encode("utf-8")).hexdigest()
     publish_event(
@@ -97,11 +151,12 @@ def update_contact(contact_id: str, payload: ContactUpdate, current_user: User =
         {"contact_id": str(contact.id), "fields": changed_fields},
         source_event_id=f"{contact.id}:{fields_fingerprint}",
     )
+    db.commit()
     return {"id": str(contact.id), "name": contact.name, "handle": contact.handle}
 
 
 @router.patch("/{contact_id}/settings")
-def update_contact_settings(contact_id: str, payload: ContactSettingsUpdate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def update_contact_settings(contact_id: str, payload: ContactSettingsUpdate, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     contact = db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == current_user.id).first()
     if not contact:
         raise HTTPException(status_code=404, detail="Contact not found")
@@ -1,15 +1,18 @@
 from datetime import date, datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from pydantic import BaseModel
+from sqlalchemy import or_, select, tuple_
 from sqlalchemy.orm import Session
 
-from api.deps import get_current_user
-from db.models import Channel, Contact, ContactSettings, Conversation, LeadTask, Message, User
+from api.deps import CurrentUser, get_current_user
+from api.pagination import decode_cursor, encode_cursor, keyset_window, window_rows
+from db.models import Channel, Contact, ContactSettings, Conversation, LeadTask, Message, TimelineEntry
 from db.session import get_db
+from services import contact_search
 from services.automation.publisher import publish_event
-from services.timeline import build_conversation_timeline
+from services.timeline import timeline_items, timeline_query
 
 router = APIRouter(prefix="/conversations", tags=["conversations"])
 
@@ -21,6 +24,7 @@ class ConversationSummary(BaseModel):
     channel_type: str
     unread_count: int
     last_message: Optional[str]
+    last_message_direction: Optional[str] = None
     last_message_at: Optional[datetime]
     sentiment: Optional[str]
     urgency: Optional[str]
@@ -50,7 +54,8 @@ class LeadTaskPayload(BaseModel):
 
 @router.get("", response_model=list[ConversationSummary])
 def list_conversations(
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
     status: Optional[str] = None,
     channel: Optional[str] = None,
@@ -58,40 +63,83 @@ def list_conversations(
     unread_only: bool = Query(False),
     sentiment: Optional[str] = None,
     urgency: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
 ):
-    query = db.query(Conversation).join(Contact).join(Channel).filter(Conversation.user_id == current_user.id)
+    """Newest conversations first, one page per call.
+
+    Pages are keyed on ``(last_message_at, id)``; the ``X-Next-Cursor`` response
+    header carries the cursor for the following page and is absent on the last one.
+    """
+    query = (
+        db.query(
+            Conversation.id,
+            Conversation.unread_count,
+            Conversation.last_message_at,
+            Conversation.last_message_body,
+            Conversation.last_message_direction,
+            Conversation.last_sentiment,
+            Conversation.last_urgency,
+            Contact.name.label("contact_name"),
+            Contact.avatar_url.label("contact_avatar_url"),
+            Channel.type.label("channel_type"),
+        )
+        .join(Contact, Conversation.contact_id == Contact.id)
+        .join(Channel, Conversation.channel_id == Channel.id)
+        .filter(Conversation.user_id == current_user.id)
+    )
     if status:
         query = query.filter(Conversation.status == status)
     if channel:
         query = query.filter(Channel.type == channel)
     if q:
-        query = query.filter(Contact.name.ilike(f"%{q}%"))
+        query = query.filter(contact_search.match(q))
     if unread_only:
         query = query.filter(Conversation.unread_count > 0)
-
-    conversations = query.order_by(Conversation.last_message_at.desc().nullslast()).all()
-    summaries: list[ConversationSummary] = []
-    for convo in conversations:
-        last_msg = convo.messages[-1] if convo.messages else None
-        ai_cls = last_msg.ai_classification if last_msg else None
-        summaries.append(
-            ConversationSummary(
-                id=str(convo.id),
-                contact_name=convo.contact.name,
-                contact_avatar_url=convo.contact.avatar_url,
-                channel_type=convo.channel.type,
-                unread_count=convo.unread_count,
-                last_message=last_msg.body if last_msg else None,
-                last_message_at=convo.last_message_at,
-                sentiment=ai_cls.get("sentiment") if ai_cls else None,
-                urgency=ai_cls.get("urgency") if ai_cls else None,
+    if sentiment:
+        query = query.filter(Conversation.last_sentiment == sentiment)
+    if urgency:
+        query = query.filter(Conversation.last_urgency == urgency)
+    if cursor:
+        after_at, after_id = decode_cursor(cursor)
+        if after_at is None:
+            # Already into the conversations without messages, which sort last.
+            query = query.filter(Conversation.last_message_at.is_(None), Conversation.id < after_id)
+        else:
+            query = query.filter(
+                or_(
+                    tuple_(Conversation.last_message_at, Conversation.id) < tuple_(after_at, after_id),
+                    Conversation.last_message_at.is_(None),
+                )
             )
+
+    rows = (
+        query.order_by(Conversation.last_message_at.desc().nullslast(), Conversation.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].last_message_at, rows[-1].id)
+    return [
+        ConversationSummary(
+            id=str(row.id),
+            contact_name=row.contact_name,
+            contact_avatar_url=row.contact_avatar_url,
+            channel_type=row.channel_type,
+            unread_count=row.unread_count,
+            last_message=row.last_message_body,
+            last_message_direction=row.last_message_direction,
+            last_message_at=row.last_message_at,
+            sentiment=row.last_sentiment,
+            urgency=row.last_urgency,
         )
-    return summaries
+        for row in rows
+    ]
 
 
 @router.get("/{conversation_id}", response_model=ConversationDetail)
-def get_conversation(conversation_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_conversation(conversation_id: str, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     convo = (
         db.query(Conversation)
         .filter(Conversation.id == conversation_id, Conversation.user_id == current_user.id)
@@ -130,7 +178,7 @@ def get_conversation(conversation_id: str, current_user: User = Depends(get_curr
 def update_conversation(
     conversation_id: str,
     payload: ConversationPatch,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     convo = (
@@ -141,10 +189,6 @@ def update_conversation(
     if not convo:
         raise HTTPException(status_code=404, detail="Conversation not found")
     convo.status = payload.status
-    db.commit()
-    db.refresh(convo)
-    last_msg = convo.messages[-1] if convo.messages else None
-    ai_cls = last_msg.ai_classification if last_msg else None
     publish_event(
         db,
         str(current_user.id),
@@ -153,17 +197,18 @@ def update_conversation(
             "conversation_id": str(convo.id),
             "status": convo.status,
             "channel": convo.channel.type,
-            "urgency": ai_cls.get("urgency") if ai_cls else None,
-            "lead_score": ai_cls.get("affordability_score") if ai_cls else None,
+            "urgency": convo.last_urgency,
+            "lead_score": convo.last_score,
             "assigned_to": None,
         },
         source_event_id=f"{convo.id}:{convo.status}",
     )
+    db.commit()
     return get_conversation(conversation_id, current_user, db)
 
 
 @router.post("/{conversation_id}/mark-read")
-def mark_read(conversation_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def mark_read(conversation_id: str, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     convo = (
         db.query(Conversation)
         .filter(Conversation.id == conversation_id, Conversation.user_id == current_user.id)
@@ -176,30 +221,39 @@ def mark_read(conversation_id: str, current_user: User = Depends(get_current_use
     return {"status": "ok"}
 
 
-@router.post("/{conversation_id}/history")
+@router.api_route("/{conversation_id}/history", methods=["GET", "POST"])
 def conversation_history(
     conversation_id: str,
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    convo = (
-        db.query(Conversation)
-        .filter(Conversation.id == conversation_id, Conversation.user_id == current_user.id)
-        .first()
-    )
-    if not convo:
+    """One page of the materialized timeline, oldest first; without a cursor, the latest page.
+
+    Paged like the message history. POST is kept for older clients and no longer writes anything.
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    convo_id = db.execute(
+        select(Conversation.id).where(Conversation.id == conversation_id, Conversation.user_id == current_user.id)
+    ).scalar_one_or_none()
+    if convo_id is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    timeline = build_conversation_timeline(db, convo)
-    convo.timeline = {"items": timeline}
-    db.commit()
-    return {"conversation_id": str(convo.id), "timeline": timeline}
+    statement = keyset_window(
+        timeline_query(convo_id), TimelineEntry.created_at, TimelineEntry.id, before, after, limit
+    )
+    rows = window_rows(db.execute(statement).all(), limit, after, response)
+    return {"conversation_id": str(convo_id), "timeline": timeline_items(rows)}
 
 
 @router.post("/{conversation_id}/tasks")
 def manage_lead_tasks(
     conversation_id: str,
     payload: LeadTaskPayload | None = None,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     convo = (
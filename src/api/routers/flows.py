@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
-from api.deps import get_current_user
-from db.models import Flow, User
+from api.deps import CurrentUser, get_current_user
+from db.models import Flow
 from db.session import get_db
 from services.automation.rules_engine import simulate_flow, validate_flow_schema
 
@@ -31,7 +31,7 @@ class FlowSimulationRequest(BaseModel):
 
 
 @router.get("", response_model=list[dict])
-def list_flows(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def list_flows(current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     flows = db.query(Flow).filter(Flow.user_id == current_user.id).order_by(Flow.created_at.desc()).all()
     return [
         {
@@ -45,7 +45,7 @@ def list_flows(current_user: User = Depends(get_current_user), db: Session = Dep
 
 
 @router.post("", response_model=dict)
-def create_flow(payload: FlowCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def create_flow(payload: FlowCreate, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     flow = Flow(
         user_id=current_user.id,
         name=payload.name,
@@ -60,7 +60,7 @@ def create_flow(payload: FlowCreate, current_user: User = Depends(get_current_us
 
 
 @router.patch("/{flow_id}")
-def update_flow(flow_id: str, payload: FlowUpdate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def update_flow(flow_id: str, payload: FlowUpdate, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     flow = db.query(Flow).filter(Flow.id == flow_id, Flow.user_id == current_user.id).first()
     if not flow:
         raise HTTPException(status_code=404, detail="Flow not found")
@@ -71,7 +71,7 @@ def update_flow(flow_id: str, payload: FlowUpdate, current_user: User = Depends(
 
 
 @router.post("/{flow_id}/validate", response_model=dict)
-def validate_flow(flow_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def validate_flow(flow_id: str, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     flow = db.query(Flow).filter(Flow.id == flow_id, Flow.user_id == current_user.id).first()
     if not flow:
         raise HTTPException(status_code=404, detail="Flow not found")
@@ -80,7 +80,7 @@ def validate_flow(flow_id: str, current_user: User = Depends(get_current_user),
 
 
 @router.post("/{flow_id}/simulate", response_model=dict)
-def simulate(flow_id: str, payload: FlowSimulationRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def simulate(flow_id: str, payload: FlowSimulationRequest, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     flow = db.query(Flow).filter(Flow.id == flow_id, Flow.user_id == current_user.id).first()
     if not flow:
         raise HTTPException(status_code=404, detail="Flow not found")
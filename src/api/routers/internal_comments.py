@@ -2,8 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from api.deps import require_roles
-from db.models import Conversation, InternalComment, User
+from api.deps import CurrentUser, require_roles
+from db.models import Conversation, InternalComment
 from db.session import get_db
 
 router = APIRouter(prefix="/internal", tags=["internal"])
@@ -17,7 +17,7 @@ class InternalCommentCreate(BaseModel):
 def add_internal_comment(
     conversation_id: str,
     payload: InternalCommentCreate,
-    current_user: User = Depends(require_roles("agent", "manager", "admin")),
+    current_user: CurrentUser = Depends(require_roles("agent", "manager", "admin")),
     db: Session = Depends(get_db),
 ):
     convo = (
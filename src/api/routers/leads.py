@@ -3,13 +3,16 @@ from statistics import mean
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from api.deps import get_current_user
-from db.models import Contact, Conversation, User
+from api.deps import CurrentUser, get_current_user
+from db.models import Contact, Conversation
 from db.session import get_db
 from services.timeline import build_conversation_timeline
 
 router = APIRouter(prefix="/leads", tags=["leads"])
 
+# The lead view shows the tail of its latest conversation; older items come from /conversations/{id}/history.
+LEAD_HISTORY_LIMIT = 100
+
 
 SENTIMENT_SCORES = {
     "positive": 1.0,
@@ -23,7 +26,7 @@ SENTIMENT_SCORES = {
 @router.get("/{lead_id}/full")
 def lead_full(
     lead_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     contact = (
@@ -64,7 +67,7 @@ def lead_full(
                 sentiment_values.append(SENTIMENT_SCORES[sentiment])
 
     if conversations:
-        timeline = build_conversation_timeline(db, conversations[0])
+        timeline = build_conversation_timeline(db, conversations[0].id, limit=LEAD_HISTORY_LIMIT)
 
     settings = contact.settings
     ticket_values = [
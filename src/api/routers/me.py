@@ -2,8 +2,7 @@ from fastapi import APIRouter, Depends
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.orm import Session
 
-from api.deps import get_current_user
-from db.models import User
+from api.deps import CurrentUser, get_current_user
 
 router = APIRouter(tags=["me"])
 
@@ -15,5 +14,5 @@ class MeResponse(BaseModel):
 
 
 @router.get("/me", response_model=MeResponse)
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(current_user: CurrentUser = Depends(get_current_user)):
     return MeResponse(id=str(current_user.id), name=current_user.name, email=current_user.email)
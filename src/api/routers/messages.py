@@ -1,16 +1,20 @@
-from datetime import datetime, timezone
+import uuid
+from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from pydantic import BaseModel
+from sqlalchemy import Select, select
 from sqlalchemy.orm import Session
 
-from api.deps import get_current_user
-from db.models import AIEvent, Conversation, Message, User
+from api.deps import CurrentUser, get_current_user
+from api.pagination import keyset_window, window_rows
+from db.models import AIEvent, Conversation, Message
 from db.session import get_db
 from services.ai.mock_provider import MockAIProvider
 from services.automation.events import EventBus
 from services.automation.publisher import publish_event
+from services.inbox import record_last_message
 
 router = APIRouter(prefix="/conversations/{conversation_id}/messages", tags=["messages"])
 
@@ -26,24 +30,46 @@ class MessageOut(BaseModel):
     created_at: datetime
 
 
-@router.get("", response_model=list[MessageOut])
-def list_messages(conversation_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    convo = (
-        db.query(Conversation)
-        .filter(Conversation.id == conversation_id, Conversation.user_id == current_user.id)
-        .first()
+def build_message_page_query(
+    conversation_id,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = 50,
+) -> Select:
+    """``limit + 1`` messages next to a cursor, walking ``ix_messages_conversation``."""
+    statement = select(Message.id, Message.body, Message.direction, Message.created_at).where(
+        Message.conversation_id == conversation_id
     )
-    if not convo:
+    return keyset_window(statement, Message.created_at, Message.id, before, after, limit)
+
+
+@router.get("", response_model=list[MessageOut])
+def list_messages(
+    conversation_id: str,
+    response: Response,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """One page of messages, oldest first; without a cursor, the latest page.
+
+    Neighbouring pages are linked by the ``X-Before-Cursor`` and ``X-After-Cursor``
+    response headers (see :func:`api.pagination.window_rows`).
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    convo_id = db.execute(
+        select(Conversation.id).where(Conversation.id == conversation_id, Conversation.user_id == current_user.id)
+    ).scalar_one_or_none()
+    if convo_id is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    messages = (
-        db.query(Message)
-        .filter(Message.conversation_id == convo.id)
-        .order_by(Message.created_at.asc())
-        .all()
-    )
+
+    rows = window_rows(db.execute(build_message_page_query(convo_id, before, after, limit)).all(), limit, after, response)
     return [
-        MessageOut(id=str(m.id), body=m.body, direction=m.direction, created_at=m.created_at)
-        for m in messages
+        MessageOut(id=str(row.id), body=row.body, direction=row.direction, created_at=row.created_at)
+        for row in rows
     ]
 
 
@@ -51,7 +77,7 @@ def list_messages(conversation_id: str, current_user: User = Depends(get_current
 def create_message(
     conversation_id: str,
     payload: MessageCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     convo = (
@@ -63,16 +89,16 @@ def create_message(
         raise HTTPException(status_code=404, detail="Conversation not found")
 
     message = Message(
+        id=uuid.uuid4(),
         conversation_id=convo.id,
+        user_id=convo.user_id,
         direction="outbound",
         body=payload.body,
         raw_payload={"source": "api"},
     )
-    convo.last_message_at = datetime.now(timezone.utc)
+    record_last_message(convo, message)
     db.add(message)
     db.add(AIEvent(user_id=current_user.id, conversation_id=convo.id, event_type="message.sent", payload={"body": payload.body}))
-    db.commit()
-    db.refresh(message)
     publish_event(
         db,
         str(current_user.id),
@@ -80,4 +106,6 @@ def create_message(
         {"message_id": str(message.id), "conversation_id": str(convo.id), "body": message.body, "channel": str(convo.channel_id)},
         source_event_id=str(message.id),
     )
+    db.commit()
+    db.refresh(message)
     return MessageOut(id=str(message.id), body=message.body, direction=message.direction, created_at=message.created_at)
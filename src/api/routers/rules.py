@@ -2,10 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from api.deps import get_current_user
-from db.models import Rule, User
+from api.deps import CurrentUser, get_current_user
+from db.models import Rule
 from db.session import get_db
-from services.automation.rules_engine import compile_rule, evaluate_rule
+from services.automation.keyword_matcher import keyword_index
+from services.automation.rules_engine import compile_rule
 
 router = APIRouter(prefix="/rules", tags=["rules"])
 
@@ -22,7 +23,7 @@ class RuleUpdate(BaseModel):
 
 
 @router.get("", response_model=list[dict])
-def list_rules(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def list_rules(current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     rules = db.query(Rule).filter(Rule.user_id == current_user.id).order_by(Rule.created_at.desc()).all()
     return [
         {
@@ -36,40 +37,44 @@ def list_rules(current_user: User = Depends(get_current_user), db: Session = Dep
 
 
 @router.post("", response_model=dict)
-def create_rule(payload: RuleCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def create_rule(payload: RuleCreate, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     rule = Rule(user_id=current_user.id, natural_language=payload.natural_language, active=payload.active)
     db.add(rule)
     db.commit()
+    keyword_index.invalidate(current_user.id)
     db.refresh(rule)
     return {"id": str(rule.id), "natural_language": rule.natural_language}
 
 
 @router.post("/{rule_id}/compile", response_model=dict)
-def compile_rule_endpoint(rule_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def compile_rule_endpoint(rule_id: str, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     rule = db.query(Rule).filter(Rule.id == rule_id, Rule.user_id == current_user.id).first()
     if not rule:
         raise HTTPException(status_code=404, detail="Rule not found")
     rule.compiled_json = compile_rule(rule.natural_language)
     db.commit()
+    keyword_index.invalidate(current_user.id)
     return {"id": str(rule.id), "compiled_json": rule.compiled_json}
 
 
 @router.patch("/{rule_id}")
-def update_rule(rule_id: str, payload: RuleUpdate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def update_rule(rule_id: str, payload: RuleUpdate, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     rule = db.query(Rule).filter(Rule.id == rule_id, Rule.user_id == current_user.id).first()
     if not rule:
         raise HTTPException(status_code=404, detail="Rule not found")
     for field, value in payload.model_dump(exclude_unset=True).items():
         setattr(rule, field, value)
     db.commit()
+    keyword_index.invalidate(current_user.id)
     return {"status": "ok"}
 
 
 @router.delete("/{rule_id}")
-def delete_rule(rule_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def delete_rule(rule_id: str, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     rule = db.query(Rule).filter(Rule.id == rule_id, Rule.user_id == current_user.id).first()
     if not rule:
         raise HTTPException(status_code=404, detail="Rule not found")
     db.delete(rule)
     db.commit()
+    keyword_index.invalidate(current_user.id)
     return {"status": "deleted"}
@@ -1,14 +1,166 @@
 from datetime import datetime, timedelta, timezone
+from typing import Optional
 
 from fastapi import APIRouter, Depends, Query
+from sqlalchemy import Select, and_, case, desc, func, literal, or_, select, true
 from sqlalchemy.orm import Session
 
-from api.deps import get_current_user
-from db.models import Channel, Contact, Conversation, Message, User
+from api.deps import CurrentUser, get_current_user
+from db.models import Channel, Contact, Conversation, Message
 from db.session import get_db
 
 router = APIRouter(prefix="/search", tags=["search"])
 
+SEARCH_CONFIG = "simple"
+HEADLINE_OPTIONS = "MaxFragments=1,MaxWords=20,MinWords=5,StartSel=<mark>,StopSel=</mark>"
+# Totals above this are reported as capped; counting further would scan every match of a common term.
+SEARCH_COUNT_LIMIT = 1000
+
+
+def _search_filters(
+    user_id,
+    channel: Optional[str],
+    status: Optional[str],
+    urgency: Optional[str],
+    score_gt: Optional[float],
+    last_contact_days: Optional[int],
+) -> list:
+    filters = [Conversation.user_id == user_id]
+    if status:
+        filters.append(Conversation.status == status)
+    if channel:
+        filters.append(Channel.type == channel)
+    if urgency:
+        filters.append(Conversation.last_urgency == urgency)
+    if score_gt is not None:
+        filters.append(Conversation.last_score > score_gt)
+    if last_contact_days is not None:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=last_contact_days)
+        filters.append(Conversation.last_message_at >= cutoff)
+    return filters
+
+
+def _message_matches(user_id, ts_query):
+    # Messages carry their tenant so the (user_id, search_vector) GIN index only yields this tenant's hits.
+    return and_(Message.user_id == user_id, Message.search_vector.op("@@")(ts_query))
+
+
+def build_search_query(
+    user_id,
+    query: Optional[str] = None,
+    channel: Optional[str] = None,
+    status: Optional[str] = None,
+    urgency: Optional[str] = None,
+    score_gt: Optional[float] = None,
+    last_contact_days: Optional[int] = None,
+    page: int = 1,
+    page_size: int = 20,
+) -> Select:
+    """One statement that filters, ranks and pages matching conversations.
+
+    Message bodies and contact name/handle are matched through their GIN-indexed
+    ``search_vector`` columns; snippets are only highlighted for the returned page.
+    """
+    filters = _search_filters(user_id, channel, status, urgency, score_gt, last_contact_days)
+    columns = [
+        Conversation.id.label("conversation_id"),
+        Contact.id.label("contact_id"),
+        Contact.name.label("contact_name"),
+        Channel.type.label("channel"),
+        Conversation.status,
+        Conversation.last_message_body,
+        Conversation.last_message_at,
+        Conversation.last_urgency,
+        Conversation.last_score,
+    ]
+    ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, query) if query else None
+    if ts_query is None:
+        rank = literal(0.0)
+        matches = select(*columns, rank.label("rank"))
+    else:
+        message_hits = (
+            select(
+                Message.conversation_id,
+                func.max(func.ts_rank_cd(Message.search_vector, ts_query)).label("rank"),
+            )
+            .where(_message_matches(user_id, ts_query))
+            .group_by(Message.conversation_id)
+            .subquery("message_hits")
+        )
+        contact_matches = Contact.search_vector.op("@@")(ts_query)
+        # A contact hit outranks a message hit with the same text score.
+        contact_rank = case((contact_matches, func.ts_rank_cd(Contact.search_vector, ts_query) * 2), else_=0)
+        rank = func.greatest(func.coalesce(message_hits.c.rank, 0), contact_rank)
+        matches = (
+            select(*columns, rank.label("rank"))
+            .outerjoin(message_hits, message_hits.c.conversation_id == Conversation.id)
+        )
+        filters.append(or_(message_hits.c.conversation_id.isnot(None), contact_matches))
+
+    page_rows = (
+        matches.select_from(Conversation)
+        .join(Contact, Conversation.contact_id == Contact.id)
+        .join(Channel, Conversation.channel_id == Channel.id)
+        .where(and_(*filters))
+        .order_by(desc("rank"), Conversation.last_message_at.desc().nullslast(), Conversation.id.desc())
+        .limit(page_size)
+        .offset(max(page - 1, 0) * page_size)
+        .subquery("page_rows")
+    )
+    if ts_query is None:
+        return select(page_rows, literal(None).label("snippet")).order_by(
+            desc(page_rows.c.rank), page_rows.c.last_message_at.desc().nullslast(), page_rows.c.conversation_id.desc()
+        )
+
+    best_message = (
+        select(func.ts_headline(SEARCH_CONFIG, Message.body, ts_query, HEADLINE_OPTIONS).label("snippet"))
+        .where(Message.conversation_id == page_rows.c.conversation_id, Message.search_vector.op("@@")(ts_query))
+        .order_by(func.ts_rank_cd(Message.search_vector, ts_query).desc())
+        .limit(1)
+        .lateral("best_message")
+    )
+    return (
+        select(page_rows, best_message.c.snippet)
+        .outerjoin(best_message, true())
+        .order_by(
+            desc(page_rows.c.rank), page_rows.c.last_message_at.desc().nullslast(), page_rows.c.conversation_id.desc()
+        )
+    )
+
+
+def build_search_count(
+    user_id,
+    query: Optional[str] = None,
+    channel: Optional[str] = None,
+    status: Optional[str] = None,
+    urgency: Optional[str] = None,
+    score_gt: Optional[float] = None,
+    last_contact_days: Optional[int] = None,
+) -> Select:
+    """Count matching conversations, stopping one past ``SEARCH_COUNT_LIMIT``.
+
+    Matches are tested with ``EXISTS`` instead of ranked, so the scan ends as soon
+    as the cap is reached however common the searched terms are.
+    """
+    filters = _search_filters(user_id, channel, status, urgency, score_gt, last_contact_days)
+    if query:
+        ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+        message_hit = (
+            select(Message.id)
+            .where(Message.conversation_id == Conversation.id, _message_matches(user_id, ts_query))
+            .exists()
+        )
+        filters.append(or_(message_hit, Contact.search_vector.op("@@")(ts_query)))
+    capped = (
+        select(Conversation.id)
+        .join(Contact, Conversation.contact_id == Contact.id)
+        .join(Channel, Conversation.channel_id == Channel.id)
+        .where(and_(*filters))
+        .limit(SEARCH_COUNT_LIMIT + 1)
+        .subquery("capped")
+    )
+    return select(func.count()).select_from(capped)
+
 
 @router.get("")
 def global_search(
@@ -18,72 +170,44 @@ def global_search(
     urgency: str | None = None,
     score_gt: float | None = Query(None, alias="score_gt"),
     last_contact_days: int | None = None,
-    page: int = 1,
-    page_size: int = 20,
-    current_user: User = Depends(get_current_user),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    query_set = (
-        db.query(Conversation)
-        .join(Contact)
-        .join(Channel)
-        .outerjoin(Message)
-        .filter(Conversation.user_id == current_user.id)
-        .distinct()
-    )
-    if status:
-        query_set = query_set.filter(Conversation.status == status)
-    if channel:
-        query_set = query_set.filter(Channel.type == channel)
-    if query:
-        search = f"%{query}%"
-        query_set = query_set.filter(
-            (Contact.name.ilike(search))
-            | (Contact.handle.ilike(search))
-            | (Message.body.ilike(search))
-        )
-    if last_contact_days is not None:
-        cutoff = datetime.now(timezone.utc) - timedelta(days=last_contact_days)
-        query_set = query_set.filter(Conversation.last_message_at >= cutoff)
-
-    conversations = query_set.order_by(Conversation.last_message_at.desc().nullslast()).all()
-
-    results = []
-    for convo in conversations:
-        last_msg = convo.messages[-1] if convo.messages else None
-        ai_cls = last_msg.ai_classification if last_msg else None
-        urgency_value = ai_cls.get("urgency") if ai_cls else None
-        score_value = ai_cls.get("affordability_score") if ai_cls else None
-
-        if urgency and urgency_value != urgency:
-            continue
-        if score_gt is not None and (score_value is None or float(score_value) <= score_gt):
-            continue
-
-        results.append(
-            {
-                "conversation_id": str(convo.id),
-                "contact_id": str(convo.contact.id),
-                "contact_name": convo.contact.name,
-                "channel": convo.channel.type,
-                "status": convo.status,
-                "last_message": last_msg.body if last_msg else None,
-                "last_message_at": convo.last_message_at.isoformat() if convo.last_message_at else None,
-                "urgency": urgency_value,
-                "score": score_value,
-            }
-        )
-
-    total = len(results)
-    start = max(page - 1, 0) * page_size
-    end = start + page_size
-    paginated = results[start:end]
+    criteria = {
+        "query": query.strip() if query and query.strip() else None,
+        "channel": channel,
+        "status": status,
+        "urgency": urgency,
+        "score_gt": score_gt,
+        "last_contact_days": last_contact_days,
+    }
+    rows = db.execute(build_search_query(current_user.id, page=page, page_size=page_size, **criteria)).all()
+    total = db.execute(build_search_count(current_user.id, **criteria)).scalar_one()
 
+    results = [
+        {
+            "conversation_id": str(row.conversation_id),
+            "contact_id": str(row.contact_id),
+            "contact_name": row.contact_name,
+            "channel": row.channel,
+            "status": row.status,
+            "last_message": row.last_message_body,
+            "last_message_at": row.last_message_at.isoformat() if row.last_message_at else None,
+            "urgency": row.last_urgency,
+            "score": row.last_score,
+            "rank": float(row.rank),
+            "snippet": row.snippet,
+        }
+        for row in rows
+    ]
     return {
-        "results": paginated,
+        "results": results,
         "pagination": {
             "page": page,
             "page_size": page_size,
-            "total": total,
+            "total": min(total, SEARCH_COUNT_LIMIT),
+            "total_capped": total > SEARCH_COUNT_LIMIT,
         },
     }
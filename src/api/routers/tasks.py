@@ -1,10 +1,11 @@
+import uuid
 from datetime import date, timedelta
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from api.deps import get_current_user
-from db.models import Conversation, Task, User
+from api.deps import CurrentUser, get_current_user
+from db.models import Conversation, Task
 from db.session import get_db
 from services.automation.publisher import publish_event
 
@@ -28,7 +29,7 @@ class TaskUpdate(BaseModel):
 
 
 @router.get("", response_model=list[dict])
-def list_tasks(filter: str | None = None, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def list_tasks(filter: str | None = None, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     query = db.query(Task).filter(Task.user_id == current_user.id)
     today = date.today()
     if filter == "today":
@@ -49,8 +50,9 @@ def list_tasks(filter: str | None = None, current_user: User = Depends(get_curre
 
 
 @router.post("", response_model=dict)
-def create_task(payload: TaskCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def create_task(payload: TaskCreate, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     task = Task(
+        id=uuid.uuid4(),
         user_id=current_user.id,
         conversation_id=payload.conversation_id,
         title=payload.title,
@@ -59,8 +61,6 @@ def create_task(payload: TaskCreate, current_user: User = Depends(get_current_us
         priority=payload.priority,
     )
     db.add(task)
-    db.commit()
-    db.refresh(task)
     publish_event(
         db,
         str(current_user.id),
@@ -68,11 +68,12 @@ def create_task(payload: TaskCreate, current_user: User = Depends(get_current_us
         {"task_id": str(task.id), "title": task.title, "conversation_id": task.conversation_id},
         source_event_id=str(task.id),
     )
+    db.commit()
     return {"id": str(task.id), "title": task.title}
 
 
 @router.patch("/{task_id}", response_model=dict)
-def update_task(task_id: str, payload: TaskUpdate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def update_task(task_id: str, payload: TaskUpdate, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     task = db.query(Task).filter(Task.id == task_id, Task.user_id == current_user.id).first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
@@ -84,12 +85,11 @@ def update_task(task_id: str, payload: TaskUpdate, current_user: User = Depends(
 
 
 @router.post("/{task_id}/complete")
-def complete_task(task_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def complete_task(task_id: str, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     task = db.query(Task).filter(Task.id == task_id, Task.user_id == current_user.id).first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     task.status = "done"
-    db.commit()
     publish_event(
         db,
         str(current_user.id),
@@ -97,4 +97,5 @@ def complete_task(task_id: str, current_user: User = Depends(get_current_user),
         {"task_id": str(task.id), "title": task.title, "conversation_id": task.conversation_id},
         source_event_id=f"{task.id}:completed",
     )
+    db.commit()
     return {"status": "ok"}
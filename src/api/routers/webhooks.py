@@ -1,224 +1,325 @@
-from datetime import datetime, timedelta, timezone
-from typing import Callable, Dict
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from api.deps import get_current_user
-from db.models import AIEvent, Channel, Contact, ContactSettings, Conversation, Message, Notification, Rule, Task, User
+from api.deps import CurrentUser, get_current_user, require_roles
+from core.config import get_settings
+from core.logging import get_logger
+from db.models import Conversation, Message
 from db.session import get_db
-from services.ai import get_ai_provider
-from services.automation.publisher import publish_event
-from services.automation_builder import run_enabled_automations
-from services.automation.rules_engine import evaluate_rule
-from services.webhooks.normalizers import email, instagram, messenger, whatsapp
+from services.inbox import last_message_values
+from services.webhooks.dedupe import inbound_dedupe
+from services.webhooks.identity import (
+    forget_identities,
+    is_stale_identity_error,
+    remember_identities,
+    resolve_identities,
+)
+from services.webhooks.normalizers import NORMALIZERS
+from services.webhooks.pipeline import AUDIO_PLACEHOLDER, STAGES, IngestJob, PipelineFullError, ingestion_pipeline
 
 router = APIRouter(prefix="/webhooks", tags=["webhooks"])
-ai_provider = get_ai_provider()
-
-NORMALIZERS: Dict[str, Callable[[dict], dict]] = {
-    "whatsapp": whatsapp.normalize,
-    "instagram": instagram.normalize,
-    "messenger": messenger.normalize,
-    "email": email.normalize,
-}
-
-
-def get_or_create_channel(db: Session, user_id, channel_type: str) -> Channel:
-    channel = db.query(Channel).filter(Channel.user_id == user_id, Channel.type == channel_type).first()
-    if not channel:
-        channel = Channel(user_id=user_id, type=channel_type)
-        db.add(channel)
-        db.commit()
-        db.refresh(channel)
-    return channel
-
-
-def get_or_create_contact(db: Session, user_id, normalized: dict) -> tuple[Contact, bool]:
-    contact = db.query(Contact).filter(Contact.user_id == user_id, Contact.handle == normalized["handle"]).first()
-    if contact:
-        return contact, False
-    contact = Contact(
+logger = get_logger(__name__)
+
+MAX_BATCH_SIZE = 500
+
+
+def _channel_message_id(normalized: dict) -> str | None:
+    value = normalized.get("channel_message_id")
+    return str(value) if value not in (None, "") else None
+
+
+def _persist_message(
+    db: Session,
+    user_id,
+    conversation_id,
+    normalized: dict,
+    payload: dict,
+    contact_created: bool = False,
+    conversation_created: bool = False,
+) -> Message:
+    body = normalized.get("body") or ""
+    if not body and normalized.get("audio_base64"):
+        body = AUDIO_PLACEHOLDER
+    message = Message(
+        id=uuid.uuid4(),
+        conversation_id=conversation_id,
         user_id=user_id,
-        name=normalized.get("name") or normalized["handle"],
-        handle=normalized["handle"],
-        avatar_url=normalized.get("avatar_url"),
-        tags=[],
+        direction="inbound",
+        body=body,
+        raw_payload=payload,
+        channel_message_id=_channel_message_id(normalized),
+        pipeline_stage=STAGES[0],
+        pipeline_updated_at=datetime.now(timezone.utc),
+        pipeline_contact_created=contact_created,
+        pipeline_conversation_created=conversation_created,
     )
-    db.add(contact)
-    db.commit()
-    db.refresh(contact)
-    db.add(ContactSettings(contact_id=contact.id))
-    db.commit()
-    return contact, True
+    db.add(message)
+    return message
 
 
-def get_or_create_conversation(db: Session, user_id, contact_id, channel_id) -> tuple[Conversation, bool]:
-    convo = (
-        db.query(Conversation)
-        .filter(
-            Conversation.user_id == user_id,
-            Conversation.contact_id == contact_id,
-            Conversation.channel_id == channel_id,
+def _touch_conversations(db: Session, received: Counter, latest: dict, received_at: datetime) -> None:
+    # Increment in SQL so cached conversation ids never need the row loaded.
+    for conversation_id, count in received.items():
+        db.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(
+                unread_count=Conversation.unread_count + count,
+                last_message_at=received_at,
+                **last_message_values(latest[conversation_id]),
+            )
         )
-        .first()
+
+
+def _ensure_pipeline_capacity() -> None:
+    if get_settings().ingest_pipeline_enabled and ingestion_pipeline.is_saturated():
+        raise HTTPException(status_code=503, detail="Ingestion backlog is full, retry later")
+
+
+def _dispatch_jobs(db: Session, jobs: list[IngestJob]) -> bool:
+    if get_settings().ingest_pipeline_enabled:
+        for index, job in enumerate(jobs):
+            try:
+                ingestion_pipeline.submit(job)
+            except PipelineFullError:
+                # The messages are already committed, so a 503 would only get the redelivery
+                # answered as a duplicate; process what did not fit before responding instead.
+                logger.warning("Ingestion backlog full, processing inline", extra={"jobs": len(jobs) - index})
+                for late in jobs[index:]:
+                    ingestion_pipeline.run_inline(db, late)
+                return False
+        return True
+    for job in jobs:
+        ingestion_pipeline.run_inline(db, job)
+    return False
+
+
+@router.get("/pipeline")
+def pipeline_stats(current_user: CurrentUser = Depends(require_roles("manager", "admin"))):
+    _ = current_user
+    return {"enabled": get_settings().ingest_pipeline_enabled, "stages": ingestion_pipeline.stats()}
+
+
+def _persist_single(db: Session, user_id, channel_type: str, normalized: dict, payload: dict) -> tuple[Message, dict]:
+    received_at = datetime.now(timezone.utc)
+    identities = resolve_identities(db, user_id, channel_type, [normalized], opened_at=received_at)
+    identity = identities[normalized["handle"]]
+
+    message = _persist_message(
+        db,
+        user_id,
+        identity.conversation_id,
+        normalized,
+        payload,
+        identity.contact_created,
+        identity.conversation_created,
+    )
+    _touch_conversations(
+        db, Counter({identity.conversation_id: 1}), {identity.conversation_id: message}, received_at
     )
-    if convo:
-        return convo, False
-    convo = Conversation(user_id=user_id, contact_id=contact_id, channel_id=channel_id, status="open")
-    db.add(convo)
+    inbound_dedupe.record(db, user_id, channel_type, message.channel_message_id, message.id)
     db.commit()
-    db.refresh(convo)
-    return convo, True
+    return message, identities
 
 
 @router.post("/{channel_type}")
-def ingest_webhook(channel_type: str, payload: dict, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def ingest_webhook(
+    channel_type: str,
+    payload: dict,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
     if channel_type not in NORMALIZERS:
         raise HTTPException(status_code=400, detail="Unsupported channel")
     normalized = NORMALIZERS[channel_type](payload)
-    channel = get_or_create_channel(db, current_user.id, channel_type)
-    contact, contact_created = get_or_create_contact(db, current_user.id, normalized)
-    conversation, conversation_created = get_or_create_conversation(db, current_user.id, contact.id, channel.id)
-
-    if contact_created:
-        publish_event(
-            db,
-            str(current_user.id),
-            "contact.created",
-            {"contact_id": str(contact.id), "name": contact.name, "handle": contact.handle},
-            source_event_id=str(contact.id),
-        )
+    channel_message_id = _channel_message_id(normalized)
+    duplicate_of = inbound_dedupe.lookup(db, current_user.id, channel_type, channel_message_id)
+    if duplicate_of:
+        return {"status": "duplicate", "message_id": duplicate_of, "normalized": normalized}
 
-    body = normalized.get("body") or ""
-    audio_base64 = normalized.get("audio_base64")
-    if audio_base64:
-        transcription = ai_provider.transcribe_audio(audio_base64)
-        body = transcription.get("transcription") or body or "[áudio recebido]"
-        db.add(
-            AIEvent(
-                user_id=current_user.id,
-                conversation_id=conversation.id,
-                event_type="voice.transcribed",
-                payload=transcription,
-            )
-        )
+    _ensure_pipeline_capacity()
+    try:
+        message, identities = _persist_single(db, current_user.id, channel_type, normalized, payload)
+    except IntegrityError as exc:
+        db.rollback()
+        # A concurrent delivery of the same provider message committed first.
+        duplicate_of = inbound_dedupe.lookup(db, current_user.id, channel_type, channel_message_id)
+        if duplicate_of:
+            return {"status": "duplicate", "message_id": duplicate_of, "normalized": normalized}
+        if not is_stale_identity_error(exc):
+            raise
+        forget_identities(current_user.id)
+        message, identities = _persist_single(db, current_user.id, channel_type, normalized, payload)
+    identity = identities[normalized["handle"]]
+    inbound_dedupe.remember(current_user.id, channel_type, channel_message_id, message.id)
+    remember_identities(current_user.id, channel_type, identities)
 
-    message = Message(
-        conversation_id=conversation.id,
-        direction="inbound",
-        body=body,
-        raw_payload=payload,
-        channel_message_id=normalized.get("channel_message_id"),
+    job = IngestJob(
+        user_id=current_user.id,
+        message_id=message.id,
+        conversation_id=identity.conversation_id,
+        contact_id=identity.contact_id,
+        channel_type=channel_type,
+        contact_created=identity.contact_created,
+        conversation_created=identity.conversation_created,
+        audio_base64=normalized.get("audio_base64"),
     )
-    conversation.unread_count += 1
-    conversation.last_message_at = datetime.now(timezone.utc)
-    db.add(message)
-    db.commit()
-    db.refresh(message)
-
-    if conversation_created:
-        publish_event(
-            db,
-            str(current_user.id),
-            "conversation.created",
-            {
-                "conversation_id": str(conversation.id),
-                "contact_id": str(contact.id),
-                "channel": channel.type,
-                "status": conversation.status,
-            },
-            source_event_id=str(conversation.id),
-        )
+    queued = _dispatch_jobs(db, [job])
+    response.status_code = status.HTTP_202_ACCEPTED if queued else status.HTTP_200_OK
+    return {"status": "accepted" if queued else "ok", "message_id": str(message.id), "normalized": normalized}
+
+
+def _count_duplicates(results: list[dict]) -> int:
+    return sum(1 for item in results if item["status"] == "duplicate")
 
-    classification = ai_provider.classify_message(message.body, history=None)
-    message.ai_classification = classification
-    db.add(AIEvent(user_id=current_user.id, conversation_id=conversation.id, event_type="message.received", payload=classification))
 
-    publish_event(
+def _persist_batch(
+    db: Session, user_id, channel_type: str, accepted: list[tuple[int, dict]], payloads: list[dict], results: list[dict]
+) -> tuple[list[IngestJob], list[tuple[int, dict]], dict, list[tuple[int, int]]]:
+    """Write every new item of the batch in one commit, filling in ``results`` for each accepted index."""
+    duplicates = inbound_dedupe.lookup_many(
         db,
-        str(current_user.id),
-        "message.ingested",
-        {
-            "message_id": str(message.id),
-            "conversation_id": str(conversation.id),
-            "body": message.body,
-            "channel": channel.type,
-            "classification": classification,
-        },
-        source_event_id=normalized.get("channel_message_id") or str(message.id),
+        user_id,
+        channel_type,
+        [key for key in (_channel_message_id(normalized) for _, normalized in accepted) if key],
     )
+    unique: list[tuple[int, dict]] = []
+    first_in_batch: dict[str, int] = {}
+    repeated_in_batch: list[tuple[int, int]] = []
+    for index, normalized in accepted:
+        channel_message_id = _channel_message_id(normalized)
+        if channel_message_id and channel_message_id in duplicates:
+            results[index] = {
+                "index": index,
+                "status": "duplicate",
+                "message_id": duplicates[channel_message_id],
+                "channel_message_id": channel_message_id,
+            }
+            continue
+        if channel_message_id and channel_message_id in first_in_batch:
+            repeated_in_batch.append((index, first_in_batch[channel_message_id]))
+            results[index] = {"index": index, "status": "duplicate", "channel_message_id": channel_message_id}
+            continue
+        if channel_message_id:
+            first_in_batch[channel_message_id] = index
+        unique.append((index, normalized))
+    accepted = unique
 
-    run_enabled_automations(
-        db=db,
-        user_id=current_user.id,
-        event_type="message.ingested",
-        event_payload={
-            "message_id": str(message.id),
-            "conversation_id": str(conversation.id),
-            "contact_id": str(contact.id),
-            "message": {"id": str(message.id), "text": message.body},
-            "body": message.body,
-            "channel": {"type": channel.type},
-            "urgency": classification.get("urgency"),
-            "lead": {"score": classification.get("affordability_score")},
-            "classification": classification,
-        },
-        source_event_id=str(message.id),
+    if not accepted:
+        return [], [], {}, repeated_in_batch
+
+    received_at = datetime.now(timezone.utc)
+    identities = resolve_identities(
+        db, user_id, channel_type, [normalized for _, normalized in accepted], opened_at=received_at
     )
 
-    if classification.get("affordability_score") is not None:
-        publish_event(
-            db,
-            str(current_user.id),
-            "lead.score_changed",
-            {
-                "conversation_id": str(conversation.id),
-                "contact_id": str(contact.id),
-                "score": classification.get("affordability_score"),
-            },
-            source_event_id=f"{message.id}:lead_score",
+    jobs: list[IngestJob] = []
+    received: Counter = Counter()
+    latest: dict = {}
+    seen_contacts: set = set()
+    seen_conversations: set = set()
+    for index, normalized in accepted:
+        identity = identities[normalized["handle"]]
+        # Creation events are published once per batch, for the first message that touches the record.
+        contact_created = identity.contact_created and identity.contact_id not in seen_contacts
+        conversation_created = identity.conversation_created and identity.conversation_id not in seen_conversations
+        message = _persist_message(
+            db, user_id, identity.conversation_id, normalized, payloads[index], contact_created, conversation_created
         )
+        received[identity.conversation_id] += 1
+        latest[identity.conversation_id] = message
+        inbound_dedupe.record(db, user_id, channel_type, message.channel_message_id, message.id)
 
-    rules = db.query(Rule).filter(Rule.user_id == current_user.id, Rule.active == True).all()
-    for rule in rules:
-        if rule.compiled_json and evaluate_rule(rule.compiled_json, message.body):
-            db.add(AIEvent(user_id=current_user.id, conversation_id=conversation.id, event_type="rule.matched", payload={"rule_id": str(rule.id)}))
-            db.add(
-                Notification(
-                    user_id=current_user.id,
-                    type="rule_match",
-                    entity_type="rule",
-                    entity_id=rule.id,
-                )
-            )
-
-    if classification.get("urgency") == "high" or classification.get("sentiment") in {"irritated", "anxious", "frustrated"}:
-        db.add(
-            Notification(
-                user_id=current_user.id,
-                type="urgent_message",
-                entity_type="conversation",
-                entity_id=conversation.id,
+        jobs.append(
+            IngestJob(
+                user_id=user_id,
+                message_id=message.id,
+                conversation_id=identity.conversation_id,
+                contact_id=identity.contact_id,
+                channel_type=channel_type,
+                contact_created=contact_created,
+                conversation_created=conversation_created,
+                audio_base64=normalized.get("audio_base64"),
             )
         )
+        seen_contacts.add(identity.contact_id)
+        seen_conversations.add(identity.conversation_id)
+        results[index] = {
+            "index": index,
+            "status": "ok",
+            "message_id": str(message.id),
+            "conversation_id": str(identity.conversation_id),
+            "contact_id": str(identity.contact_id),
+            "channel_message_id": message.channel_message_id,
+        }
+
+    _touch_conversations(db, received, latest, received_at)
+    db.commit()
+    return jobs, accepted, identities, repeated_in_batch
+
 
-    if classification.get("should_create_task"):
-        task = Task(
-            user_id=current_user.id,
-            conversation_id=conversation.id,
-            title=f"Follow up with {contact.name}",
-            due_date=datetime.now(timezone.utc).date() + timedelta(days=1),
+@router.post("/{channel_type}/batch")
+def ingest_webhook_batch(
+    channel_type: str,
+    payloads: list[dict],
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    if channel_type not in NORMALIZERS:
+        raise HTTPException(status_code=400, detail="Unsupported channel")
+    if len(payloads) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds {MAX_BATCH_SIZE} items")
+    _ensure_pipeline_capacity()
+
+    results: list[dict] = [{"index": index, "status": "ok"} for index in range(len(payloads))]
+    accepted: list[tuple[int, dict]] = []
+    for index, payload in enumerate(payloads):
+        try:
+            normalized = NORMALIZERS[channel_type](payload)
+        except Exception as exc:
+            results[index] = {"index": index, "status": "error", "detail": f"Invalid payload: {exc}"}
+            continue
+        if not normalized.get("handle"):
+            results[index] = {"index": index, "status": "error", "detail": "Missing sender handle"}
+            continue
+        accepted.append((index, normalized))
+
+    try:
+        jobs, accepted, identities, repeated_in_batch = _persist_batch(
+            db, current_user.id, channel_type, accepted, payloads, results
         )
-        db.add(task)
-        db.add(
-            Notification(
-                user_id=current_user.id,
-                type="overdue_task",
-                entity_type="task",
-                entity_id=task.id,
-            )
+    except IntegrityError as exc:
+        # A concurrent request committed one of these provider message ids first; the
+        # second pass finds its receipt and reports just that item as a duplicate.
+        db.rollback()
+        if is_stale_identity_error(exc):
+            forget_identities(current_user.id)
+        jobs, accepted, identities, repeated_in_batch = _persist_batch(
+            db, current_user.id, channel_type, accepted, payloads, results
         )
+    if not jobs:
+        return {"status": "ok", "accepted": 0, "failed": len(payloads) - _count_duplicates(results), "results": results}
 
-    db.commit()
-    return {"status": "ok", "normalized": normalized}
+    remember_identities(current_user.id, channel_type, identities)
+    for job, (_, normalized) in zip(jobs, accepted):
+        inbound_dedupe.remember(current_user.id, channel_type, _channel_message_id(normalized), job.message_id)
+    for index, first_index in repeated_in_batch:
+        results[index]["message_id"] = results[first_index]["message_id"]
+
+    queued = _dispatch_jobs(db, jobs)
+    response.status_code = status.HTTP_202_ACCEPTED if queued else status.HTTP_200_OK
+    return {
+        "status": "accepted" if queued else "ok",
+        "accepted": len(jobs),
+        "duplicates": _count_duplicates(results),
+        "failed": len(payloads) - len(jobs) - _count_duplicates(results),
+        "results": results,
+    }
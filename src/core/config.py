@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -7,6 +9,8 @@ class Settings(BaseSettings):
     environment: str = Field("development", description="Environment name")
     secret_key: str = Field("dev-secret", description="JWT secret key")
     access_token_expire_minutes: int = 30
+    auth_user_cache_size: int = Field(10000, alias="AUTH_USER_CACHE_SIZE")
+    auth_user_cache_ttl_seconds: int = Field(60, alias="AUTH_USER_CACHE_TTL_SECONDS")
     refresh_token_expire_minutes: int = 60 * 24 * 7
     database_url: str = Field(
         "postgresql+psycopg2://alfred:alfred@db:5432/alfred",
@@ -23,8 +27,50 @@ class Settings(BaseSettings):
     automation_max_attempts: int = Field(8, alias="AUTOMATION_MAX_ATTEMPTS")
     automation_replay_window_seconds: int = Field(300, alias="AUTOMATION_REPLAY_WINDOW_SECONDS")
     automation_rate_limit_per_minute: int = Field(60, alias="AUTOMATION_RATE_LIMIT_PER_MINUTE")
+    automation_destination_rate_limit_per_minute: int = Field(0, alias="AUTOMATION_DESTINATION_RATE_LIMIT_PER_MINUTE")
+    automation_rate_limit_backend: str = Field("memory", alias="AUTOMATION_RATE_LIMIT_BACKEND")
+    automation_outbox_enabled: bool = Field(False, alias="AUTOMATION_OUTBOX_ENABLED")
+    automation_dispatch_batch_size: int = Field(500, alias="AUTOMATION_DISPATCH_BATCH_SIZE")
+    automation_connect_timeout_seconds: float = Field(3.0, alias="AUTOMATION_CONNECT_TIMEOUT_SECONDS")
+    automation_circuit_failure_threshold: int = Field(5, alias="AUTOMATION_CIRCUIT_FAILURE_THRESHOLD")
+    automation_circuit_open_seconds: int = Field(30, alias="AUTOMATION_CIRCUIT_OPEN_SECONDS")
+    automation_circuit_max_open_seconds: int = Field(900, alias="AUTOMATION_CIRCUIT_MAX_OPEN_SECONDS")
+    automation_delivery_lease_seconds: int = Field(120, alias="AUTOMATION_DELIVERY_LEASE_SECONDS")
+    automation_dispatcher_poll_seconds: float = Field(1.0, alias="AUTOMATION_DISPATCHER_POLL_SECONDS")
+    automation_delivery_workers: int = Field(16, alias="AUTOMATION_DELIVERY_WORKERS")
+    automation_destination_max_concurrency: int = Field(4, alias="AUTOMATION_DESTINATION_MAX_CONCURRENCY")
+    automation_http_pool_maxsize: int = Field(10, alias="AUTOMATION_HTTP_POOL_MAXSIZE")
+    automation_destination_cache_size: int = Field(10000, alias="AUTOMATION_DESTINATION_CACHE_SIZE")
+    automation_destination_cache_ttl_seconds: int = Field(60, alias="AUTOMATION_DESTINATION_CACHE_TTL_SECONDS")
+    automation_flow_cache_size: int = Field(10000, alias="AUTOMATION_FLOW_CACHE_SIZE")
+    automation_flow_cache_ttl_seconds: int = Field(60, alias="AUTOMATION_FLOW_CACHE_TTL_SECONDS")
+    automation_compiled_flow_cache_size: int = Field(50000, alias="AUTOMATION_COMPILED_FLOW_CACHE_SIZE")
+    automation_run_sample_rate: float = Field(0.0, alias="AUTOMATION_RUN_SAMPLE_RATE")
+    automation_run_log_buffer_size: int = Field(10000, alias="AUTOMATION_RUN_LOG_BUFFER_SIZE")
+    automation_run_log_batch_size: int = Field(500, alias="AUTOMATION_RUN_LOG_BATCH_SIZE")
+    automation_run_log_flush_interval_seconds: float = Field(5.0, alias="AUTOMATION_RUN_LOG_FLUSH_INTERVAL_SECONDS")
+    no_reply_timer_batch_size: int = Field(500, alias="NO_REPLY_TIMER_BATCH_SIZE")
+    notification_sweep_chunk_size: int = Field(5000, alias="NOTIFICATION_SWEEP_CHUNK_SIZE")
     automation_debug_enabled: bool = Field(False, alias="AUTOMATION_DEBUG_ENABLED")
     automation_secret_encryption_key: str = Field("dev-automation-secret", alias="AUTOMATION_SECRET_ENCRYPTION_KEY")
+    audit_buffer_size: int = Field(10000, alias="AUDIT_BUFFER_SIZE")
+    audit_flush_batch_size: int = Field(500, alias="AUDIT_FLUSH_BATCH_SIZE")
+    audit_flush_interval_seconds: float = Field(1.0, alias="AUDIT_FLUSH_INTERVAL_SECONDS")
+    ingest_pipeline_enabled: bool = Field(True, alias="INGEST_PIPELINE_ENABLED")
+    ingest_pipeline_max_backlog: int = Field(10000, alias="INGEST_PIPELINE_MAX_BACKLOG")
+    ingest_submit_timeout_seconds: float = Field(1.0, alias="INGEST_SUBMIT_TIMEOUT_SECONDS")
+    ingest_stage_max_attempts: int = Field(3, alias="INGEST_STAGE_MAX_ATTEMPTS")
+    ingest_recovery_grace_seconds: int = Field(600, alias="INGEST_RECOVERY_GRACE_SECONDS")
+    ingest_recovery_window_hours: int = Field(24, alias="INGEST_RECOVERY_WINDOW_HOURS")
+    ingest_recovery_batch_size: int = Field(500, alias="INGEST_RECOVERY_BATCH_SIZE")
+    ingest_dedupe_cache_size: int = Field(100000, alias="INGEST_DEDUPE_CACHE_SIZE")
+    ingest_identity_cache_size: int = Field(50000, alias="INGEST_IDENTITY_CACHE_SIZE")
+    ingest_identity_cache_ttl_seconds: int = Field(300, alias="INGEST_IDENTITY_CACHE_TTL_SECONDS")
+    ingest_transcription_workers: int = Field(2, alias="INGEST_TRANSCRIPTION_WORKERS")
+    ingest_classification_workers: int = Field(4, alias="INGEST_CLASSIFICATION_WORKERS")
+    ingest_events_workers: int = Field(2, alias="INGEST_EVENTS_WORKERS")
+    ingest_rules_workers: int = Field(2, alias="INGEST_RULES_WORKERS")
+    ingest_automations_workers: int = Field(2, alias="INGEST_AUTOMATIONS_WORKERS")
     cors_origins_raw: str = Field("", alias="CORS_ORIGINS")
 
     @property
@@ -37,5 +83,12 @@ class Settings(BaseSettings):
         case_sensitive = False
 
 
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
     return Settings()
+
+
+def reload_settings() -> Settings:
+    """Re-read the environment and ``.env``; values captured at import time keep their old value."""
+    get_settings.cache_clear()
+    return get_settings()
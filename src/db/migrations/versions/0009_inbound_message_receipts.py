@@ -0,0 +1,38 @@
+"""Add inbound message receipts for webhook redelivery dedupe
+
+Revision ID: 0009_inbound_message_receipts
+Revises: 0008
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0009_inbound_message_receipts"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "inbound_message_receipts",
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column(
+            "channel_type",
+            postgresql.ENUM(name="channel_type", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("channel_message_id", sa.String(), nullable=False),
+        sa.Column("message_id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["message_id"], ["messages.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "channel_type", "channel_message_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("inbound_message_receipts")
@@ -0,0 +1,85 @@
+"""Unique channel and conversation identities for webhook upserts
+
+Revision ID: 0010_identity_unique_constraints
+Revises: 0009_inbound_message_receipts
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+
+
+revision = "0010_identity_unique_constraints"
+down_revision = "0009_inbound_message_receipts"
+branch_labels = None
+depends_on = None
+
+
+CONVERSATION_REFERENCES = ("messages", "tasks", "lead_tasks", "internal_comments", "audit_logs", "ai_events")
+
+
+def upgrade() -> None:
+    # Fold duplicates created by concurrent first messages into the oldest row before constraining.
+    op.execute(
+        """
+        CREATE TEMP TABLE channel_merge ON COMMIT DROP AS
+        SELECT id AS duplicate_id, keeper_id FROM (
+            SELECT id, first_value(id) OVER (PARTITION BY user_id, type ORDER BY id) AS keeper_id
+            FROM channels
+        ) ranked
+        WHERE id <> keeper_id
+        """
+    )
+    op.execute(
+        """
+        UPDATE conversations SET channel_id = channel_merge.keeper_id
+        FROM channel_merge WHERE conversations.channel_id = channel_merge.duplicate_id
+        """
+    )
+    op.execute("DELETE FROM channels USING channel_merge WHERE channels.id = channel_merge.duplicate_id")
+
+    op.execute(
+        """
+        CREATE TEMP TABLE conversation_merge ON COMMIT DROP AS
+        SELECT id AS duplicate_id, keeper_id FROM (
+            SELECT id, first_value(id) OVER (
+                PARTITION BY user_id, contact_id, channel_id
+                ORDER BY last_message_at DESC NULLS LAST, id
+            ) AS keeper_id
+            FROM conversations
+        ) ranked
+        WHERE id <> keeper_id
+        """
+    )
+    for table in CONVERSATION_REFERENCES:
+        op.execute(
+            f"""
+            UPDATE {table} SET conversation_id = conversation_merge.keeper_id
+            FROM conversation_merge WHERE {table}.conversation_id = conversation_merge.duplicate_id
+            """
+        )
+    op.execute(
+        """
+        UPDATE conversations SET unread_count = totals.unread_count
+        FROM (
+            SELECT members.keeper_id, sum(conversations.unread_count) AS unread_count
+            FROM (
+                SELECT duplicate_id AS id, keeper_id FROM conversation_merge
+                UNION SELECT keeper_id, keeper_id FROM conversation_merge
+            ) members
+            JOIN conversations ON conversations.id = members.id
+            GROUP BY members.keeper_id
+        ) totals
+        WHERE conversations.id = totals.keeper_id
+        """
+    )
+    op.execute("DELETE FROM conversations USING conversation_merge WHERE conversations.id = conversation_merge.duplicate_id")
+
+    op.create_unique_constraint("uq_channel_user_type", "channels", ["user_id", "type"])
+    op.create_unique_constraint(
+        "uq_conversation_contact_channel", "conversations", ["user_id", "contact_id", "channel_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_conversation_contact_channel", "conversations", type_="unique")
+    op.drop_constraint("uq_channel_user_type", "channels", type_="unique")
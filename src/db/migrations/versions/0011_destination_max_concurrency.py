@@ -0,0 +1,23 @@
+"""Per-destination delivery concurrency
+
+Revision ID: 0011_destination_max_concurrency
+Revises: 0010_identity_unique_constraints
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011_destination_max_concurrency"
+down_revision = "0010_identity_unique_constraints"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("automation_destinations", sa.Column("max_concurrency", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("automation_destinations", "max_concurrency")
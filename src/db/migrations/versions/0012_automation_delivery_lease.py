@@ -0,0 +1,23 @@
+"""Lease token for claimed automation deliveries
+
+Revision ID: 0012_automation_delivery_lease
+Revises: 0011_destination_max_concurrency
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0012_automation_delivery_lease"
+down_revision = "0011_destination_max_concurrency"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("automation_deliveries", sa.Column("lease_token", sa.UUID(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("automation_deliveries", "lease_token")
@@ -0,0 +1,28 @@
+"""Circuit breaker state on automation destinations
+
+Revision ID: 0013_destination_circuit_breaker
+Revises: 0012_automation_delivery_lease
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0013_destination_circuit_breaker"
+down_revision = "0012_automation_delivery_lease"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "automation_destinations",
+        sa.Column("circuit_failures", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column("automation_destinations", sa.Column("circuit_open_until", sa.TIMESTAMP(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("automation_destinations", "circuit_open_until")
+    op.drop_column("automation_destinations", "circuit_failures")
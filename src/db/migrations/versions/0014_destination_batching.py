@@ -0,0 +1,36 @@
+"""Opt-in batched delivery on automation destinations
+
+Revision ID: 0014_destination_batching
+Revises: 0013_destination_circuit_breaker
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0014_destination_batching"
+down_revision = "0013_destination_circuit_breaker"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "automation_destinations",
+        sa.Column("batch_enabled", sa.Boolean(), nullable=False, server_default=sa.text("false")),
+    )
+    op.add_column(
+        "automation_destinations",
+        sa.Column("batch_max_size", sa.Integer(), nullable=False, server_default="100"),
+    )
+    op.add_column(
+        "automation_destinations",
+        sa.Column("batch_linger_seconds", sa.Float(), nullable=False, server_default="2"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("automation_destinations", "batch_linger_seconds")
+    op.drop_column("automation_destinations", "batch_max_size")
+    op.drop_column("automation_destinations", "batch_enabled")
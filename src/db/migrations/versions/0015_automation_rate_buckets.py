@@ -0,0 +1,31 @@
+"""Add shared token buckets for automation rate limiting
+
+Revision ID: 0015_automation_rate_buckets
+Revises: 0014_destination_batching
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0015_automation_rate_buckets"
+down_revision = "0014_destination_batching"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "automation_rate_buckets",
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("tokens", sa.Float(), nullable=False),
+        sa.Column("last_granted", sa.Boolean(), nullable=False, server_default=sa.text("true")),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("key"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("automation_rate_buckets")
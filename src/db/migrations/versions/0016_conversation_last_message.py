@@ -0,0 +1,59 @@
+"""Denormalize the latest message onto conversations for the keyset inbox
+
+Revision ID: 0016_conversation_last_message
+Revises: 0015_automation_rate_buckets
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0016_conversation_last_message"
+down_revision = "0015_automation_rate_buckets"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("conversations", sa.Column("last_message_id", sa.UUID(), nullable=True))
+    op.add_column("conversations", sa.Column("last_message_body", sa.Text(), nullable=True))
+    op.add_column(
+        "conversations",
+        sa.Column(
+            "last_message_direction",
+            postgresql.ENUM(name="message_direction", create_type=False),
+            nullable=True,
+        ),
+    )
+    op.add_column("conversations", sa.Column("last_sentiment", sa.String(), nullable=True))
+    op.add_column("conversations", sa.Column("last_urgency", sa.String(), nullable=True))
+    op.execute(
+        """
+        UPDATE conversations SET
+            last_message_id = latest.id,
+            last_message_body = latest.body,
+            last_message_direction = latest.direction,
+            last_sentiment = latest.ai_classification ->> 'sentiment',
+            last_urgency = latest.ai_classification ->> 'urgency'
+        FROM (
+            SELECT DISTINCT ON (conversation_id) conversation_id, id, body, direction, ai_classification
+            FROM messages
+            ORDER BY conversation_id, created_at DESC, id DESC
+        ) latest
+        WHERE conversations.id = latest.conversation_id
+        """
+    )
+    op.drop_index("ix_conversations_user_last", table_name="conversations")
+    op.create_index("ix_conversations_user_last", "conversations", ["user_id", "last_message_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_conversations_user_last", table_name="conversations")
+    op.create_index("ix_conversations_user_last", "conversations", ["user_id", "last_message_at"])
+    op.drop_column("conversations", "last_urgency")
+    op.drop_column("conversations", "last_sentiment")
+    op.drop_column("conversations", "last_message_direction")
+    op.drop_column("conversations", "last_message_body")
+    op.drop_column("conversations", "last_message_id")
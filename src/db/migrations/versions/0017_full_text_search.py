@@ -0,0 +1,55 @@
+"""Full-text search vectors on messages and contacts
+
+Revision ID: 0017_full_text_search
+Revises: 0016_conversation_last_message
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0017_full_text_search"
+down_revision = "0016_conversation_last_message"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("conversations", sa.Column("last_score", sa.Float(), nullable=True))
+    op.execute(
+        """
+        UPDATE conversations SET last_score = (messages.ai_classification ->> 'affordability_score')::float
+        FROM messages
+        WHERE messages.id = conversations.last_message_id
+          AND messages.ai_classification ->> 'affordability_score' ~ '^-?[0-9]+(\\.[0-9]+)?$'
+        """
+    )
+    # Adding a stored generated column rewrites the table; schedule this migration off-peak.
+    op.add_column(
+        "messages",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple', coalesce(body, ''))", persisted=True),
+        ),
+    )
+    op.add_column(
+        "contacts",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(handle, ''))", persisted=True),
+        ),
+    )
+    op.create_index("ix_messages_search", "messages", ["search_vector"], postgresql_using="gin")
+    op.create_index("ix_contacts_search", "contacts", ["search_vector"], postgresql_using="gin")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contacts_search", table_name="contacts")
+    op.drop_index("ix_messages_search", table_name="messages")
+    op.drop_column("contacts", "search_vector")
+    op.drop_column("messages", "search_vector")
+    op.drop_column("conversations", "last_score")
@@ -0,0 +1,54 @@
+"""Trigram and prefix indexes for contact search
+
+Revision ID: 0018_contact_trigram_search
+Revises: 0017_full_text_search
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0018_contact_trigram_search"
+down_revision = "0017_full_text_search"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # btree_gin lets the trigram index lead with user_id so each tenant scans only its own entries.
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    # array_to_string is only STABLE, so it cannot appear in an index expression directly; the
+    # wrapper is declared IMMUTABLE, which holds because tags are plain text with no casts.
+    op.execute(
+        """
+        CREATE FUNCTION contact_search_text(name text, handle text, tags text[]) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+            SELECT lower(coalesce(name, '') || ' ' || coalesce(handle, '') || ' ' || coalesce(array_to_string(tags, ' '), ''))
+        $$
+        """
+    )
+    op.execute(
+        "CREATE INDEX ix_contacts_search_trgm ON contacts "
+        "USING gin (user_id, contact_search_text(name, handle, tags) gin_trgm_ops)"
+    )
+    op.create_index("ix_contacts_user_created", "contacts", ["user_id", "created_at", "id"])
+    op.create_index(
+        "ix_contacts_name_prefix",
+        "contacts",
+        ["user_id", sa.text("lower(name) text_pattern_ops")],
+    )
+    op.create_index(
+        "ix_contacts_handle_prefix",
+        "contacts",
+        ["user_id", sa.text("lower(handle) text_pattern_ops")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contacts_handle_prefix", table_name="contacts")
+    op.drop_index("ix_contacts_name_prefix", table_name="contacts")
+    op.drop_index("ix_contacts_user_created", table_name="contacts")
+    op.drop_index("ix_contacts_search_trgm", table_name="contacts")
+    op.execute("DROP FUNCTION IF EXISTS contact_search_text(text, text, text[])")
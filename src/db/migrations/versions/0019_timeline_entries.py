@@ -0,0 +1,100 @@
+"""Materialized conversation timeline entries
+
+Revision ID: 0019_timeline_entries
+Revises: 0018_contact_trigram_search
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0019_timeline_entries"
+down_revision = "0018_contact_trigram_search"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "timeline_entries",
+        sa.Column("id", sa.UUID(), primary_key=True),
+        sa.Column("conversation_id", sa.UUID(), sa.ForeignKey("conversations.id"), nullable=False),
+        sa.Column("source_type", sa.String(), nullable=False),
+        sa.Column("source_id", sa.UUID(), nullable=False),
+        sa.Column("item", postgresql.JSONB(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint("source_type", "source_id", name="uq_timeline_entry_source"),
+    )
+    op.create_index(
+        "ix_timeline_entries_conversation", "timeline_entries", ["conversation_id", "created_at", "id"]
+    )
+    # Backfill with the same item shapes services.timeline.timeline_item writes.
+    op.execute(
+        """
+        INSERT INTO timeline_entries (id, conversation_id, source_type, source_id, item, created_at)
+        SELECT gen_random_uuid(), conversation_id, 'message', id,
+               jsonb_build_object(
+                   'type', CASE WHEN direction = 'outbound' THEN 'ai_reply' ELSE 'message' END,
+                   'direction', direction,
+                   'body', body,
+                   'ai_classification', ai_classification::jsonb
+               ),
+               created_at
+        FROM messages
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO timeline_entries (id, conversation_id, source_type, source_id, item, created_at)
+        SELECT gen_random_uuid(), conversation_id, 'task', id,
+               jsonb_build_object(
+                   'type', 'task', 'source', 'general', 'title', title, 'status', status,
+                   'priority', priority, 'due_date', due_date
+               ),
+               created_at
+        FROM tasks
+        WHERE conversation_id IS NOT NULL
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO timeline_entries (id, conversation_id, source_type, source_id, item, created_at)
+        SELECT gen_random_uuid(), conversation_id, 'lead_task', id,
+               jsonb_build_object(
+                   'type', 'task', 'source', 'lead', 'title', title, 'status', status,
+                   'priority', priority, 'due_date', due_date, 'assignee_id', assignee_id::text
+               ),
+               created_at
+        FROM lead_tasks
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO timeline_entries (id, conversation_id, source_type, source_id, item, created_at)
+        SELECT gen_random_uuid(), conversation_id, 'ai_event', id,
+               jsonb_build_object(
+                   'type', CASE event_type
+                       WHEN 'rule.matched' THEN 'rule'
+                       WHEN 'message.received' THEN 'message'
+                       WHEN 'summary.generated' THEN 'ai_summary'
+                       WHEN 'flow.created' THEN 'ai_flow'
+                       WHEN 'voice.transcribed' THEN 'ai_voice'
+                       ELSE 'ai_event'
+                   END,
+                   'event_type', event_type,
+                   'payload', payload::jsonb
+               ),
+               created_at
+        FROM ai_events
+        WHERE conversation_id IS NOT NULL
+        """
+    )
+    op.drop_column("conversations", "timeline")
+
+
+def downgrade() -> None:
+    op.add_column("conversations", sa.Column("timeline", postgresql.JSONB(), nullable=True))
+    op.drop_index("ix_timeline_entries_conversation", table_name="timeline_entries")
+    op.drop_table("timeline_entries")
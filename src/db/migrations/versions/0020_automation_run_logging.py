@@ -0,0 +1,41 @@
+"""Reference source events from builder runs and count unmatched runs
+
+Revision ID: 0020_automation_run_logging
+Revises: 0019_timeline_entries
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0020_automation_run_logging"
+down_revision = "0019_timeline_entries"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("automation_builder_runs", sa.Column("source_event_id", sa.String(), nullable=True))
+    op.alter_column("automation_builder_runs", "event_payload", existing_type=postgresql.JSONB(), nullable=True)
+    op.create_index(
+        "ix_automation_builder_runs_source", "automation_builder_runs", ["user_id", "source_event_id"]
+    )
+    op.create_table(
+        "automation_builder_run_counters",
+        sa.Column("automation_id", sa.UUID(), primary_key=True),
+        sa.Column("event_type", sa.String(), primary_key=True),
+        sa.Column("bucket", sa.TIMESTAMP(timezone=True), primary_key=True),
+        sa.Column("user_id", sa.UUID(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("unmatched", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("automation_builder_run_counters")
+    op.drop_index("ix_automation_builder_runs_source", table_name="automation_builder_runs")
+    op.execute("UPDATE automation_builder_runs SET event_payload = '{}' WHERE event_payload IS NULL")
+    op.alter_column("automation_builder_runs", "event_payload", existing_type=postgresql.JSONB(), nullable=False)
+    op.drop_column("automation_builder_runs", "source_event_id")
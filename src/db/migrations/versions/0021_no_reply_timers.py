@@ -0,0 +1,44 @@
+"""Add timers for the no_reply_after builder trigger
+
+Revision ID: 0021_no_reply_timers
+Revises: 0020_automation_run_logging
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0021_no_reply_timers"
+down_revision = "0020_automation_run_logging"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_automation_builder_automations_trigger",
+        "automation_builder_automations",
+        ["user_id", "trigger_type"],
+    )
+    op.create_table(
+        "no_reply_timers",
+        sa.Column(
+            "automation_id",
+            sa.UUID(),
+            sa.ForeignKey("automation_builder_automations.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("conversation_id", sa.UUID(), sa.ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("user_id", sa.UUID(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("message_id", sa.UUID(), nullable=False),
+        sa.Column("fire_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_no_reply_timers_fire_at", "no_reply_timers", ["fire_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_no_reply_timers_fire_at", table_name="no_reply_timers")
+    op.drop_table("no_reply_timers")
+    op.drop_index("ix_automation_builder_automations_trigger", table_name="automation_builder_automations")
@@ -0,0 +1,68 @@
+"""Deduplicate scheduler notifications and index the sweeps
+
+Revision ID: 0022_notification_sweeps
+Revises: 0021_no_reply_timers
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0022_notification_sweeps"
+down_revision = "0021_no_reply_timers"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("notifications", sa.Column("dedupe_key", sa.String(), nullable=True))
+    # Key the latest notification of items that are still overdue or stalled, so the
+    # first sweep after the upgrade does not notify about them all over again.
+    op.execute(
+        """
+        UPDATE notifications SET dedupe_key = concat('overdue_task:', tasks.id, ':', tasks.due_date)
+        FROM (
+            SELECT DISTINCT ON (entity_id) id, entity_id FROM notifications
+            WHERE type = 'overdue_task' ORDER BY entity_id, created_at DESC
+        ) AS latest
+        JOIN tasks ON tasks.id = latest.entity_id
+        WHERE notifications.id = latest.id AND tasks.status != 'done' AND tasks.due_date IS NOT NULL
+        """
+    )
+    op.execute(
+        """
+        UPDATE notifications SET dedupe_key = concat('stalled_lead:', conversations.id, ':', conversations.last_message_at)
+        FROM (
+            SELECT DISTINCT ON (entity_id) id, entity_id, created_at FROM notifications
+            WHERE type = 'stalled_lead' ORDER BY entity_id, created_at DESC
+        ) AS latest
+        JOIN conversations ON conversations.id = latest.entity_id
+        WHERE notifications.id = latest.id
+          AND conversations.last_message_at IS NOT NULL
+          AND latest.created_at >= conversations.last_message_at
+        """
+    )
+    op.create_index(
+        "uq_notifications_dedupe_key",
+        "notifications",
+        ["dedupe_key"],
+        unique=True,
+        postgresql_where=sa.text("dedupe_key IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_tasks_open_due", "tasks", ["due_date", "id"], postgresql_where=sa.text("status != 'done'")
+    )
+    op.create_index(
+        "ix_conversations_unread_last",
+        "conversations",
+        ["last_message_at", "id"],
+        postgresql_where=sa.text("unread_count > 0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_conversations_unread_last", table_name="conversations")
+    op.drop_index("ix_tasks_open_due", table_name="tasks")
+    op.drop_index("uq_notifications_dedupe_key", table_name="notifications")
+    op.drop_column("notifications", "dedupe_key")
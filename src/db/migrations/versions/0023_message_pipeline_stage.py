@@ -0,0 +1,32 @@
+"""Track the pending ingestion stage of each message
+
+Revision ID: 0023_message_pipeline_stage
+Revises: 0022_notification_sweeps
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0023_message_pipeline_stage"
+down_revision = "0022_notification_sweeps"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("messages", sa.Column("pipeline_stage", sa.String(), nullable=True))
+    op.add_column("messages", sa.Column("pipeline_updated_at", sa.TIMESTAMP(timezone=True), nullable=True))
+    op.create_index(
+        "ix_messages_pipeline_pending",
+        "messages",
+        ["pipeline_updated_at"],
+        postgresql_where=sa.text("pipeline_stage IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_messages_pipeline_pending", table_name="messages")
+    op.drop_column("messages", "pipeline_updated_at")
+    op.drop_column("messages", "pipeline_stage")
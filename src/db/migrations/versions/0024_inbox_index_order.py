@@ -0,0 +1,31 @@
+"""Order the inbox index like the inbox query
+
+Revision ID: 0024_inbox_index_order
+Revises: 0023_message_pipeline_stage
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0024_inbox_index_order"
+down_revision = "0023_message_pipeline_stage"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The inbox sorts last_message_at DESC NULLS LAST; a backward scan of an ascending
+    # index yields NULLS FIRST, so the old index could not serve it without a sort.
+    op.drop_index("ix_conversations_user_last", table_name="conversations")
+    op.create_index(
+        "ix_conversations_user_last",
+        "conversations",
+        ["user_id", sa.text("last_message_at DESC NULLS LAST"), sa.text("id DESC")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_conversations_user_last", table_name="conversations")
+    op.create_index("ix_conversations_user_last", "conversations", ["user_id", "last_message_at", "id"])
@@ -0,0 +1,29 @@
+"""Keep the creation flags of pending ingestion jobs on messages
+
+Revision ID: 0025_message_pipeline_created
+Revises: 0024_inbox_index_order
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0025_message_pipeline_created"
+down_revision = "0024_inbox_index_order"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "messages", sa.Column("pipeline_contact_created", sa.Boolean(), server_default="false", nullable=False)
+    )
+    op.add_column(
+        "messages", sa.Column("pipeline_conversation_created", sa.Boolean(), server_default="false", nullable=False)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("messages", "pipeline_conversation_created")
+    op.drop_column("messages", "pipeline_contact_created")
@@ -0,0 +1,39 @@
+"""Scope message full-text search by tenant
+
+Revision ID: 0026_message_search_tenant
+Revises: 0025_message_pipeline_created
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0026_message_search_tenant"
+down_revision = "0025_message_pipeline_created"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("messages", sa.Column("user_id", sa.UUID(), nullable=True))
+    op.execute(
+        """
+        UPDATE messages SET user_id = conversations.user_id
+        FROM conversations
+        WHERE conversations.id = messages.conversation_id
+        """
+    )
+    op.alter_column("messages", "user_id", nullable=False)
+    op.create_foreign_key("messages_user_id_fkey", "messages", "users", ["user_id"], ["id"])
+    # btree_gin (migration 0018) lets the GIN index lead with the tenant, so a common term
+    # no longer walks every tenant's matches before the conversation join filters them out.
+    op.create_index("ix_messages_user_search", "messages", ["user_id", "search_vector"], postgresql_using="gin")
+    op.drop_index("ix_messages_search", table_name="messages")
+
+
+def downgrade() -> None:
+    op.create_index("ix_messages_search", "messages", ["search_vector"], postgresql_using="gin")
+    op.drop_index("ix_messages_user_search", table_name="messages")
+    op.drop_constraint("messages_user_id_fkey", "messages", type_="foreignkey")
+    op.drop_column("messages", "user_id")
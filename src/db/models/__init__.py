@@ -3,21 +3,26 @@ from .models import (
     AuditLog,
     AutomationBuilderAutomation,
     AutomationBuilderRun,
+    AutomationBuilderRunCounter,
     AutomationCallbackEvent,
     AutomationDelivery,
     AutomationDestination,
     AutomationEvent,
+    AutomationRateBucket,
     Channel,
     Contact,
     ContactSettings,
     Conversation,
     Flow,
+    InboundMessageReceipt,
     InternalComment,
     LeadTask,
     Message,
+    NoReplyTimer,
     Notification,
     Rule,
     Task,
+    TimelineEntry,
     User,
 )
 
@@ -26,20 +31,25 @@ __all__ = [
     "AuditLog",
     "AutomationBuilderAutomation",
     "AutomationBuilderRun",
+    "AutomationBuilderRunCounter",
     "AutomationCallbackEvent",
     "AutomationDelivery",
     "AutomationDestination",
     "AutomationEvent",
+    "AutomationRateBucket",
     "Channel",
     "Contact",
     "ContactSettings",
     "Conversation",
     "Flow",
+    "InboundMessageReceipt",
     "InternalComment",
     "LeadTask",
     "Message",
+    "NoReplyTimer",
     "Notification",
     "Rule",
     "Task",
+    "TimelineEntry",
     "User",
 ]
@@ -6,19 +6,23 @@ from sqlalchemy import (
     Boolean,
     CheckConstraint,
     Column,
+    Computed,
     Date,
     Enum,
+    Float,
     ForeignKey,
     Index,
     Integer,
     JSON,
     Numeric,
     String,
+    TIMESTAMP,
     Text,
     UniqueConstraint,
+    column,
     func,
 )
-from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from db.base import Base
@@ -73,6 +77,7 @@ class User(Base):
 
 class Channel(Base):
     __tablename__ = "channels"
+    __table_args__ = (UniqueConstraint("user_id", "type", name="uq_channel_user_type"),)
 
     id: Mapped[uuid.UUID] = mapped_column(
         primary_key=True, default=uuid.uuid4, server_default=None
@@ -87,7 +92,31 @@ class Channel(Base):
 
 class Contact(Base):
     __tablename__ = "contacts"
-    __table_args__ = (UniqueConstraint("user_id", "handle", name="uq_contact_handle"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "handle", name="uq_contact_handle"),
+        Index("ix_contacts_search", "search_vector", postgresql_using="gin"),
+        Index("ix_contacts_user_created", "user_id", "created_at", "id"),
+        # contact_search_text() is created by migration 0018; see services/contact_search.py.
+        Index(
+            "ix_contacts_search_trgm",
+            "user_id",
+            func.contact_search_text(column("name"), column("handle"), column("tags")).label("search_text"),
+            postgresql_using="gin",
+            postgresql_ops={"search_text": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_contacts_name_prefix",
+            "user_id",
+            func.lower(column("name")).label("name_lower"),
+            postgresql_ops={"name_lower": "text_pattern_ops"},
+        ),
+        Index(
+            "ix_contacts_handle_prefix",
+            "user_id",
+            func.lower(column("handle")).label("handle_lower"),
+            postgresql_ops={"handle_lower": "text_pattern_ops"},
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         primary_key=True, default=uuid.uuid4, server_default=None
@@ -97,6 +126,11 @@ class Contact(Base):
     handle: Mapped[str] = mapped_column(String, nullable=False)
     avatar_url: Mapped[Optional[str]] = mapped_column(String)
     tags: Mapped[List[str]] = mapped_column(ARRAY(String), server_default="{}", default=list)
+    search_vector = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(handle, ''))", persisted=True),
+        deferred=True,
+    )
 
     user = relationship("User", back_populates="contacts")
     settings = relationship("ContactSettings", back_populates="contact", uselist=False)
@@ -121,7 +155,15 @@ class ContactSettings(Base):
 class Conversation(Base):
     __tablename__ = "conversations"
     __table_args__ = (
-        Index("ix_conversations_user_last", "user_id", "last_message_at"),
+        # Matches the inbox order, so each keyset page walks the index instead of sorting the tenant.
+        Index(
+            "ix_conversations_user_last",
+            "user_id",
+            column("last_message_at").desc().nullslast(),
+            column("id").desc(),
+        ),
+        Index("ix_conversations_unread_last", "last_message_at", "id", postgresql_where=column("unread_count") > 0),
+        UniqueConstraint("user_id", "contact_id", "channel_id", name="uq_conversation_contact_channel"),
     )
 
     id: Mapped[uuid.UUID] = mapped_column(
@@ -132,8 +174,14 @@ class Conversation(Base):
     channel_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("channels.id"), nullable=False)
     status: Mapped[str] = mapped_column(conversation_status_enum, default="open", server_default="open")
     last_message_at: Mapped[Optional[datetime]] = mapped_column()
+    # Denormalized from the latest message so the inbox never loads message rows.
+    last_message_id: Mapped[Optional[uuid.UUID]] = mapped_column()
+    last_message_body: Mapped[Optional[str]] = mapped_column(Text)
+    last_message_direction: Mapped[Optional[str]] = mapped_column(direction_enum)
+    last_sentiment: Mapped[Optional[str]] = mapped_column(String)
+    last_urgency: Mapped[Optional[str]] = mapped_column(String)
+    last_score: Mapped[Optional[float]] = mapped_column(Float)
     unread_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
-    timeline: Mapped[Optional[dict]] = mapped_column(JSONB)
     context_summary: Mapped[Optional[str]] = mapped_column(Text)
     personality_analysis: Mapped[Optional[dict]] = mapped_column(JSONB)
     simulation_enabled: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
@@ -146,7 +194,16 @@ class Conversation(Base):
 
 class Message(Base):
     __tablename__ = "messages"
-    __table_args__ = (Index("ix_messages_conversation", "conversation_id", "created_at"),)
+    __table_args__ = (
+        Index("ix_messages_conversation", "conversation_id", "created_at"),
+        # Leads with the tenant (btree_gin, migration 0018) so a search only walks its own messages.
+        Index("ix_messages_user_search", "user_id", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_messages_pipeline_pending",
+            "pipeline_updated_at",
+            postgresql_where=column("pipeline_stage").isnot(None),
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         primary_key=True, default=uuid.uuid4, server_default=None
@@ -154,19 +211,40 @@ class Message(Base):
     conversation_id: Mapped[uuid.UUID] = mapped_column(
         ForeignKey("conversations.id"), nullable=False
     )
+    # Copied from the conversation so full-text search can be scoped by tenant in the index.
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"), nullable=False)
     direction: Mapped[str] = mapped_column(direction_enum, nullable=False)
     body: Mapped[str] = mapped_column(Text, nullable=False)
     raw_payload: Mapped[dict] = mapped_column(JSON, nullable=False)
     channel_message_id: Mapped[Optional[str]] = mapped_column(String)
     ai_classification: Mapped[Optional[dict]] = mapped_column(JSON)
+    # Next ingestion stage still to run for this message; NULL once the pipeline is done.
+    pipeline_stage: Mapped[Optional[str]] = mapped_column(String)
+    pipeline_updated_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+    # Whether this message created its contact / conversation, so a recovered job still publishes the creation events.
+    pipeline_contact_created: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
+    pipeline_conversation_created: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
+    search_vector = mapped_column(
+        TSVECTOR, Computed("to_tsvector('simple', coalesce(body, ''))", persisted=True), deferred=True
+    )
 
     conversation = relationship("Conversation", back_populates="messages")
 
 
+class InboundMessageReceipt(Base):
+    __tablename__ = "inbound_message_receipts"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    channel_type: Mapped[str] = mapped_column(channel_enum, primary_key=True)
+    channel_message_id: Mapped[str] = mapped_column(String, primary_key=True)
+    message_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("messages.id", ondelete="CASCADE"), nullable=False)
+
+
 class Task(Base):
     __tablename__ = "tasks"
     __table_args__ = (
         UniqueConstraint("user_id", "source_event_id", name="uq_tasks_user_source_event"),
+        Index("ix_tasks_open_due", "due_date", "id", postgresql_where=column("status") != "done"),
     )
 
     id: Mapped[uuid.UUID] = mapped_column(
@@ -264,6 +342,24 @@ class Flow(Base):
     user = relationship("User", back_populates="flows")
 
 
+class TimelineEntry(Base):
+    """One item of a conversation timeline, appended by ``services.timeline`` at flush time."""
+
+    __tablename__ = "timeline_entries"
+    __table_args__ = (
+        UniqueConstraint("source_type", "source_id", name="uq_timeline_entry_source"),
+        Index("ix_timeline_entries_conversation", "conversation_id", "created_at", "id"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        primary_key=True, default=uuid.uuid4, server_default=None
+    )
+    conversation_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("conversations.id"), nullable=False)
+    source_type: Mapped[str] = mapped_column(String, nullable=False)
+    source_id: Mapped[uuid.UUID] = mapped_column(nullable=False)
+    item: Mapped[dict] = mapped_column(JSONB, nullable=False)
+
+
 class AIEvent(Base):
     __tablename__ = "ai_events"
 
@@ -283,6 +379,12 @@ class Notification(Base):
     __tablename__ = "notifications"
     __table_args__ = (
         Index("ix_notifications_user_seen", "user_id", "seen", "created_at"),
+        Index(
+            "uq_notifications_dedupe_key",
+            "dedupe_key",
+            unique=True,
+            postgresql_where=column("dedupe_key").isnot(None),
+        ),
     )
 
     id: Mapped[uuid.UUID] = mapped_column(
@@ -294,6 +396,9 @@ class Notification(Base):
     entity_id: Mapped[uuid.UUID] = mapped_column()
     seen: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
     message: Mapped[str | None] = mapped_column(Text)
+    # Set by the scheduler sweeps to what was notified about (e.g. a task and its due date),
+    # so each overdue task or stalled lead is notified once until it changes.
+    dedupe_key: Mapped[str | None] = mapped_column(String)
 
     user = relationship("User", back_populates="notifications")
 
@@ -315,6 +420,12 @@ class AutomationDestination(Base):
     secret_encrypted: Mapped[Optional[str]] = mapped_column(Text)
     enabled: Mapped[bool] = mapped_column(Boolean, default=True, server_default="true")
     event_types: Mapped[List[str]] = mapped_column(ARRAY(String), server_default="{}", default=list)
+    max_concurrency: Mapped[Optional[int]] = mapped_column(Integer)
+    batch_enabled: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false")
+    batch_max_size: Mapped[int] = mapped_column(Integer, default=100, server_default="100")
+    batch_linger_seconds: Mapped[float] = mapped_column(Float, default=2, server_default="2")
+    circuit_failures: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    circuit_open_until: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
     updated_at: Mapped[datetime] = mapped_column(
         default=datetime.utcnow, server_default=func.now(), onupdate=func.now()
     )
@@ -364,11 +475,21 @@ class AutomationDelivery(Base):
     attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     last_error: Mapped[Optional[str]] = mapped_column(Text)
     next_retry_at: Mapped[Optional[datetime]] = mapped_column()
+    lease_token: Mapped[Optional[uuid.UUID]] = mapped_column()
 
     destination = relationship("AutomationDestination", back_populates="deliveries")
     event = relationship("AutomationEvent", back_populates="deliveries")
 
 
+class AutomationRateBucket(Base):
+    __tablename__ = "automation_rate_buckets"
+
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    tokens: Mapped[float] = mapped_column(Float, nullable=False)
+    last_granted: Mapped[bool] = mapped_column(Boolean, default=True, server_default="true")
+    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+
+
 class AutomationCallbackEvent(Base):
     __tablename__ = "automation_callback_events"
     __table_args__ = (
@@ -394,6 +515,7 @@ class AutomationCallbackEvent(Base):
 
 class AutomationBuilderAutomation(Base):
     __tablename__ = "automation_builder_automations"
+    __table_args__ = (Index("ix_automation_builder_automations_trigger", "user_id", "trigger_type"),)
 
     id: Mapped[uuid.UUID] = mapped_column(
         primary_key=True, default=uuid.uuid4, server_default=None
@@ -414,6 +536,7 @@ class AutomationBuilderRun(Base):
     __tablename__ = "automation_builder_runs"
     __table_args__ = (
         Index("ix_automation_builder_runs_user_event", "user_id", "event_type"),
+        Index("ix_automation_builder_runs_source", "user_id", "source_event_id"),
     )
 
     id: Mapped[uuid.UUID] = mapped_column(
@@ -424,7 +547,9 @@ class AutomationBuilderRun(Base):
         ForeignKey("automation_builder_automations.id"), nullable=False
     )
     event_type: Mapped[str] = mapped_column(String, nullable=False)
-    event_payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    # Runs for a stored source event (e.g. a message id) keep only the reference, not the payload.
+    source_event_id: Mapped[Optional[str]] = mapped_column(String)
+    event_payload: Mapped[Optional[dict]] = mapped_column(JSONB)
     matched: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, server_default="false")
     actions_executed: Mapped[list] = mapped_column(JSONB, nullable=False, default=list, server_default="[]")
     error: Mapped[Optional[str]] = mapped_column(Text)
@@ -433,5 +558,43 @@ class AutomationBuilderRun(Base):
     automation = relationship("AutomationBuilderAutomation")
 
 
+class AutomationBuilderRunCounter(Base):
+    """Hourly count of evaluations that did not match, per automation and event type.
+
+    ``automation_id`` has no foreign key: counts are flushed in the background and
+    must not fail because the automation was deleted in the meantime.
+    """
+
+    __tablename__ = "automation_builder_run_counters"
+
+    automation_id: Mapped[uuid.UUID] = mapped_column(primary_key=True)
+    event_type: Mapped[str] = mapped_column(String, primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), primary_key=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"), nullable=False)
+    unmatched: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+
+class NoReplyTimer(Base):
+    """A pending ``no_reply_after`` firing for one automation and conversation.
+
+    Armed by the first unanswered inbound message and dropped by the next
+    outbound one; ``ix_no_reply_timers_fire_at`` lets the sweep read only the
+    timers that are due.
+    """
+
+    __tablename__ = "no_reply_timers"
+    __table_args__ = (Index("ix_no_reply_timers_fire_at", "fire_at"),)
+
+    automation_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("automation_builder_automations.id", ondelete="CASCADE"), primary_key=True
+    )
+    conversation_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"), nullable=False)
+    message_id: Mapped[uuid.UUID] = mapped_column(nullable=False)
+    fire_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+
+
 # Explicitly define indexes for contacts
 Index("ix_contacts_user_handle", Contact.user_id, Contact.handle)
@@ -1,17 +1,23 @@
+import signal
 import uuid
 
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
-from core.config import get_settings
+from core.config import get_settings, reload_settings
 from core.errors import setup_exception_handlers
 from core.logging import setup_logging
-from core.security import TokenError, decode_token
-from db.models import AuditLog
-from db.session import SessionLocal
 from services.ai import get_ai_provider
+from services.audit import audit_writer
+from services.automation_run_log import run_log_writer
+from services.automation.delivery import delivery_engine, http_sessions
+from services.automation.destination_cache import destination_cache_listener
 from services.automation.scheduler import create_scheduler
+from services.webhooks.pipeline import ingestion_pipeline
+from api.deps import request_user_id
 from api.routers import (
+    admin,
     ai,
     automations,
     automation_builder,
@@ -44,6 +50,8 @@ app.add_middleware(
     allow_credentials=allow_credentials,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Keyset pages hand their cursors back in headers; browsers hide them from other origins otherwise.
+    expose_headers=["X-Next-Cursor", "X-Before-Cursor", "X-After-Cursor"],
 )
 
 
@@ -58,12 +66,9 @@ async def audit_log_middleware(request: Request, call_next):
     if auth_header.lower().startswith("bearer "):
         token = auth_header.split(" ", 1)[1]
 
-    if not token:
-        return response
-
-    try:
-        user_id = decode_token(token, expected_type="access")
-    except TokenError:
+    # Reuses the decode done by get_current_user for this request, if any.
+    user_id = request_user_id(request, token)
+    if not user_id:
         return response
 
     conversation_id = None
@@ -77,32 +82,44 @@ async def audit_log_middleware(request: Request, call_next):
         if len(segments) > idx + 1:
             conversation_id = segments[idx + 1]
 
-    db = SessionLocal()
-    try:
-        if conversation_id:
-            try:
-                conversation_id = uuid.UUID(conversation_id)
-            except ValueError:
-                conversation_id = None
-        db.add(
-            AuditLog(
-                user_id=user_id,
-                action=f"{request.method} {request.url.path}",
-                conversation_id=conversation_id,
-            )
-        )
-        db.commit()
-    finally:
-        db.close()
+    if conversation_id:
+        try:
+            conversation_id = uuid.UUID(conversation_id)
+        except ValueError:
+            conversation_id = None
+    action = f"{request.method} {request.url.path}"
+    if not audit_writer.offer(user_id, action, conversation_id):
+        # Buffer full: wait for the writer off the event loop.
+        await run_in_threadpool(audit_writer.record, user_id, action, conversation_id)
 
     return response
 
 
+def _reload_settings_on_sighup(*_args) -> None:
+    reload_settings()
+
+
 @app.on_event("startup")
 def startup_event():
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, _reload_settings_on_sighup)
     scheduler = create_scheduler()
     scheduler.start()
     app.state.ai_provider = get_ai_provider()
+    audit_writer.start()
+    destination_cache_listener.start()
+    if settings.ingest_pipeline_enabled:
+        ingestion_pipeline.start()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    ingestion_pipeline.stop()
+    destination_cache_listener.stop()
+    delivery_engine.stop()
+    http_sessions.close()
+    audit_writer.stop()
+    run_log_writer.stop()
 
 
 @app.get("/health")
@@ -111,6 +128,7 @@ def health():
 
 
 api_prefix = "/api/v1"
+app.include_router(admin.router, prefix=api_prefix)
 app.include_router(auth.router, prefix=api_prefix)
 app.include_router(me.router, prefix=api_prefix)
 app.include_router(automations.router, prefix=api_prefix)
@@ -0,0 +1,62 @@
+"""Buffered audit log writer.
+
+Request handlers and deliveries hand audit entries to an in-memory queue and
+return immediately; a background thread writes them to ``audit_logs`` with one
+multi-row INSERT per batch, whenever ``AUDIT_FLUSH_BATCH_SIZE`` entries are
+waiting or ``AUDIT_FLUSH_INTERVAL_SECONDS`` has passed. When the queue is full
+``record`` blocks until the writer catches up, so a slow database pushes back on
+producers instead of growing memory without bound.
+"""
+
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from db.models import AuditLog
+from services.buffered_writer import BufferedWriter
+
+
+class AuditWriter(BufferedWriter):
+    name = "audit-writer"
+
+    def __init__(
+        self,
+        max_buffer: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        session_factory=None,
+    ) -> None:
+        settings = get_settings()
+        super().__init__(
+            max_buffer=max_buffer or settings.audit_buffer_size,
+            batch_size=batch_size or settings.audit_flush_batch_size,
+            flush_interval=flush_interval if flush_interval is not None else settings.audit_flush_interval_seconds,
+            session_factory=session_factory,
+        )
+
+    def entry(self, user_id, action: str, conversation_id=None) -> dict:
+        return {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "action": action,
+            "conversation_id": conversation_id,
+            "timestamp": datetime.utcnow(),
+        }
+
+    def offer(self, user_id, action: str, conversation_id=None) -> bool:
+        """Buffer an entry without blocking; False means the buffer is full."""
+        return self.put_nowait(self.entry(user_id, action, conversation_id))
+
+    def record(self, user_id, action: str, conversation_id=None) -> None:
+        """Buffer an entry, waiting for room if the writer is behind."""
+        self.put(self.entry(user_id, action, conversation_id))
+
+    def write(self, db: Session, batch: list[dict]) -> None:
+        db.execute(insert(AuditLog).values(batch))
+
+
+audit_writer = AuditWriter()
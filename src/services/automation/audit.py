@@ -3,7 +3,7 @@ from typing import Optional
 
 from sqlalchemy.orm import Session
 
-from db.models import AuditLog
+from services.audit import audit_writer
 
 
 def record_automation_audit(
@@ -25,14 +25,4 @@ def record_automation_audit(
         except ValueError:
             convo_uuid = None
 
-    if not hasattr(db, "add"):
-        return
-
-    db.add(
-        AuditLog(
-            user_id=user_id,
-            action=f"{action}{suffix}",
-            conversation_id=convo_uuid,
-        )
-    )
-    db.commit()
+    audit_writer.record(user_id, f"{action}{suffix}", convo_uuid)
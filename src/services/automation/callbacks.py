@@ -1,6 +1,7 @@
 import hashlib
 import json
 import os
+import uuid
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional
 
@@ -19,6 +20,7 @@ from db.models import (
     Task,
 )
 from services.automation.publisher import publish_event
+from services.inbox import record_last_message
 from services.automation.signing import (
     decode_signature_header,
     is_timestamp_within_window,
@@ -126,8 +128,6 @@ def execute_action(db: Session, tenant_id: str, action: str, payload: dict) -> D
         except IntegrityError:
             return {"skipped": "duplicate_source_event"}
 
-        db.commit()
-        db.refresh(task)
         publish_event(
             db,
             tenant_id,
@@ -135,6 +135,8 @@ def execute_action(db: Session, tenant_id: str, action: str, payload: dict) -> D
             {"task_id": str(task.id), "conversation_id": task.conversation_id, "title": task.title},
             source_event_id=str(task.id),
         )
+        db.commit()
+        db.refresh(task)
         return {"task_id": str(task.id)}
 
     if action == "update_conversation_status":
@@ -148,7 +150,6 @@ def execute_action(db: Session, tenant_id: str, action: str, payload: dict) -> D
         if not convo:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
         convo.status = status_value
-        db.commit()
         publish_event(
             db,
             tenant_id,
@@ -160,6 +161,7 @@ def execute_action(db: Session, tenant_id: str, action: str, payload: dict) -> D
             },
             source_event_id=f"{convo.id}:{convo.status}",
         )
+        db.commit()
         return {"conversation_id": str(convo.id), "status": convo.status}
 
     if action == "add_internal_comment":
@@ -193,15 +195,15 @@ def execute_action(db: Session, tenant_id: str, action: str, payload: dict) -> D
         if not convo:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
         message = Message(
+            id=uuid.uuid4(),
             conversation_id=convo.id,
+            user_id=convo.user_id,
             direction="outbound",
             body=text,
             raw_payload={"source": "automation"},
         )
-        convo.last_message_at = datetime.now(timezone.utc)
+        record_last_message(convo, message)
         db.add(message)
-        db.commit()
-        db.refresh(message)
         publish_event(
             db,
             tenant_id,
@@ -214,6 +216,7 @@ def execute_action(db: Session, tenant_id: str, action: str, payload: dict) -> D
             },
             source_event_id=str(message.id),
         )
+        db.commit()
         return {"message_id": str(message.id)}
 
     if action == "update_contact":
@@ -229,7 +232,6 @@ def execute_action(db: Session, tenant_id: str, action: str, payload: dict) -> D
         for field, value in fields.items():
             if hasattr(contact, field):
                 setattr(contact, field, value)
-        db.commit()
         publish_event(
             db,
             tenant_id,
@@ -240,6 +242,7 @@ def execute_action(db: Session, tenant_id: str, action: str, payload: dict) -> D
             },
             source_event_id=f"{contact.id}:{hashlib.sha256(json.dumps(fields, sort_keys=True).encode('utf-8')).hexdigest()}",
         )
+        db.commit()
         return {"contact_id": str(contact.id)}
 
     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported action")
@@ -0,0 +1,99 @@
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from db.models import AutomationDestination
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def with_jitter(seconds: float, spread: float = 0.2) -> float:
+    return seconds * random.uniform(1 - spread, 1 + spread)
+
+
+def circuit_state(destination: AutomationDestination, now: Optional[datetime] = None) -> str:
+    failures = getattr(destination, "circuit_failures", 0) or 0
+    if failures < get_settings().automation_circuit_failure_threshold:
+        return CLOSED
+    open_until = getattr(destination, "circuit_open_until", None)
+    if open_until and open_until > (now or datetime.now(timezone.utc)):
+        return OPEN
+    return HALF_OPEN
+
+
+def open_duration(failures: int) -> timedelta:
+    settings = get_settings()
+    # Each failed probe doubles how long the circuit stays open, up to the cap.
+    exponent = max(failures - settings.automation_circuit_failure_threshold, 0)
+    seconds = min(settings.automation_circuit_open_seconds * 2 ** exponent, settings.automation_circuit_max_open_seconds)
+    return timedelta(seconds=with_jitter(seconds))
+
+
+def acquire(db: Session, destination: AutomationDestination) -> bool:
+    """Return whether a delivery to ``destination`` may be attempted now.
+
+    In the half-open state only one worker wins the probe: it pushes
+    ``circuit_open_until`` forward so everyone else still sees the circuit open.
+    """
+    state = circuit_state(destination)
+    if state == CLOSED:
+        return True
+    if state == OPEN:
+        return False
+    now = datetime.now(timezone.utc)
+    probe_until = now + timedelta(seconds=get_settings().automation_default_timeout_seconds * 2)
+    won = db.execute(
+        update(AutomationDestination)
+        .where(
+            AutomationDestination.id == destination.id,
+            or_(AutomationDestination.circuit_open_until.is_(None), AutomationDestination.circuit_open_until <= now),
+        )
+        .values(circuit_open_until=probe_until)
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+    db.commit()
+    if not won:
+        destination.circuit_open_until = probe_until
+    return won
+
+
+def record_success(db: Session, destination: AutomationDestination) -> None:
+    if not getattr(destination, "circuit_failures", 0):
+        return
+    db.execute(
+        update(AutomationDestination)
+        .where(AutomationDestination.id == destination.id)
+        .values(circuit_failures=0, circuit_open_until=None)
+        .execution_options(synchronize_session=False)
+    )
+    destination.circuit_failures = 0
+    destination.circuit_open_until = None
+
+
+def record_failure(db: Session, destination: AutomationDestination) -> Optional[datetime]:
+    """Count a failed attempt and return the reopen time if the circuit is (still) open."""
+    failures = db.execute(
+        update(AutomationDestination)
+        .where(AutomationDestination.id == destination.id)
+        .values(circuit_failures=AutomationDestination.circuit_failures + 1)
+        .returning(AutomationDestination.circuit_failures)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+    destination.circuit_failures = failures
+    if failures < get_settings().automation_circuit_failure_threshold:
+        return None
+    open_until = datetime.now(timezone.utc) + open_duration(failures)
+    db.execute(
+        update(AutomationDestination)
+        .where(AutomationDestination.id == destination.id)
+        .values(circuit_open_until=open_until)
+        .execution_options(synchronize_session=False)
+    )
+    destination.circuit_open_until = open_until
+    return open_until
@@ -0,0 +1,135 @@
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Hashable, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.config import get_settings
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class HostSessionPool:
+    """Keep-alive HTTP sessions shared by every delivery to the same origin."""
+
+    def __init__(self, pool_maxsize: Optional[int] = None) -> None:
+        self._pool_maxsize = pool_maxsize
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, url: str) -> requests.Session:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            session = self._sessions.get(origin)
+            if session is None:
+                pool_maxsize = self._pool_maxsize or get_settings().automation_http_pool_maxsize
+                session = requests.Session()
+                session.mount(f"{origin}/", HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize))
+                self._sessions[origin] = session
+        return session
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.session_for(url).post(url, **kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+class DeliveryEngine:
+    """Bounded worker pool that caps in-flight work per destination.
+
+    Tasks for a destination that is already at its concurrency limit wait in a
+    per-destination queue instead of occupying a worker.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._inflight: Dict[Hashable, int] = defaultdict(int)
+        self._waiting: Dict[Hashable, Deque[tuple[Hashable, Callable[[], None]]]] = defaultdict(deque)
+        self._pending: set = set()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._completed = 0
+        self._failed = 0
+
+    @property
+    def workers(self) -> int:
+        return self._max_workers if self._max_workers is not None else get_settings().automation_delivery_workers
+
+    def start(self) -> None:
+        with self._lock:
+            if self._executor is None and self.workers > 0:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="automation-delivery")
+
+    def submit(self, key: Hashable, task_id: Hashable, fn: Callable[[], None], limit: int) -> bool:
+        """Schedule ``fn`` under ``key``'s concurrency limit; returns False if ``task_id`` is already queued."""
+        self.start()
+        with self._lock:
+            if task_id in self._pending:
+                return False
+            self._pending.add(task_id)
+            if self._inflight[key] < max(limit, 1):
+                self._inflight[key] += 1
+                self._executor.submit(self._run, key, task_id, fn)
+            else:
+                self._waiting[key].append((task_id, fn))
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def stop(self, timeout: Optional[float] = 30.0) -> None:
+        self.wait(timeout)
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": len(self._pending),
+                "in_flight": sum(self._inflight.values()),
+                "waiting": sum(len(queue) for queue in self._waiting.values()),
+                "completed": self._completed,
+                "failed": self._failed,
+            }
+
+    def _run(self, key: Hashable, task_id: Hashable, fn: Callable[[], None]) -> None:
+        failed = False
+        try:
+            fn()
+        except Exception:
+            failed = True
+            logger.exception("Automation delivery task failed", extra={"task_id": str(task_id)})
+        with self._lock:
+            self._pending.discard(task_id)
+            self._completed += 1
+            self._failed += int(failed)
+            queue = self._waiting.get(key)
+            if queue:
+                next_id, next_fn = queue.popleft()
+                self._executor.submit(self._run, key, next_id, next_fn)
+            else:
+                self._waiting.pop(key, None)
+                self._inflight[key] -= 1
+                if not self._inflight[key]:
+                    del self._inflight[key]
+            if not self._pending:
+                self._idle.notify_all()
+
+
+http_sessions = HostSessionPool()
+delivery_engine = DeliveryEngine()
@@ -0,0 +1,184 @@
+"""Per-tenant routing table of enabled automation destinations.
+
+``publish_event`` runs several times per inbound message, while destinations
+change only when a tenant edits them. Each tenant's enabled destinations are
+kept in memory, indexed by event type, and dropped whenever a destination row is
+written: locally right away and in every other process through
+``NOTIFY automation_destinations``. The TTL bounds staleness if a notification
+is missed.
+"""
+
+import select
+import threading
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy import select as sa_select
+from sqlalchemy.orm import Session
+
+from core.cache import LRUCache
+from core.config import get_settings
+from core.logging import get_logger
+from db.models import AutomationDestination
+
+logger = get_logger(__name__)
+
+DESTINATIONS_CHANNEL = "automation_destinations"
+ROUTED_FIELDS = ("user_id", "enabled", "event_types", "batch_enabled", "batch_linger_seconds", "max_concurrency")
+
+
+@dataclass(frozen=True)
+class DestinationRoute:
+    """What publishing needs to enqueue and dispatch; delivery workers load the full row."""
+
+    id: uuid.UUID
+    batch_enabled: bool = False
+    batch_linger_seconds: float = 0
+    max_concurrency: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class TenantRoutes:
+    by_type: dict = field(default_factory=dict)
+    wildcard: tuple = ()
+
+    def for_event(self, event_type: str) -> tuple:
+        return self.by_type.get(event_type, self.wildcard)
+
+
+def build_routes(rows) -> TenantRoutes:
+    by_type: dict[str, list] = {}
+    wildcard = []
+    for row in rows:
+        route = DestinationRoute(
+            row.id, bool(row.batch_enabled), float(row.batch_linger_seconds or 0), row.max_concurrency
+        )
+        event_types = row.event_types or []
+        if "*" in event_types:
+            wildcard.append(route)
+            continue
+        for event_type in dict.fromkeys(event_types):
+            by_type.setdefault(event_type, []).append(route)
+    # Wildcard destinations are folded into every explicit type, so a lookup is a single dict hit.
+    return TenantRoutes(
+        by_type={event_type: tuple(routes + wildcard) for event_type, routes in by_type.items()},
+        wildcard=tuple(wildcard),
+    )
+
+
+class DestinationCache:
+    def __init__(self, maxsize: Optional[int] = None, ttl_seconds: Optional[float] = None) -> None:
+        settings = get_settings()
+        maxsize = maxsize or settings.automation_destination_cache_size
+        ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.automation_destination_cache_ttl_seconds
+        self.tenants = LRUCache(maxsize, ttl_seconds)
+
+    def routes(self, db: Session, tenant_id) -> TenantRoutes:
+        key = str(tenant_id)
+        cached = self.tenants.get(key)
+        if cached is not None:
+            return cached
+        rows = (
+            db.query(
+                AutomationDestination.id,
+                AutomationDestination.event_types,
+                AutomationDestination.batch_enabled,
+                AutomationDestination.batch_linger_seconds,
+                AutomationDestination.max_concurrency,
+            )
+            .filter(AutomationDestination.user_id == tenant_id, AutomationDestination.enabled == True)
+            .all()
+        )
+        # Tenants without destinations are cached too: they are the common case.
+        routes = build_routes(rows)
+        self.tenants.set(key, routes)
+        return routes
+
+    def invalidate(self, tenant_id) -> None:
+        self.tenants.pop(str(tenant_id))
+
+    def clear(self) -> None:
+        self.tenants.clear()
+
+
+destination_cache = DestinationCache()
+
+
+class DestinationCacheListener:
+    """Background LISTEN on ``automation_destinations`` for changes made by other processes."""
+
+    def __init__(self, cache: DestinationCache = destination_cache) -> None:
+        self.cache = cache
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="destination-cache-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def handle(self, payload: str) -> None:
+        if payload:
+            self.cache.invalidate(payload)
+        else:
+            self.cache.clear()
+
+    def _run(self) -> None:
+        from db.session import engine
+
+        while not self._stopping.is_set():
+            connection = None
+            try:
+                connection = engine.raw_connection()
+                connection.driver_connection.autocommit = True
+                cursor = connection.cursor()
+                cursor.execute(f"LISTEN {DESTINATIONS_CHANNEL}")
+                cursor.close()
+                # Anything could have changed while we were not listening.
+                self.cache.clear()
+                driver = connection.driver_connection
+                while not self._stopping.is_set():
+                    readable, _, _ = select.select([driver], [], [], 1.0)
+                    if not readable:
+                        continue
+                    driver.poll()
+                    while driver.notifies:
+                        self.handle(driver.notifies.pop(0).payload)
+            except Exception:
+                logger.warning("Destination cache listener disconnected, relying on TTL", exc_info=True)
+                self._stopping.wait(5)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+
+destination_cache_listener = DestinationCacheListener()
+
+
+def _notify_destination_change(connection, target: AutomationDestination) -> None:
+    destination_cache.invalidate(target.user_id)
+    # Sent on the flushing transaction, so other processes only hear about committed changes.
+    connection.execute(sa_select(func.pg_notify(DESTINATIONS_CHANNEL, str(target.user_id))))
+
+
+@event.listens_for(AutomationDestination, "after_insert")
+@event.listens_for(AutomationDestination, "after_delete")
+def _destination_written(mapper, connection, target: AutomationDestination) -> None:
+    _notify_destination_change(connection, target)
+
+
+@event.listens_for(AutomationDestination, "after_update")
+def _destination_updated(mapper, connection, target: AutomationDestination) -> None:
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ROUTED_FIELDS):
+        _notify_destination_change(connection, target)
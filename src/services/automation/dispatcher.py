@@ -0,0 +1,84 @@
+"""Standalone outbox dispatcher.
+
+Run with ``python -m services.automation.dispatcher`` next to the API when
+``AUTOMATION_OUTBOX_ENABLED=true``. It drains ``automation_deliveries`` through
+the delivery engine and wakes up on ``NOTIFY automation_outbox`` as soon as a
+publishing transaction commits, falling back to polling.
+"""
+
+import select
+import signal
+import threading
+from typing import Optional
+
+from core.config import get_settings, reload_settings
+from core.logging import get_logger, setup_logging
+from db.session import engine
+from services.audit import audit_writer
+from services.automation.delivery import delivery_engine, http_sessions
+from services.automation.publisher import OUTBOX_CHANNEL, process_pending_deliveries
+
+logger = get_logger(__name__)
+
+
+class OutboxDispatcher:
+    def __init__(self, poll_seconds: Optional[float] = None) -> None:
+        self.poll_seconds = poll_seconds if poll_seconds is not None else get_settings().automation_dispatcher_poll_seconds
+        self._stopping = threading.Event()
+        self._listener = None
+
+    def stop(self, *_args) -> None:
+        self._stopping.set()
+
+    def run(self) -> None:
+        self._listener = self._listen()
+        logger.info("Automation outbox dispatcher started", extra={"listening": self._listener is not None})
+        try:
+            while not self._stopping.is_set():
+                try:
+                    process_pending_deliveries()
+                except Exception:
+                    logger.exception("Outbox sweep failed")
+                self._wait_for_work()
+        finally:
+            if self._listener is not None:
+                self._listener.close()
+            delivery_engine.stop()
+            http_sessions.close()
+            audit_writer.stop()
+
+    def _listen(self):
+        try:
+            connection = engine.raw_connection()
+            connection.driver_connection.autocommit = True
+            cursor = connection.cursor()
+            cursor.execute(f"LISTEN {OUTBOX_CHANNEL}")
+            cursor.close()
+            return connection
+        except Exception:
+            logger.warning("LISTEN unavailable, dispatcher will poll", exc_info=True)
+            return None
+
+    def _wait_for_work(self) -> None:
+        if self._listener is None:
+            self._stopping.wait(self.poll_seconds)
+            return
+        driver = self._listener.driver_connection
+        readable, _, _ = select.select([driver], [], [], self.poll_seconds)
+        if readable:
+            driver.poll()
+            driver.notifies.clear()
+
+
+def main() -> None:
+    setup_logging(get_settings().log_level)
+    dispatcher = OutboxDispatcher()
+    signal.signal(signal.SIGTERM, dispatcher.stop)
+    signal.signal(signal.SIGINT, dispatcher.stop)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda *_args: reload_settings())
+    dispatcher.run()
+
+
+if __name__ == "__main__":
+    main()
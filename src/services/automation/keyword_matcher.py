@@ -0,0 +1,133 @@
+"""One-pass keyword matching for rules and builder ``contains_text`` conditions.
+
+Each tenant's active rule keywords and the ``contains_text`` needles of its
+enabled ``message.ingested`` automations are compiled into a single
+Aho-Corasick automaton. A message is lowercased and scanned once, and the scan
+reports every needle found together with the rules and automations that own
+them. The automaton is rebuilt after :meth:`KeywordIndex.invalidate`, which the
+rules and builder APIs call on every write, or when the TTL runs out.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Hashable, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from core.cache import LRUCache
+from core.config import get_settings
+from db.models import Rule
+from services.automation_builder import flow_registry
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over lowercase needles; substring semantics, like ``in``."""
+
+    def __init__(self, needles: Iterable[str]) -> None:
+        unique = set(needles)
+        # "" is in every string.
+        self.always = frozenset({""}) if "" in unique else frozenset()
+        self._goto: list[dict[str, int]] = [{}]
+        outputs: list[set[str]] = [set()]
+        for needle in unique:
+            if not needle:
+                continue
+            state = 0
+            for char in needle:
+                following = self._goto[state].get(char)
+                if following is None:
+                    following = len(self._goto)
+                    self._goto[state][char] = following
+                    self._goto.append({})
+                    outputs.append(set())
+                state = following
+            outputs[state].add(needle)
+
+        self._fail = [0] * len(self._goto)
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, following in self._goto[state].items():
+                pending.append(following)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[following] = self._goto[fallback].get(char, 0)
+                outputs[following] |= outputs[self._fail[following]]
+        self._output = [frozenset(found) for found in outputs]
+
+    def find(self, text: str) -> frozenset[str]:
+        """Every needle that occurs in ``text``, which must already be lowercase."""
+        goto, fail, output = self._goto, self._fail, self._output
+        found: set[str] = set(self.always)
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return frozenset(found)
+
+
+@dataclass(frozen=True)
+class KeywordHits:
+    needles: frozenset
+    indexed: frozenset
+    rule_ids: frozenset
+    automation_ids: frozenset
+
+
+class TenantKeywords:
+    def __init__(self, owners: dict[str, set[tuple[str, Hashable]]]) -> None:
+        self.owners = owners
+        self.indexed = frozenset(owners)
+        self.matcher = KeywordMatcher(owners)
+
+    def scan(self, text: Optional[str]) -> KeywordHits:
+        needles = self.matcher.find((text or "").lower()) if self.owners else frozenset()
+        rule_ids: set = set()
+        automation_ids: set = set()
+        for needle in needles:
+            for kind, owner_id in self.owners[needle]:
+                (rule_ids if kind == "rule" else automation_ids).add(owner_id)
+        return KeywordHits(needles, self.indexed, frozenset(rule_ids), frozenset(automation_ids))
+
+
+def build_keywords(rules, flows) -> TenantKeywords:
+    owners: dict[str, set[tuple[str, Hashable]]] = {}
+    for rule in rules:
+        for keyword in (rule.compiled_json or {}).get("keywords", []):
+            owners.setdefault(str(keyword).lower(), set()).add(("rule", rule.id))
+    for flow in flows:
+        for condition in flow.conditions:
+            if condition.spec.get("type") == "contains_text":
+                owners.setdefault(condition.spec["text"].lower(), set()).add(("automation", flow.automation_id))
+    return TenantKeywords(owners)
+
+
+class KeywordIndex:
+    def __init__(self, maxsize: Optional[int] = None, ttl_seconds: Optional[float] = None) -> None:
+        settings = get_settings()
+        maxsize = maxsize or settings.automation_flow_cache_size
+        ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.automation_flow_cache_ttl_seconds
+        self.tenants = LRUCache(maxsize, ttl_seconds)
+
+    def for_tenant(self, db: Session, tenant_id) -> TenantKeywords:
+        key = str(tenant_id)
+        cached = self.tenants.get(key)
+        if cached is not None:
+            return cached
+        rules = db.query(Rule.id, Rule.compiled_json).filter(Rule.user_id == tenant_id, Rule.active == True).all()
+        keywords = build_keywords(rules, flow_registry.flows(db, tenant_id, "message.ingested"))
+        self.tenants.set(key, keywords)
+        return keywords
+
+    def invalidate(self, tenant_id) -> None:
+        self.tenants.pop(str(tenant_id))
+
+    def clear(self) -> None:
+        self.tenants.clear()
+
+
+keyword_index = KeywordIndex()
@@ -0,0 +1,170 @@
+"""Timers behind the ``no_reply_after`` builder trigger.
+
+The first inbound message of an unanswered stretch arms one ``no_reply_timers``
+row per enabled ``no_reply_after`` automation of the tenant, due ``minutes``
+later; the next outbound message drops the conversation's timers. Both happen
+in an ``after_flush`` hook, so every path that writes messages (webhooks, the
+messages API, automation callbacks) keeps the timers in step, in the same
+transaction. A scheduler job claims the due timers through
+``ix_no_reply_timers_fire_at`` every minute and runs their automations, so the
+work done follows the number of armed timers rather than of conversations.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import Float, TIMESTAMP, Uuid, and_, case, column, delete, event, func, select, tuple_, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from core.logging import get_logger
+from db.models import AutomationBuilderAutomation, Conversation, Message, NoReplyTimer
+from services.automation_builder import run_enabled_automations
+
+logger = get_logger(__name__)
+
+TRIGGER = "no_reply_after"
+
+
+def arm_statement(armed: list[dict]):
+    """Insert a timer per (conversation, ``no_reply_after`` automation); an armed timer keeps its time."""
+    rows = values(
+        column("conversation_id", Uuid),
+        column("message_id", Uuid),
+        column("armed_at", TIMESTAMP(timezone=True)),
+        name="armed",
+    ).data([(row["conversation_id"], row["message_id"], row["armed_at"]) for row in armed])
+    value = AutomationBuilderAutomation.flow_json["trigger"]["params"]["minutes"]
+    # CASE keeps the cast from ever seeing a non-number, whatever order the planner picks.
+    minutes = case((func.jsonb_typeof(value) == "number", value.astext.cast(Float)))
+    due = (
+        select(
+            AutomationBuilderAutomation.id,
+            rows.c.conversation_id,
+            AutomationBuilderAutomation.user_id,
+            rows.c.message_id,
+            rows.c.armed_at + func.make_interval(0, 0, 0, 0, 0, 0, minutes * 60),
+        )
+        .select_from(rows)
+        .join(Conversation, Conversation.id == rows.c.conversation_id)
+        .join(
+            AutomationBuilderAutomation,
+            and_(
+                AutomationBuilderAutomation.user_id == Conversation.user_id,
+                AutomationBuilderAutomation.trigger_type == TRIGGER,
+                AutomationBuilderAutomation.enabled == True,
+            ),
+        )
+        .where(minutes > 0)
+    )
+    return (
+        insert(NoReplyTimer)
+        .from_select(["automation_id", "conversation_id", "user_id", "message_id", "fire_at"], due)
+        .on_conflict_do_nothing(index_elements=["automation_id", "conversation_id"])
+    )
+
+
+def cancel_statement(conversation_ids):
+    return delete(NoReplyTimer).where(NoReplyTimer.conversation_id.in_(conversation_ids))
+
+
+@event.listens_for(Session, "after_flush")
+def _track_replies(session: Session, flush_context) -> None:
+    latest: dict = {}
+    replied: set = set()
+    for message in session.new:
+        if not isinstance(message, Message) or message.conversation_id is None:
+            continue
+        if message.direction == "outbound":
+            replied.add(message.conversation_id)
+        current = latest.get(message.conversation_id)
+        if current is None or message.created_at >= current.created_at:
+            latest[message.conversation_id] = message
+    if not latest:
+        return
+
+    armed = [
+        {"conversation_id": message.conversation_id, "message_id": message.id, "armed_at": message.created_at}
+        for message in latest.values()
+        if message.direction == "inbound"
+    ]
+    if replied:
+        session.connection().execute(cancel_statement(replied))
+    if armed:
+        session.connection().execute(arm_statement(armed))
+
+
+def claim_statement(now: datetime, limit: int):
+    due = (
+        select(NoReplyTimer.automation_id, NoReplyTimer.conversation_id)
+        .where(NoReplyTimer.fire_at <= now)
+        .order_by(NoReplyTimer.fire_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return (
+        delete(NoReplyTimer)
+        .where(tuple_(NoReplyTimer.automation_id, NoReplyTimer.conversation_id).in_(due))
+        .returning(
+            NoReplyTimer.automation_id,
+            NoReplyTimer.conversation_id,
+            NoReplyTimer.user_id,
+            NoReplyTimer.message_id,
+            NoReplyTimer.fire_at,
+        )
+    )
+
+
+def fire_due_timers(db: Session, now: Optional[datetime] = None, limit: Optional[int] = None) -> int:
+    """Claim up to ``limit`` due timers and run their automations; returns how many were claimed.
+
+    Claimed timers are deleted and committed before any automation runs, so a
+    timer fires at most once even when several workers sweep at the same time.
+    """
+    now = now or datetime.now(timezone.utc)
+    limit = limit or get_settings().no_reply_timer_batch_size
+    timers = db.execute(claim_statement(now, limit)).all()
+    db.commit()
+    if not timers:
+        return 0
+
+    messages = {
+        row.id: row
+        for row in db.execute(
+            select(Message.id, Message.body, Message.created_at, Conversation.contact_id)
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(Message.id.in_({timer.message_id for timer in timers}))
+        ).all()
+    }
+    grouped: dict[tuple, list] = defaultdict(list)
+    for timer in timers:
+        grouped[(timer.user_id, timer.conversation_id, timer.message_id)].append(timer)
+
+    for (user_id, conversation_id, message_id), due in grouped.items():
+        message = messages.get(message_id)
+        body = message.body if message else ""
+        payload = {
+            "conversation_id": str(conversation_id),
+            "contact_id": str(message.contact_id) if message else None,
+            "message_id": str(message_id),
+            "message": {"id": str(message_id), "text": body},
+            "body": body,
+            "last_inbound_at": message.created_at.isoformat() if message else None,
+        }
+        try:
+            run_enabled_automations(
+                db=db,
+                user_id=user_id,
+                event_type=TRIGGER,
+                event_payload=payload,
+                source_event_id=f"{TRIGGER}:{message_id}",
+                automation_ids={timer.automation_id for timer in due},
+            )
+        except Exception:
+            # The failed run is already logged with its error; keep firing the rest of the batch.
+            logger.exception("no_reply_after automation failed", extra={"conversation_id": str(conversation_id)})
+    return len(timers)
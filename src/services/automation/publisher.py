@@ -1,32 +1,54 @@
 import json
+import uuid
+from collections import defaultdict
 from datetime import datetime, timedelta, timezone
+from functools import partial
 from typing import Iterable, Optional
 
-import requests
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy import exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from core.config import get_settings
 from db.models import AutomationDelivery, AutomationDestination, AutomationEvent
 from db.session import SessionLocal
+from services.automation import circuit_breaker
 from services.automation.audit import record_automation_audit
+from services.automation.delivery import delivery_engine, http_sessions
+from services.automation.destination_cache import DestinationRoute, destination_cache
 from services.automation.rate_limit import rate_limiter
 from services.automation.signing import resolve_destination_secret, sign_payload
 
 RETRY_BACKOFF_SECONDS = [60, 300, 900, 3600, 21600]
+OUTBOX_CHANNEL = "automation_outbox"
+
+
+def batch_linger(destination: AutomationDestination) -> Optional[timedelta]:
+    if not destination.batch_enabled:
+        return None
+    return timedelta(seconds=float(destination.batch_linger_seconds or 0))
+
+
+def lease_expiry() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=get_settings().automation_delivery_lease_seconds)
 
 
 def compute_next_retry(attempts: int) -> datetime:
     idx = min(max(attempts - 1, 0), len(RETRY_BACKOFF_SECONDS) - 1)
-    return datetime.now(timezone.utc) + timedelta(seconds=RETRY_BACKOFF_SECONDS[idx])
+    # Jitter keeps retries for one outage from landing on the destination in lockstep.
+    return datetime.now(timezone.utc) + timedelta(seconds=circuit_breaker.with_jitter(RETRY_BACKOFF_SECONDS[idx]))
 
 
-def destination_accepts_event(destination: AutomationDestination, event_type: str) -> bool:
-    if not destination.event_types:
-        return False
-    if "*" in destination.event_types:
-        return True
-    return event_type in destination.event_types
+def retry_after(exc: Exception) -> Optional[datetime]:
+    response = getattr(exc, "response", None)
+    if response is None or response.status_code not in (429, 503):
+        return None
+    try:
+        seconds = float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+    return datetime.now(timezone.utc) + timedelta(seconds=seconds)
 
 
 def create_event(
@@ -37,134 +59,196 @@ def create_event(
     occurred_at: Optional[datetime] = None,
     source_event_id: Optional[str] = None,
 ) -> AutomationEvent:
-    event = AutomationEvent(
-        user_id=tenant_id,
-        type=event_type,
-        payload=payload,
-        occurred_at=occurred_at or datetime.now(timezone.utc),
-        source_event_id=source_event_id,
-    )
-    db.add(event)
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        existing = (
+    """Insert the event and commit it together with the caller's pending changes.
+
+    A repeated ``source_event_id`` is skipped by the unique constraint instead of
+    failing the flush, so the caller's transaction is never rolled back here.
+    """
+    event = db.scalars(
+        insert(AutomationEvent)
+        .values(
+            id=uuid.uuid4(),
+            user_id=tenant_id,
+            type=event_type,
+            payload=payload,
+            occurred_at=occurred_at or datetime.now(timezone.utc),
+            source_event_id=source_event_id,
+        )
+        .on_conflict_do_nothing(constraint="uq_automation_event_source")
+        .returning(AutomationEvent)
+    ).one_or_none()
+    if event is None:
+        event = (
             db.query(AutomationEvent)
             .filter(
                 AutomationEvent.user_id == tenant_id,
                 AutomationEvent.type == event_type,
                 AutomationEvent.source_event_id == source_event_id,
             )
-            .first()
+            .one()
         )
-        if existing:
-            return existing
-        raise
-    db.refresh(event)
+    db.commit()
     return event
 
 
 def enqueue_deliveries(
     db: Session,
     event: AutomationEvent,
-    destinations: Iterable[AutomationDestination],
+    destinations: Iterable[DestinationRoute],
 ) -> list[AutomationDelivery]:
-    deliveries: list[AutomationDelivery] = []
-    for destination in destinations:
-        delivery = AutomationDelivery(
-            user_id=event.user_id,
-            destination_id=destination.id,
-            event_id=event.id,
-            status="pending",
-            attempts=0,
-            next_retry_at=datetime.now(timezone.utc),
-        )
-        delivery.destination = destination
-        delivery.event = event
-        db.add(delivery)
-        try:
-            db.commit()
-        except IntegrityError:
-            db.rollback()
-            continue
-        db.refresh(delivery)
-        deliveries.append(delivery)
-    return deliveries
+    """Create every delivery for ``event`` with one statement and one commit.
 
+    Rows that already exist for an (event, destination) pair are skipped by the
+    unique constraint, so only newly enqueued deliveries are returned. Their
+    ``destination`` is left to load where it is sent.
+    """
+    destinations = {destination.id: destination for destination in destinations}
+    if not destinations:
+        return []
+    now = datetime.now(timezone.utc)
+    lease_token = uuid.uuid4()
+    rows = []
+    for destination in destinations.values():
+        linger = batch_linger(destination)
+        # Created already leased to this process, which dispatches them right away;
+        # batched destinations are left for the sweep to group once the linger passes.
+        rows.append(
+            {
+                "id": uuid.uuid4(),
+                "user_id": event.user_id,
+                "destination_id": destination.id,
+                "event_id": event.id,
+                "status": "pending",
+                "attempts": 0,
+                "next_retry_at": lease_expiry() if linger is None else now + linger,
+                "lease_token": lease_token if linger is None else None,
+            }
+        )
+    deliveries = db.scalars(
+        insert(AutomationDelivery)
+        .values(rows)
+        .on_conflict_do_nothing(constraint="uq_automation_delivery_event_destination")
+        .returning(AutomationDelivery)
+    ).all()
+    db.commit()
+    for delivery in deliveries:
+        set_committed_value(delivery, "event", event)
+    return list(deliveries)
 
-def send_delivery(
-    db: Session,
-    delivery: AutomationDelivery,
-    destination: AutomationDestination,
-    event: AutomationEvent,
-) -> bool:
-    settings = get_settings()
-    if not rate_limiter.allow(str(event.user_id)):
-        delivery.last_error = "rate_limited"
-        delivery.attempts += 1
-        delivery.next_retry_at = compute_next_retry(delivery.attempts)
-        delivery.status = "pending"
-        db.commit()
-        return False
 
-    payload = {
+def _event_envelope(event: AutomationEvent) -> dict:
+    return {
         "event_id": str(event.id),
         "tenant_id": str(event.user_id),
         "occurred_at": event.occurred_at.isoformat(),
         "type": event.type,
         "payload": event.payload,
     }
-    body = json.dumps(payload).encode("utf-8")
+
+
+def _admit(db: Session, deliveries: list[AutomationDelivery], destination: AutomationDestination, tenant_id: str) -> bool:
+    if not circuit_breaker.acquire(db, destination):
+        # Not an attempt: the delivery waits for the circuit instead of burning its retries.
+        for delivery in deliveries:
+            delivery.last_error = "circuit_open"
+            delivery.status = "pending"
+            delivery.next_retry_at = destination.circuit_open_until
+        db.commit()
+        return False
+
+    wait = rate_limiter.check(tenant_id, destination.id)
+    if wait:
+        # Also not an attempt: retry exactly when the next token is due.
+        for delivery in deliveries:
+            delivery.last_error = "rate_limited"
+            delivery.next_retry_at = datetime.now(timezone.utc) + timedelta(seconds=wait)
+            delivery.status = "pending"
+        db.commit()
+        return False
+    return True
+
+
+def _post_signed(
+    db: Session,
+    deliveries: list[AutomationDelivery],
+    destination: AutomationDestination,
+    signed_id: str,
+    tenant_id: str,
+    body: bytes,
+    extra_headers: Optional[dict] = None,
+) -> bool:
+    settings = get_settings()
     timestamp = str(int(datetime.now(timezone.utc).timestamp()))
     secret = resolve_destination_secret(destination)
     if not secret:
-        delivery.attempts += 1
-        delivery.last_error = "missing_secret"
-        delivery.status = "failed"
-        delivery.next_retry_at = None
+        for delivery in deliveries:
+            delivery.attempts += 1
+            delivery.last_error = "missing_secret"
+            delivery.status = "failed"
+            delivery.next_retry_at = None
         db.commit()
         return False
 
     signature = sign_payload(
         secret=secret,
         timestamp=timestamp,
-        event_id=str(event.id),
-        tenant_id=str(event.user_id),
+        event_id=signed_id,
+        tenant_id=tenant_id,
         body=body,
     )
     headers = {
         "Content-Type": "application/json",
         "X-Alfred-Signature": signature,
-        "X-Alfred-Event-Id": str(event.id),
-        "X-Alfred-Tenant-Id": str(event.user_id),
+        "X-Alfred-Event-Id": signed_id,
+        "X-Alfred-Tenant-Id": tenant_id,
         "X-Alfred-Timestamp": timestamp,
+        **(extra_headers or {}),
     }
 
     try:
-        response = requests.post(
+        response = http_sessions.post(
             destination.url,
             data=body,
             headers=headers,
-            timeout=settings.automation_default_timeout_seconds,
+            timeout=(settings.automation_connect_timeout_seconds, settings.automation_default_timeout_seconds),
         )
         response.raise_for_status()
     except Exception as exc:
-        delivery.attempts += 1
-        delivery.last_error = str(exc)
-        if delivery.attempts >= settings.automation_max_attempts:
-            delivery.status = "failed"
-            delivery.next_retry_at = None
-        else:
-            delivery.status = "pending"
-            delivery.next_retry_at = compute_next_retry(delivery.attempts)
+        reopen_at = circuit_breaker.record_failure(db, destination)
+        for delivery in deliveries:
+            delivery.attempts += 1
+            delivery.last_error = str(exc)
+            if delivery.attempts >= settings.automation_max_attempts:
+                delivery.status = "failed"
+                delivery.next_retry_at = None
+            else:
+                delivery.status = "pending"
+                delivery.next_retry_at = max(
+                    moment for moment in (compute_next_retry(delivery.attempts), reopen_at, retry_after(exc)) if moment
+                )
         db.commit()
         return False
 
-    delivery.status = "sent"
-    delivery.last_error = None
-    delivery.next_retry_at = None
+    circuit_breaker.record_success(db, destination)
+    for delivery in deliveries:
+        delivery.status = "sent"
+        delivery.last_error = None
+        delivery.next_retry_at = None
     db.commit()
+    return True
+
+
+def send_delivery(
+    db: Session,
+    delivery: AutomationDelivery,
+    destination: AutomationDestination,
+    event: AutomationEvent,
+) -> bool:
+    if not _admit(db, [delivery], destination, str(event.user_id)):
+        return False
+    body = json.dumps(_event_envelope(event)).encode("utf-8")
+    if not _post_signed(db, [delivery], destination, str(event.id), str(event.user_id), body):
+        return False
     record_automation_audit(
         db,
         user_id=str(event.user_id),
@@ -174,61 +258,287 @@ def send_delivery(
     return True
 
 
+def send_batch(db: Session, deliveries: list[AutomationDelivery], destination: AutomationDestination) -> bool:
+    """POST several pending events to one destination as a single signed request.
+
+    The batch id takes the place of the event id in the signature base string,
+    so receivers verify batches exactly like single events.
+    """
+    tenant_id = str(destination.user_id)
+    if not _admit(db, deliveries, destination, tenant_id):
+        return False
+    batch_id = str(uuid.uuid4())
+    body = json.dumps(
+        {
+            "batch_id": batch_id,
+            "tenant_id": tenant_id,
+            "events": [_event_envelope(delivery.event) for delivery in deliveries],
+        }
+    ).encode("utf-8")
+    headers = {"X-Alfred-Batch-Id": batch_id, "X-Alfred-Batch-Size": str(len(deliveries))}
+    if not _post_signed(db, deliveries, destination, batch_id, tenant_id, body, headers):
+        return False
+    record_automation_audit(
+        db,
+        user_id=tenant_id,
+        action="automation_batch_sent",
+        metadata={"destination_id": str(destination.id), "batch_id": batch_id, "events": len(deliveries)},
+    )
+    return True
+
+
+def stage_event(
+    db: Session,
+    tenant_id: str,
+    event_type: str,
+    payload: dict,
+    destinations: Iterable[AutomationDestination],
+    occurred_at: Optional[datetime] = None,
+    source_event_id: Optional[str] = None,
+) -> Optional[uuid.UUID]:
+    """Write the event and its deliveries into the caller's transaction without committing."""
+    now = datetime.now(timezone.utc)
+    event_id = db.execute(
+        insert(AutomationEvent)
+        .values(
+            id=uuid.uuid4(),
+            user_id=tenant_id,
+            type=event_type,
+            payload=payload,
+            occurred_at=occurred_at or now,
+            source_event_id=source_event_id,
+        )
+        .on_conflict_do_nothing(constraint="uq_automation_event_source")
+        .returning(AutomationEvent.id)
+    ).scalar_one_or_none()
+    if event_id is None:
+        # Already staged by an earlier transaction for the same source event.
+        return None
+    db.execute(
+        insert(AutomationDelivery).values(
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "user_id": tenant_id,
+                    "destination_id": destination.id,
+                    "event_id": event_id,
+                    "status": "pending",
+                    "attempts": 0,
+                    "next_retry_at": now + (batch_linger(destination) or timedelta()),
+                }
+                for destination in destinations
+            ]
+        )
+    )
+    # Delivered to LISTENers only when the caller commits.
+    db.execute(select(func.pg_notify(OUTBOX_CHANNEL, str(event_id))))
+    return event_id
+
+
 def publish_event(
     db: Session,
     tenant_id: str,
     event_type: str,
     payload: dict,
     source_event_id: Optional[str] = None,
-) -> Optional[AutomationEvent]:
+) -> Optional[uuid.UUID]:
     settings = get_settings()
     if not settings.automation_enabled:
         return None
 
-    destinations = (
-        db.query(AutomationDestination)
-        .filter(AutomationDestination.user_id == tenant_id, AutomationDestination.enabled == True)
-        .all()
-    )
-    if not destinations:
+    routes = destination_cache.routes(db, tenant_id).for_event(event_type)
+    if not routes:
         return None
 
-    eligible = [d for d in destinations if destination_accepts_event(d, event_type)]
-    if not eligible:
-        return None
+    if settings.automation_outbox_enabled:
+        return stage_event(db, tenant_id, event_type, payload, routes, source_event_id=source_event_id)
 
     event = create_event(db, tenant_id, event_type, payload, source_event_id=source_event_id)
-    deliveries = enqueue_deliveries(db, event, eligible)
-    for delivery in deliveries:
-        send_delivery(db, delivery, delivery.destination, event)
-    return event
+    deliveries = enqueue_deliveries(db, event, routes)
+    dispatch_deliveries(db, deliveries, routes)
+    return event.id
 
 
-def process_pending_deliveries() -> None:
-    settings = get_settings()
-    if not settings.automation_enabled:
-        return
+def destination_concurrency(destination) -> int:
+    return destination.max_concurrency or get_settings().automation_destination_max_concurrency
+
+
+def claim_due_deliveries(db: Session, limit: int) -> tuple[uuid.UUID, list]:
+    """Lease up to ``limit`` due deliveries to the caller.
+
+    Rows locked by another dispatcher are skipped rather than waited on, and the
+    lease is the pushed-forward ``next_retry_at``: if this worker dies the rows
+    simply come due again once it expires. Destinations with an open circuit are
+    left alone so they never take a worker slot.
+    """
+    lease_token = uuid.uuid4()
+    now = datetime.now(timezone.utc)
+    circuit_open = exists().where(
+        AutomationDestination.id == AutomationDelivery.destination_id,
+        AutomationDestination.circuit_open_until > now,
+    )
+    due = (
+        select(AutomationDelivery.id)
+        .where(
+            AutomationDelivery.status == "pending",
+            AutomationDelivery.next_retry_at <= now,
+            ~circuit_open,
+        )
+        .order_by(AutomationDelivery.next_retry_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = db.execute(
+        update(AutomationDelivery)
+        .where(AutomationDelivery.id.in_(due.scalar_subquery()))
+        .values(next_retry_at=lease_expiry(), lease_token=lease_token)
+        .returning(AutomationDelivery.id, AutomationDelivery.destination_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return lease_token, claimed
+
+
+def renew_lease(db: Session, delivery_id, lease_token) -> bool:
+    renewed = db.execute(
+        update(AutomationDelivery)
+        .where(
+            AutomationDelivery.id == delivery_id,
+            AutomationDelivery.status == "pending",
+            AutomationDelivery.lease_token == lease_token,
+        )
+        .values(next_retry_at=lease_expiry())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return renewed.rowcount == 1
+
 
+def renew_leases(db: Session, delivery_ids: list, lease_token) -> list:
+    renewed = db.execute(
+        update(AutomationDelivery)
+        .where(
+            AutomationDelivery.id.in_(delivery_ids),
+            AutomationDelivery.status == "pending",
+            AutomationDelivery.lease_token == lease_token,
+        )
+        .values(next_retry_at=lease_expiry())
+        .returning(AutomationDelivery.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.commit()
+    return renewed
+
+
+def deliver_pending_batch(delivery_ids: list, lease_token) -> bool:
     db: Session = SessionLocal()
     try:
-        now = datetime.now(timezone.utc)
-        pending = (
+        renewed = renew_leases(db, delivery_ids, lease_token)
+        if not renewed:
+            return False
+        deliveries = (
             db.query(AutomationDelivery)
-            .filter(
-                AutomationDelivery.status == "pending",
-                AutomationDelivery.next_retry_at <= now,
-            )
+            .options(joinedload(AutomationDelivery.event))
+            .filter(AutomationDelivery.id.in_(renewed))
+            .order_by(AutomationDelivery.created_at)
             .all()
         )
-        for delivery in pending:
-            event = delivery.event
-            destination = delivery.destination
-            if not event or not destination or not destination.enabled:
+        destination = db.get(AutomationDestination, deliveries[0].destination_id)
+        if not destination or not destination.enabled:
+            for delivery in deliveries:
                 delivery.status = "failed"
                 delivery.last_error = "missing_destination_or_event"
                 delivery.next_retry_at = None
-                db.commit()
-                continue
-            send_delivery(db, delivery, destination, event)
+            db.commit()
+            return False
+        return send_batch(db, deliveries, destination)
+    finally:
+        db.close()
+
+
+def deliver_pending(delivery_id, lease_token=None) -> bool:
+    db: Session = SessionLocal()
+    try:
+        # Another dispatcher re-claimed the row after our lease ran out while it sat in the queue.
+        if lease_token is not None and not renew_lease(db, delivery_id, lease_token):
+            return False
+        delivery = db.get(AutomationDelivery, delivery_id)
+        if not delivery or delivery.status != "pending":
+            return False
+        event = delivery.event
+        destination = delivery.destination
+        if not event or not destination or not destination.enabled:
+            delivery.status = "failed"
+            delivery.last_error = "missing_destination_or_event"
+            delivery.next_retry_at = None
+            db.commit()
+            return False
+        return send_delivery(db, delivery, destination, event)
+    finally:
+        db.close()
+
+
+def dispatch_deliveries(
+    db: Session, deliveries: Iterable[AutomationDelivery], routes: Iterable[DestinationRoute]
+) -> None:
+    routes = {route.id: route for route in routes}
+    deliveries = [delivery for delivery in deliveries if not routes[delivery.destination_id].batch_enabled]
+    if delivery_engine.workers <= 0:
+        for delivery in deliveries:
+            send_delivery(db, delivery, delivery.destination, delivery.event)
+        return
+    for delivery in deliveries:
+        delivery_engine.submit(
+            delivery.destination_id,
+            delivery.id,
+            partial(deliver_pending, delivery.id, delivery.lease_token),
+            destination_concurrency(routes[delivery.destination_id]),
+        )
+
+
+def process_pending_deliveries() -> None:
+    settings = get_settings()
+    if not settings.automation_enabled:
+        return
+
+    # Only claim what this node can start on before the leases run out.
+    capacity = settings.automation_dispatch_batch_size - delivery_engine.stats()["pending"]
+    if capacity <= 0:
+        return
+
+    db: Session = SessionLocal()
+    try:
+        lease_token, claimed = claim_due_deliveries(db, capacity)
+        claimed_by_destination: dict = defaultdict(list)
+        for delivery_id, destination_id in claimed:
+            claimed_by_destination[destination_id].append(delivery_id)
+        destinations = {}
+        if claimed_by_destination:
+            destinations = {
+                row.id: row
+                for row in db.query(
+                    AutomationDestination.id,
+                    AutomationDestination.max_concurrency,
+                    AutomationDestination.batch_enabled,
+                    AutomationDestination.batch_max_size,
+                )
+                .filter(AutomationDestination.id.in_(list(claimed_by_destination)))
+                .all()
+            }
     finally:
         db.close()
+
+    for destination_id, delivery_ids in claimed_by_destination.items():
+        destination = destinations.get(destination_id)
+        limit = (destination and destination.max_concurrency) or settings.automation_destination_max_concurrency
+        if destination and destination.batch_enabled:
+            size = max(destination.batch_max_size or 1, 1)
+            chunks = [delivery_ids[index : index + size] for index in range(0, len(delivery_ids), size)]
+            tasks = [(tuple(chunk), partial(deliver_pending_batch, chunk, lease_token)) for chunk in chunks]
+        else:
+            tasks = [(delivery_id, partial(deliver_pending, delivery_id, lease_token)) for delivery_id in delivery_ids]
+        for task_id, task in tasks:
+            if delivery_engine.workers <= 0:
+                task()
+                continue
+            delivery_engine.submit(destination_id, task_id, task, limit)
@@ -1,26 +1,191 @@
-from collections import defaultdict, deque
-from datetime import datetime, timezone
-from typing import Deque, Dict
+"""Token-bucket limits on outbound automation requests.
+
+Every tenant, and optionally every destination, owns a bucket that holds up to
+one minute's worth of requests and refills continuously. A bucket is two
+numbers, and one that has been idle for a full minute is indistinguishable from
+a new one, so idle keys are simply dropped. ``AUTOMATION_RATE_LIMIT_BACKEND``
+picks where buckets live: ``memory`` (per process) or ``postgres`` (shared by
+every replica through ``automation_rate_buckets``).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Callable
+
+from sqlalchemy import case, delete, func, update
+from sqlalchemy.dialects.postgresql import insert
 
 from core.config import get_settings
+from db.models import AutomationRateBucket
+
+# Buckets hold a minute of budget, so after this long untouched they are full again.
+REFILL_WINDOW_SECONDS = 60
+
+
+class MemoryBucketStore:
+    def __init__(self, maxsize: int = 100000, clock: Callable[[], float] = time.monotonic) -> None:
+        self.maxsize = maxsize
+        self._clock = clock
+        # key -> (tokens, updated_at, full_at), ordered by last use.
+        self._buckets: "OrderedDict[str, tuple[float, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, capacity: float, cost: float = 1) -> float:
+        """Take ``cost`` tokens and return 0, or return the seconds until they would be available."""
+        with self._lock:
+            now = self._clock()
+            tokens, updated_at, _ = self._buckets.pop(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            self._evict(now)
+            return wait
+
+    def refund(self, key: str, rate: float, capacity: float, cost: float = 1) -> None:
+        """Give back tokens taken for a request that did not go out."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return
+            tokens, updated_at, _ = bucket
+            tokens = min(capacity, tokens + cost)
+            self._buckets[key] = (tokens, updated_at, updated_at + (capacity - tokens) / rate)
+
+    def evict_idle(self) -> int:
+        with self._lock:
+            return self._evict(self._clock())
+
+    def _evict(self, now: float) -> int:
+        evicted = 0
+        while self._buckets:
+            key, (_, _, full_at) = next(iter(self._buckets.items()))
+            if full_at > now and len(self._buckets) <= self.maxsize:
+                break
+            del self._buckets[key]
+            evicted += 1
+        return evicted
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class PostgresBucketStore:
+    """Buckets shared by every replica; one upsert per take, serialized by the row lock."""
+
+    def __init__(self, bind=None) -> None:
+        self._bind = bind
+
+    @property
+    def bind(self):
+        if self._bind is None:
+            from db.session import engine
+
+            self._bind = engine
+        return self._bind
+
+    def take_statement(self, key: str, rate: float, capacity: float, cost: float = 1):
+        now = func.clock_timestamp()
+        refilled = func.least(
+            capacity,
+            AutomationRateBucket.tokens + func.extract("epoch", now - AutomationRateBucket.updated_at) * rate,
+        )
+        granted = refilled >= cost
+        return (
+            insert(AutomationRateBucket)
+            .values(key=key, tokens=capacity - cost, last_granted=True, updated_at=now)
+            .on_conflict_do_update(
+                index_elements=[AutomationRateBucket.key],
+                set_={
+                    "tokens": case((granted, refilled - cost), else_=refilled),
+                    "last_granted": granted,
+                    "updated_at": now,
+                },
+            )
+            .returning(AutomationRateBucket.tokens, AutomationRateBucket.last_granted)
+        )
+
+    def take(self, key: str, rate: float, capacity: float, cost: float = 1) -> float:
+        # Its own short transaction: the row lock must not be held for the caller's HTTP call.
+        with self.bind.begin() as connection:
+            tokens, granted = connection.execute(self.take_statement(key, rate, capacity, cost)).one()
+        return 0.0 if granted else (cost - tokens) / rate
+
+    def refund_statement(self, key: str, capacity: float, cost: float = 1):
+        return (
+            update(AutomationRateBucket)
+            .where(AutomationRateBucket.key == key)
+            .values(tokens=func.least(capacity, AutomationRateBucket.tokens + cost))
+        )
+
+    def refund(self, key: str, rate: float, capacity: float, cost: float = 1) -> None:
+        with self.bind.begin() as connection:
+            connection.execute(self.refund_statement(key, capacity, cost))
+
+    def evict_idle(self) -> int:
+        with self.bind.begin() as connection:
+            return connection.execute(
+                delete(AutomationRateBucket).where(
+                    AutomationRateBucket.updated_at < func.clock_timestamp() - timedelta(seconds=REFILL_WINDOW_SECONDS)
+                )
+            ).rowcount
+
+
+def create_store(backend: str):
+    if backend == "memory":
+        return MemoryBucketStore()
+    if backend == "postgres":
+        return PostgresBucketStore()
+    raise ValueError(f"Unknown rate limit backend: {backend}")
 
 
 class TenantRateLimiter:
-    def __init__(self) -> None:
-        self._events: Dict[str, Deque[int]] = defaultdict(deque)
+    def __init__(self, store=None) -> None:
+        self._store = store
+        self._lock = threading.Lock()
+
+    @property
+    def store(self):
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = create_store(get_settings().automation_rate_limit_backend)
+        return self._store
 
-    def allow(self, tenant_id: str) -> bool:
+    def check(self, tenant_id, destination_id=None) -> float:
+        """Spend one request from the tenant (and destination) budget.
+
+        Returns 0 when the request may go out, otherwise the seconds until the
+        next token so the caller can reschedule exactly then. A request denied
+        by one bucket is refunded to the buckets it was already charged to.
+        """
         settings = get_settings()
-        now = int(datetime.now(timezone.utc).timestamp())
-        window = 60
-        max_events = settings.automation_rate_limit_per_minute
-        queue = self._events[tenant_id]
-        while queue and now - queue[0] >= window:
-            queue.popleft()
-        if len(queue) >= max_events:
-            return False
-        queue.append(now)
-        return True
+        limits = [(f"tenant:{tenant_id}", settings.automation_rate_limit_per_minute)]
+        if destination_id is not None:
+            limits.append((f"destination:{destination_id}", settings.automation_destination_rate_limit_per_minute))
+        charged = []
+        for key, per_minute in limits:
+            if per_minute <= 0:
+                continue
+            rate = per_minute / REFILL_WINDOW_SECONDS
+            wait = self.store.take(key, rate, per_minute)
+            if wait:
+                for charged_key, charged_rate, capacity in charged:
+                    self.store.refund(charged_key, charged_rate, capacity)
+                return wait
+            charged.append((key, rate, per_minute))
+        return 0.0
+
+    def allow(self, tenant_id) -> bool:
+        return self.check(tenant_id) == 0
+
+    def evict_idle(self) -> int:
+        return self.store.evict_idle()
 
 
 rate_limiter = TenantRateLimiter()
@@ -1,12 +1,19 @@
 from datetime import date, datetime, timedelta, timezone
+from typing import Optional
 
 from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import cast, exists, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
+from core.config import get_settings
 from core.logging import get_logger
 from db.models import Conversation, Notification, Task
 from db.session import SessionLocal
+from services.automation.no_reply_timers import fire_due_timers
 from services.automation.publisher import process_pending_deliveries
+from services.automation.rate_limit import rate_limiter
+from services.webhooks.pipeline import ingestion_pipeline
 
 logger = get_logger(__name__)
 
@@ -15,25 +22,83 @@ def create_scheduler() -> BackgroundScheduler:
     scheduler = BackgroundScheduler()
     scheduler.add_job(check_overdue_tasks, "interval", hours=1)
     scheduler.add_job(check_stalled_leads, "interval", days=1)
-    scheduler.add_job(process_pending_deliveries, "interval", minutes=1)
+    scheduler.add_job(fire_no_reply_timers, "interval", minutes=1)
+    # Also runs right away, to pick up ingestion jobs lost with the previous process.
+    scheduler.add_job(recover_ingest_jobs, "interval", minutes=1, next_run_time=datetime.now(timezone.utc))
+    scheduler.add_job(rate_limiter.evict_idle, "interval", minutes=5)
+    if not get_settings().automation_outbox_enabled:
+        # With the outbox enabled the standalone dispatcher drains deliveries instead.
+        scheduler.add_job(process_pending_deliveries, "interval", minutes=1)
     return scheduler
 
 
+def notify_statement(source, entity_id, version, conditions, notification_type: str, entity_type: str):
+    """INSERT ... SELECT one notification per matching row not notified for ``version`` yet."""
+    dedupe_key = func.concat(notification_type, ":", entity_id, ":", version)
+    candidates = select(
+        func.gen_random_uuid(),
+        source.user_id,
+        cast(notification_type, Notification.type.type),
+        cast(entity_type, Notification.entity_type.type),
+        entity_id,
+        dedupe_key,
+    ).where(*conditions, ~exists().where(Notification.dedupe_key == dedupe_key))
+    return (
+        insert(Notification)
+        .from_select(["id", "user_id", "type", "entity_type", "entity_id", "dedupe_key"], candidates)
+        .on_conflict_do_nothing(index_elements=["dedupe_key"], index_where=Notification.dedupe_key.isnot(None))
+    )
+
+
+def sweep_notifications(
+    db: Session,
+    source,
+    keyset: tuple,
+    version,
+    conditions: list,
+    notification_type: str,
+    entity_type: str,
+    chunk_size: Optional[int] = None,
+) -> int:
+    """Notify about every ``source`` row matching ``conditions`` in keyset chunks; returns how many were created.
+
+    Each chunk is one statement and one commit, so neither the process nor a
+    single transaction grows with the number of matching rows.
+    """
+    chunk_size = chunk_size or get_settings().notification_sweep_chunk_size
+    key = tuple_(*keyset)
+    created = 0
+    after = None
+    while True:
+        chunk = list(conditions)
+        if after is not None:
+            chunk.append(key > tuple_(*after))
+        upper = db.execute(
+            select(*keyset).where(*chunk).order_by(*keyset).offset(chunk_size - 1).limit(1)
+        ).first()
+        if upper is not None:
+            chunk.append(key <= tuple_(*upper))
+        result = db.execute(notify_statement(source, keyset[-1], version, chunk, notification_type, entity_type))
+        db.commit()
+        created += result.rowcount
+        if upper is None:
+            return created
+        after = tuple(upper)
+
+
 def check_overdue_tasks() -> None:
     db: Session = SessionLocal()
     try:
-        today = date.today()
-        tasks = db.query(Task).filter(Task.due_date < today, Task.status != "done").all()
-        for task in tasks:
-            db.add(
-                Notification(
-                    user_id=task.user_id,
-                    type="overdue_task",
-                    entity_type="task",
-                    entity_id=task.id,
-                )
-            )
-        db.commit()
+        created = sweep_notifications(
+            db,
+            Task,
+            keyset=(Task.due_date, Task.id),
+            version=Task.due_date,
+            conditions=[Task.due_date < date.today(), Task.status != "done"],
+            notification_type="overdue_task",
+            entity_type="task",
+        )
+        logger.info("Overdue task sweep finished", extra={"notifications": created})
     finally:
         db.close()
 
@@ -42,19 +107,36 @@ def check_stalled_leads() -> None:
     db: Session = SessionLocal()
     try:
         threshold = datetime.now(timezone.utc) - timedelta(days=3)
-        conversations = db.query(Conversation).filter(
-            Conversation.last_message_at < threshold,
-            Conversation.unread_count > 0,
-        ).all()
-        for convo in conversations:
-            db.add(
-                Notification(
-                    user_id=convo.user_id,
-                    type="stalled_lead",
-                    entity_type="conversation",
-                    entity_id=convo.id,
-                )
-            )
-        db.commit()
+        created = sweep_notifications(
+            db,
+            Conversation,
+            keyset=(Conversation.last_message_at, Conversation.id),
+            version=Conversation.last_message_at,
+            conditions=[Conversation.last_message_at < threshold, Conversation.unread_count > 0],
+            notification_type="stalled_lead",
+            entity_type="conversation",
+        )
+        logger.info("Stalled lead sweep finished", extra={"notifications": created})
+    finally:
+        db.close()
+
+
+def fire_no_reply_timers() -> None:
+    db: Session = SessionLocal()
+    try:
+        batch_size = get_settings().no_reply_timer_batch_size
+        # A full batch means more timers may be due; keep claiming until one comes back short.
+        while fire_due_timers(db, limit=batch_size) == batch_size:
+            pass
+    finally:
+        db.close()
+
+
+def recover_ingest_jobs() -> None:
+    db: Session = SessionLocal()
+    try:
+        recovered = ingestion_pipeline.recover(db)
+        if recovered:
+            logger.info("Requeued stalled ingestion jobs", extra={"messages": recovered})
     finally:
         db.close()
@@ -1,26 +1,21 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Annotated, Any, Literal
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Annotated, Any, Callable, Collection, Literal, Sequence
 from uuid import UUID
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, ValidationError, model_validator
 from sqlalchemy.orm import Session
 
+from core.cache import LRUCache
+from core.config import get_settings
+from core.logging import get_logger
 from db.models import AutomationBuilderAutomation, AutomationBuilderRun
 from services.automation.callbacks import execute_action
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from services.automation_run_log import run_log_writer, run_values
 
-from db.models import (
-    AutomationBuilderAutomation,
-    AutomationBuilderRun,
-    Contact,
-    Conversation,
-    InternalComment,
-    Message,
-    Task,
-)
+logger = get_logger(__name__)
 
 
 class TriggerMessageIngested(BaseModel):
@@ -33,9 +28,14 @@ class TriggerConversationUpdated(BaseModel):
     params: dict[str, Any] | None = None
 
 
+class NoReplyAfterParams(BaseModel):
+    # Strict: the timers read this straight from flow_json, so "30m" or true must not be coerced.
+    minutes: float = Field(gt=0, strict=True)
+
+
 class TriggerNoReplyAfter(BaseModel):
     type: Literal["no_reply_after"]
-    params: dict[str, Any] | None = None
+    params: NoReplyAfterParams
 
 
 TriggerType = Annotated[
@@ -253,10 +253,25 @@ def _extract_lead_score(event_payload: dict[str, Any]) -> float | None:
     return None
 
 
-def evaluate_conditions_detailed(
-    conditions: list[ConditionType], event_payload: dict[str, Any]
-) -> tuple[bool, list[dict[str, Any]]]:
-def evaluate_conditions(conditions: list[ConditionType], event_payload: dict[str, Any]) -> bool:
+@dataclass(frozen=True)
+class EventFacts:
+    """What conditions look at, pulled out of an event payload once per event."""
+
+    text: str
+    urgency: str | None
+    channel: str | None
+    lead_score: float | None
+    # Needles a keyword scan already looked for in ``text``, and those it found.
+    indexed: frozenset = frozenset()
+    found: frozenset = frozenset()
+
+    def contains(self, needle: str) -> bool:
+        if needle in self.indexed:
+            return needle in self.found
+        return needle in self.text
+
+
+def event_facts(event_payload: dict[str, Any], keyword_hits=None) -> EventFacts:
     message_text = str(event_payload.get("message", {}).get("text") or event_payload.get("body") or "")
     urgency = event_payload.get("urgency")
     if urgency is None:
@@ -267,50 +282,161 @@ def evaluate_conditions(conditions: list[ConditionType], event_payload: dict[str
         channel_type = channel.get("type")
     elif isinstance(channel, str):
         channel_type = channel
+    return EventFacts(
+        text=message_text.lower(),
+        urgency=urgency,
+        channel=channel_type,
+        lead_score=_extract_lead_score(event_payload),
+        indexed=keyword_hits.indexed if keyword_hits else frozenset(),
+        found=keyword_hits.needles if keyword_hits else frozenset(),
+    )
 
-    lead_score = _extract_lead_score(event_payload)
-    details: list[dict[str, Any]] = []
 
+@dataclass(frozen=True)
+class CompiledCondition:
+    spec: dict[str, Any]
+    test: Callable[[EventFacts], bool]
+
+
+def compile_condition(condition: ConditionType) -> CompiledCondition:
+    if condition.type == "contains_text":
+        needle = condition.text.lower()
+        test = lambda facts: facts.contains(needle)
+    elif condition.type == "urgency_is":
+        urgency = condition.value
+        test = lambda facts: facts.urgency == urgency
+    elif condition.type == "lead_score_gte":
+        threshold = condition.value
+        test = lambda facts: facts.lead_score is not None and facts.lead_score >= threshold
+    elif condition.type == "channel_is":
+        channel = condition.value
+        test = lambda facts: facts.channel == channel
+    else:
+        test = lambda facts: True
+    return CompiledCondition(spec=condition.model_dump(mode="json"), test=test)
+
+
+def check_conditions(
+    conditions: Sequence[CompiledCondition], facts: EventFacts
+) -> tuple[bool, list[dict[str, Any]]]:
+    details: list[dict[str, Any]] = []
     for condition in conditions:
-        passed = True
-        if condition.type == "contains_text":
-            passed = condition.text.lower() in message_text.lower()
-        elif condition.type == "urgency_is":
-            passed = urgency == condition.value
-        elif condition.type == "lead_score_gte":
-            passed = lead_score is not None and lead_score >= condition.value
-        elif condition.type == "channel_is":
-            passed = channel_type == condition.value
-
-        details.append({"condition": condition.model_dump(mode="json"), "passed": passed})
+        passed = condition.test(facts)
+        details.append({"condition": condition.spec, "passed": passed})
         if not passed:
             return False, details
     return True, details
 
 
+def evaluate_conditions_detailed(
+    conditions: list[ConditionType], event_payload: dict[str, Any]
+) -> tuple[bool, list[dict[str, Any]]]:
+    return check_conditions([compile_condition(condition) for condition in conditions], event_facts(event_payload))
+
+
 def evaluate_conditions(conditions: list[ConditionType], event_payload: dict[str, Any]) -> bool:
     matched, _ = evaluate_conditions_detailed(conditions, event_payload)
     return matched
 
-    for condition in conditions:
-        if condition.type == "contains_text" and condition.text.lower() not in message_text.lower():
-            return False
-        if condition.type == "urgency_is" and urgency != condition.value:
-            return False
-        if condition.type == "lead_score_gte" and (lead_score is None or lead_score < condition.value):
-            return False
-        if condition.type == "channel_is" and channel_type != condition.value:
-            return False
-    return True
-
-
-def _resolve_conversation_id(action: ActionType, event_payload: dict[str, Any]) -> UUID | None:
-    if isinstance(action, ActionSendMessage) and action.conversation_id:
-        return action.conversation_id
-    convo_id = event_payload.get("conversation_id")
-    if convo_id:
-        return UUID(str(convo_id))
-    return None
+
+@dataclass(frozen=True)
+class CompiledFlow:
+    automation_id: UUID
+    updated_at: datetime | None
+    trigger_type: str
+    conditions: tuple[CompiledCondition, ...]
+    actions: tuple[ActionType, ...]
+
+
+def compile_flow(automation_id: UUID, updated_at: datetime | None, flow_json: dict[str, Any]) -> CompiledFlow:
+    flow = AutomationFlow.model_validate(flow_json)
+    return CompiledFlow(
+        automation_id=automation_id,
+        updated_at=updated_at,
+        trigger_type=flow.trigger.type,
+        conditions=tuple(compile_condition(condition) for condition in flow.conditions),
+        actions=tuple(flow.actions),
+    )
+
+
+class FlowRegistry:
+    """Validated, compiled flows of each tenant's enabled automations, by trigger.
+
+    Compiled flows are keyed by ``(automation_id, updated_at)``, so an edited
+    automation is recompiled and an unchanged one never is. The per-tenant lists
+    are dropped by :meth:`invalidate` when the builder API writes an automation;
+    other processes pick the change up within the TTL.
+    """
+
+    def __init__(
+        self,
+        maxsize: int | None = None,
+        ttl_seconds: float | None = None,
+        compiled_size: int | None = None,
+    ) -> None:
+        settings = get_settings()
+        maxsize = maxsize or settings.automation_flow_cache_size
+        ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.automation_flow_cache_ttl_seconds
+        self.tenants = LRUCache(maxsize, ttl_seconds)
+        self.compiled = LRUCache(compiled_size or settings.automation_compiled_flow_cache_size)
+
+    def compiled_flow(self, automation: AutomationBuilderAutomation) -> CompiledFlow:
+        key = (automation.id, automation.updated_at)
+        flow = self.compiled.get(key)
+        if flow is None:
+            flow = compile_flow(automation.id, automation.updated_at, automation.flow_json)
+            self.compiled.set(key, flow)
+        return flow
+
+    def flows(self, db: Session, tenant_id: UUID, trigger_type: str) -> tuple[CompiledFlow, ...]:
+        key = (str(tenant_id), trigger_type)
+        cached = self.tenants.get(key)
+        if cached is not None:
+            return cached
+        versions = (
+            db.query(AutomationBuilderAutomation.id, AutomationBuilderAutomation.updated_at)
+            .filter(
+                AutomationBuilderAutomation.user_id == tenant_id,
+                AutomationBuilderAutomation.enabled == True,
+                AutomationBuilderAutomation.trigger_type == trigger_type,
+            )
+            .order_by(AutomationBuilderAutomation.created_at, AutomationBuilderAutomation.id)
+            .all()
+        )
+        known = {(row.id, row.updated_at): self.compiled.get((row.id, row.updated_at)) for row in versions}
+        stale = [automation_id for (automation_id, _), flow in known.items() if flow is None]
+        if stale:
+            # Only new or edited automations carry their flow_json over the wire.
+            for row in (
+                db.query(
+                    AutomationBuilderAutomation.id,
+                    AutomationBuilderAutomation.updated_at,
+                    AutomationBuilderAutomation.flow_json,
+                )
+                .filter(AutomationBuilderAutomation.id.in_(stale))
+                .all()
+            ):
+                try:
+                    flow = compile_flow(row.id, row.updated_at, row.flow_json)
+                except ValidationError:
+                    logger.warning("Skipping automation with an invalid flow", extra={"automation_id": str(row.id)})
+                    continue
+                self.compiled.set((row.id, row.updated_at), flow)
+                known[(row.id, row.updated_at)] = flow
+        flows = tuple(flow for flow in known.values() if flow is not None)
+        self.tenants.set(key, flows)
+        return flows
+
+    def invalidate(self, tenant_id: UUID) -> None:
+        tenant = str(tenant_id)
+        self.tenants.pop_where(lambda key: key[0] == tenant)
+
+    def clear(self) -> None:
+        self.tenants.clear()
+        self.compiled.clear()
+
+
+flow_registry = FlowRegistry()
 
 
 def execute_actions(
@@ -357,73 +483,16 @@ def execute_actions(
 
         executed.append({"type": action.type, "result": result})
         results.setdefault("actions", []).append({"type": action.type, **result})
-
-        if action.type == "create_task":
-            task = Task(
-                user_id=user_id,
-                conversation_id=_resolve_conversation_id(action, event_payload),
-                title=action.title,
-                priority=action.priority,
-                source_event_id=source_event_id,
-            )
-            try:
-                with db.begin_nested():
-                    db.add(task)
-                    db.flush()
-                    executed.append({"type": "create_task", "task_id": str(task.id)})
-                    results.setdefault("tasks", []).append(str(task.id))
-            except IntegrityError:
-                executed.append({"type": "create_task", "skipped": "duplicate_source_event"})
+        if action.type == "create_task" and "task_id" in result:
+            results.setdefault("tasks", []).append(result["task_id"])
         elif action.type == "update_conversation_status":
-            conversation_id = _resolve_conversation_id(action, event_payload)
-            if conversation_id:
-                convo = (
-                    db.query(Conversation)
-                    .filter(Conversation.id == conversation_id, Conversation.user_id == user_id)
-                    .first()
-                )
-                if convo:
-                    convo.status = action.status
-                    executed.append({"type": "update_conversation_status", "conversation_id": str(convo.id), "status": action.status})
-                    results["conversation_status"] = action.status
+            results["conversation_status"] = result.get("status")
         elif action.type == "add_internal_comment":
-            conversation_id = _resolve_conversation_id(action, event_payload)
-            if conversation_id:
-                comment = InternalComment(conversation_id=conversation_id, user_id=user_id, text=action.text)
-                db.add(comment)
-                db.flush()
-                executed.append({"type": "add_internal_comment", "comment_id": str(comment.id)})
-                results.setdefault("comments", []).append(str(comment.id))
+            results.setdefault("comments", []).append(result.get("comment_id"))
         elif action.type == "send_message":
-            conversation_id = _resolve_conversation_id(action, event_payload)
-            if conversation_id:
-                message = Message(
-                    conversation_id=conversation_id,
-                    direction="outbound",
-                    body=action.text,
-                    raw_payload={"source": "automation_builder", "channel": action.channel},
-                )
-                db.add(message)
-                convo = (
-                    db.query(Conversation)
-                    .filter(Conversation.id == conversation_id, Conversation.user_id == user_id)
-                    .first()
-                )
-                if convo:
-                    convo.last_message_at = datetime.now(timezone.utc)
-                db.flush()
-                executed.append({"type": "send_message", "message_id": str(message.id)})
-                results.setdefault("messages", []).append(str(message.id))
+            results.setdefault("messages", []).append(result.get("message_id"))
         elif action.type == "update_contact":
-            contact_id = event_payload.get("contact_id")
-            if contact_id:
-                contact = db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == user_id).first()
-                if contact:
-                    for field, value in action.patch.items():
-                        if hasattr(contact, field):
-                            setattr(contact, field, value)
-                    executed.append({"type": "update_contact", "contact_id": str(contact.id), "patch": action.patch})
-                    results["contact_updated"] = str(contact.id)
+            results["contact_updated"] = result.get("contact_id")
     return executed, results
 
 
@@ -435,61 +504,77 @@ def run_automation(
     event_payload: dict[str, Any],
     source_event_id: str | None = None,
 ) -> dict[str, Any]:
-    flow = AutomationFlow.model_validate(automation.flow_json)
-    trigger_matched = flow.trigger.type == event_type
-    conditions_matched, condition_results = evaluate_conditions_detailed(flow.conditions, event_payload)
+    """Evaluate one automation on request (the builder's test run); always logs a run row."""
+    return run_compiled_flow(
+        db,
+        user_id,
+        flow_registry.compiled_flow(automation),
+        event_type,
+        event_payload,
+        event_facts(event_payload),
+        source_event_id=source_event_id,
+        record_unmatched=True,
+    )
+
+
+def run_compiled_flow(
+    db: Session,
+    user_id: UUID,
+    flow: CompiledFlow,
+    event_type: str,
+    event_payload: dict[str, Any],
+    facts: EventFacts,
+    source_event_id: str | None = None,
+    record_unmatched: bool = False,
+    event_stored: bool = False,
+) -> dict[str, Any]:
+    trigger_matched = flow.trigger_type == event_type
+    conditions_matched, condition_results = check_conditions(flow.conditions, facts)
     matched = trigger_matched and conditions_matched
-    matched = flow.trigger.type == event_type and evaluate_conditions(flow.conditions, event_payload)
     actions_executed: list[dict[str, Any]] = []
     results: dict[str, Any] = {}
-    error: str | None = None
+    run: dict[str, Any] | None = None
 
     try:
         if matched:
             actions_executed, results = execute_actions(
                 db,
                 user_id,
-                flow.actions,
+                list(flow.actions),
                 event_payload,
                 source_event_id=source_event_id,
             )
-        run = AutomationBuilderRun(
-            user_id=user_id,
-            automation_id=automation.id,
-            event_type=event_type,
-            event_payload=event_payload,
-            matched=matched,
-            actions_executed=actions_executed,
-            error=error,
-        )
-        db.add(run)
-        db.flush()
-        db.add(
-            AutomationBuilderRun(
-                user_id=user_id,
-                automation_id=automation.id,
-                event_type=event_type,
-                event_payload=event_payload,
-                matched=matched,
-                actions_executed=actions_executed,
-                error=error,
+        if matched or record_unmatched:
+            run = run_values(
+                user_id,
+                flow.automation_id,
+                event_type,
+                event_payload,
+                source_event_id,
+                matched,
+                actions_executed,
+                event_stored=event_stored,
+            )
+            db.add(AutomationBuilderRun(**run))
+            db.commit()
+        else:
+            run = run_log_writer.record_unmatched(
+                user_id, flow.automation_id, event_type, event_payload, source_event_id, event_stored=event_stored
             )
-        )
-        db.commit()
     except Exception as exc:
         db.rollback()
-        error = str(exc)
-        run = AutomationBuilderRun(
-            user_id=user_id,
-            automation_id=automation.id,
-            event_type=event_type,
-            event_payload=event_payload,
-            matched=matched,
-            actions_executed=actions_executed,
-            error=error,
+        run = run_values(
+            user_id,
+            flow.automation_id,
+            event_type,
+            event_payload,
+            source_event_id,
+            matched,
+            actions_executed,
+            str(exc),
+            event_stored=event_stored,
         )
-        db.add(run)
-        db.flush()
+        db.add(AutomationBuilderRun(**run))
         db.commit()
         raise
 
@@ -499,24 +584,9 @@ def run_automation(
         "condition_results": condition_results,
         "actions_executed": actions_executed,
         "results": results,
-        "run_id": str(run.id),
-        "run_created_at": run.created_at.isoformat() if run.created_at else None,
+        "run_id": str(run["id"]) if run else None,
+        "run_created_at": run["created_at"].isoformat() if run else None,
     }
-        db.add(
-            AutomationBuilderRun(
-                user_id=user_id,
-                automation_id=automation.id,
-                event_type=event_type,
-                event_payload=event_payload,
-                matched=matched,
-                actions_executed=actions_executed,
-                error=error,
-            )
-        )
-        db.commit()
-        raise
-
-    return {"matched": matched, "actions_executed": actions_executed, "results": results}
 
 
 def run_enabled_automations(
@@ -525,26 +595,35 @@ def run_enabled_automations(
     event_type: str,
     event_payload: dict[str, Any],
     source_event_id: str | None = None,
+    keyword_hits=None,
+    automation_ids: Collection[UUID] | None = None,
+    event_stored: bool = False,
 ) -> list[dict[str, Any]]:
-    automations = (
-        db.query(AutomationBuilderAutomation)
-        .filter(
-            AutomationBuilderAutomation.user_id == user_id,
-            AutomationBuilderAutomation.enabled == True,
-            AutomationBuilderAutomation.trigger_type == event_type,
-        )
-        .all()
-    )
-    outputs: list[dict[str, Any]] = []
-    for automation in automations:
-        outputs.append(
-            run_automation(
-                db=db,
-                user_id=user_id,
-                automation=automation,
-                event_type=event_type,
-                event_payload=event_payload,
-                source_event_id=source_event_id,
-            )
+    """Run the tenant's enabled automations for ``event_type``.
+
+    ``keyword_hits`` is a :class:`services.automation.keyword_matcher.KeywordHits`
+    scan of the event text; ``contains_text`` conditions then read it instead of
+    searching the text again. ``automation_ids`` limits the run to those
+    automations, as when a ``no_reply_after`` timer fires for one of them.
+    ``event_stored`` says ``source_event_id`` names a persisted
+    ``automation_events`` row, so run rows can skip their payload copy.
+    """
+    flows = flow_registry.flows(db, user_id, event_type)
+    if automation_ids is not None:
+        flows = tuple(flow for flow in flows if flow.automation_id in automation_ids)
+    if not flows:
+        return []
+    facts = event_facts(event_payload, keyword_hits)
+    return [
+        run_compiled_flow(
+            db=db,
+            user_id=user_id,
+            flow=flow,
+            event_type=event_type,
+            event_payload=event_payload,
+            facts=facts,
+            source_event_id=source_event_id,
+            event_stored=event_stored,
         )
-    return outputs
+        for flow in flows
+    ]
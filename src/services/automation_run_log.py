@@ -0,0 +1,147 @@
+"""Run logging for builder automations.
+
+A matched or failed evaluation is written as one ``automation_builder_runs`` row
+in the caller's transaction. An evaluation that did not match only bumps an
+hourly counter in ``automation_builder_run_counters``, and a fraction of them,
+``AUTOMATION_RUN_SAMPLE_RATE``, is kept as a row as well. Counters and samples
+go through a background writer that flushes each batch as one multi-row upsert
+and one multi-row insert. Runs for an event the caller marks ``event_stored``
+(its ``source_event_id`` names a persisted ``automation_events`` row) keep only
+that reference; every other run keeps its own copy of the event payload.
+"""
+
+import random
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from sqlalchemy import insert as sa_insert
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from core.logging import get_logger
+from db.models import AutomationBuilderRun, AutomationBuilderRunCounter
+from services.buffered_writer import BufferedWriter
+
+logger = get_logger(__name__)
+
+
+def run_values(
+    user_id,
+    automation_id,
+    event_type: str,
+    event_payload: dict[str, Any],
+    source_event_id: Optional[str],
+    matched: bool,
+    actions_executed: Optional[list] = None,
+    error: Optional[str] = None,
+    event_stored: bool = False,
+) -> dict[str, Any]:
+    return {
+        "id": uuid.uuid4(),
+        "user_id": user_id,
+        "automation_id": automation_id,
+        "event_type": event_type,
+        "source_event_id": source_event_id,
+        "event_payload": None if event_stored and source_event_id else event_payload,
+        "matched": matched,
+        "actions_executed": actions_executed or [],
+        "error": error,
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+@dataclass(frozen=True)
+class UnmatchedRun:
+    user_id: uuid.UUID
+    automation_id: uuid.UUID
+    event_type: str
+    bucket: datetime
+
+
+class RunLogWriter(BufferedWriter):
+    name = "automation-run-log"
+
+    def __init__(
+        self,
+        sample_rate: Optional[float] = None,
+        max_buffer: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        session_factory=None,
+        sample: Callable[[], float] = random.random,
+    ) -> None:
+        settings = get_settings()
+        super().__init__(
+            max_buffer=max_buffer or settings.automation_run_log_buffer_size,
+            batch_size=batch_size or settings.automation_run_log_batch_size,
+            flush_interval=(
+                flush_interval if flush_interval is not None else settings.automation_run_log_flush_interval_seconds
+            ),
+            session_factory=session_factory,
+        )
+        self._sample_rate = sample_rate
+        self._sample = sample
+
+    @property
+    def sample_rate(self) -> float:
+        # Read per call so a settings reload changes sampling without a restart.
+        return self._sample_rate if self._sample_rate is not None else get_settings().automation_run_sample_rate
+
+    def record_unmatched(
+        self,
+        user_id,
+        automation_id,
+        event_type: str,
+        event_payload: dict[str, Any],
+        source_event_id: Optional[str] = None,
+        event_stored: bool = False,
+    ) -> Optional[dict[str, Any]]:
+        """Count an evaluation that did not match; returns the row if it was sampled."""
+        now = datetime.now(timezone.utc)
+        self.put(UnmatchedRun(user_id, automation_id, event_type, now.replace(minute=0, second=0, microsecond=0)))
+        rate = self.sample_rate
+        if rate <= 0 or self._sample() >= rate:
+            return None
+        row = run_values(
+            user_id, automation_id, event_type, event_payload, source_event_id, matched=False, event_stored=event_stored
+        )
+        self.put(row)
+        return row
+
+    def write(self, db: Session, batch: list) -> None:
+        counts = Counter(item for item in batch if isinstance(item, UnmatchedRun))
+        if counts:
+            statement = insert(AutomationBuilderRunCounter).values(
+                [
+                    {
+                        "automation_id": run.automation_id,
+                        "event_type": run.event_type,
+                        "bucket": run.bucket,
+                        "user_id": run.user_id,
+                        "unmatched": count,
+                    }
+                    for run, count in counts.items()
+                ]
+            )
+            db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=["automation_id", "event_type", "bucket"],
+                    set_={"unmatched": AutomationBuilderRunCounter.unmatched + statement.excluded.unmatched},
+                )
+            )
+        rows = [item for item in batch if isinstance(item, dict)]
+        if rows:
+            try:
+                with db.begin_nested():
+                    db.execute(sa_insert(AutomationBuilderRun).values(rows))
+            except IntegrityError:
+                # An automation deleted since the sample was taken; keep the counters.
+                logger.warning("Dropped sampled automation runs", extra={"runs": len(rows)})
+
+
+run_log_writer = RunLogWriter()
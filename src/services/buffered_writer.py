@@ -0,0 +1,137 @@
+"""Background writer that turns many small inserts into a few multi-row ones.
+
+Producers put items on a bounded queue and return; a daemon thread collects up
+to ``batch_size`` items, or whatever arrived within ``flush_interval`` seconds,
+and hands the batch to :meth:`BufferedWriter.write` in its own session. When the
+queue is full ``put`` blocks until the writer catches up, so a slow database
+pushes back on producers instead of growing memory without bound. Once
+stopped the writer stays stopped, and later items are written inline.
+"""
+
+import atexit
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+from sqlalchemy.orm import Session
+
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_STOP = object()
+
+
+class BufferedWriter(ABC):
+    name = "buffered-writer"
+
+    def __init__(self, max_buffer: int, batch_size: int, flush_interval: float, session_factory=None) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_buffer)
+        self._session_factory = session_factory
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._atexit_registered = False
+        self.written = 0
+        self.failed = 0
+
+    @abstractmethod
+    def write(self, db: Session, batch: list[Any]) -> None:
+        """Write one batch in ``db``; the writer commits, or rolls back if this raises."""
+
+    def start(self) -> bool:
+        """Start the writer thread if needed; False once the writer has been stopped."""
+        with self._lock:
+            if self._stopped:
+                return False
+            if self._thread is not None:
+                return True
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+            return True
+
+    def stop(self, timeout: Optional[float] = 10) -> None:
+        """Flush everything buffered so far and stop the writer thread for good."""
+        with self._lock:
+            self._stopped = True
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def put(self, item: Any) -> None:
+        """Buffer an item, waiting for room if the writer is behind."""
+        if not self.start():
+            self._flush([item])
+            return
+        self._queue.put(item)
+
+    def put_nowait(self, item: Any) -> bool:
+        """Buffer an item without blocking; False means the buffer is full."""
+        if not self.start():
+            self._flush([item])
+            return True
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            return False
+        return True
+
+    def stats(self) -> dict:
+        return {"buffered": self._queue.qsize(), "written": self.written, "failed": self.failed}
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=max(remaining, 0)) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+        # Drain whatever was queued behind the stop marker.
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        for start in range(0, len(leftover), self.batch_size):
+            self._flush(leftover[start : start + self.batch_size])
+
+    def _flush(self, batch: list[Any]) -> None:
+        if self._session_factory is None:
+            from db.session import SessionLocal
+
+            self._session_factory = SessionLocal
+        db = self._session_factory()
+        try:
+            self.write(db, batch)
+            db.commit()
+            self.written += len(batch)
+        except Exception:
+            db.rollback()
+            self.failed += len(batch)
+            logger.exception("Failed to write buffered batch", extra={"writer": self.name, "entries": len(batch)})
+        finally:
+            db.close()
@@ -0,0 +1,45 @@
+"""Fuzzy and prefix matching of contacts by name, handle and tags.
+
+Everything goes through ``contact_search_text(name, handle, tags)``, an
+immutable SQL function created by migration 0018. ``ix_contacts_search_trgm``
+is a pg_trgm GIN index on ``(user_id, contact_search_text(...))``, so the
+substring and word-similarity filters below are index scans within a tenant.
+Prefix lookups on name and handle use the ``text_pattern_ops`` btree indexes.
+"""
+
+from sqlalchemy import case, func, literal, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+from db.models import Contact
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_text() -> ColumnElement:
+    return func.contact_search_text(Contact.name, Contact.handle, Contact.tags)
+
+
+def normalize(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def prefix_match(query: str) -> ColumnElement:
+    pattern = f"{escape_like(normalize(query))}%"
+    return or_(func.lower(Contact.name).like(pattern), func.lower(Contact.handle).like(pattern))
+
+
+def match(query: str) -> ColumnElement:
+    """Substring or fuzzy (typo-tolerant) match anywhere in name, handle or tags."""
+    term = normalize(query)
+    return or_(
+        search_text().like(f"%{escape_like(term)}%"),
+        literal(term).op("<%")(search_text()),
+    )
+
+
+def rank(query: str) -> ColumnElement:
+    """Higher is better: prefix hits on the name or handle first, then trigram word similarity."""
+    term = normalize(query)
+    return case((prefix_match(query), 1.0), else_=0.0) + func.word_similarity(term, search_text())
@@ -0,0 +1,60 @@
+"""Keep each conversation's latest-message fields current at write time."""
+
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from db.models import Conversation, Message
+
+
+def _score(classification: dict) -> Optional[float]:
+    value = classification.get("affordability_score")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def last_message_values(message: Message) -> dict:
+    classification = message.ai_classification or {}
+    return {
+        "last_message_id": message.id,
+        "last_message_body": message.body,
+        "last_message_direction": message.direction,
+        "last_sentiment": classification.get("sentiment"),
+        "last_urgency": classification.get("urgency"),
+        "last_score": _score(classification),
+    }
+
+
+def record_last_message(conversation: Conversation, message: Message, at: Optional[datetime] = None) -> None:
+    conversation.last_message_at = at or datetime.now(timezone.utc)
+    for field, value in last_message_values(message).items():
+        setattr(conversation, field, value)
+
+
+def record_last_body(db: Session, message: Message) -> None:
+    """Copy a late body (e.g. a transcription) onto the conversation if ``message`` is still its latest."""
+    db.execute(
+        update(Conversation)
+        .where(Conversation.id == message.conversation_id, Conversation.last_message_id == message.id)
+        .values(last_message_body=message.body)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def record_last_classification(db: Session, message: Message) -> None:
+    """Copy a late classification onto the conversation if ``message`` is still its latest."""
+    classification = message.ai_classification or {}
+    db.execute(
+        update(Conversation)
+        .where(Conversation.id == message.conversation_id, Conversation.last_message_id == message.id)
+        .values(
+            last_sentiment=classification.get("sentiment"),
+            last_urgency=classification.get("urgency"),
+            last_score=_score(classification),
+        )
+        .execution_options(synchronize_session=False)
+    )
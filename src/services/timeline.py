@@ -1,11 +1,22 @@
+"""Conversation timelines, materialized in ``timeline_entries`` as their sources are written.
+
+An ``after_flush`` hook turns each message, task, lead task and AI event that
+belongs to a conversation into a timeline entry in the same transaction, and
+rewrites that one entry when a field it shows changes. Reading a timeline is a
+range scan of ``ix_timeline_entries_conversation`` on ``(created_at, id)``.
+"""
+
 from __future__ import annotations
 
+import uuid
 from datetime import datetime
-from typing import Any
+from typing import Any, Optional
 
+from sqlalchemy import Select, delete, event, inspect, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
-from db.models import AIEvent, Conversation, LeadTask, Task
+from db.models import AIEvent, LeadTask, Message, Task, TimelineEntry
 
 
 TIMELINE_TYPE_MAP = {
@@ -16,6 +27,16 @@ TIMELINE_TYPE_MAP = {
     "voice.transcribed": "ai_voice",
 }
 
+SOURCE_TYPES = {Message: "message", Task: "task", LeadTask: "lead_task", AIEvent: "ai_event"}
+
+# The fields each kind of source shows on its entry; changing any other field leaves the entry alone.
+SHOWN_FIELDS = {
+    Message: ("conversation_id", "direction", "body", "ai_classification"),
+    Task: ("conversation_id", "title", "status", "priority", "due_date"),
+    LeadTask: ("conversation_id", "title", "status", "priority", "due_date", "assignee_id"),
+    AIEvent: ("conversation_id", "event_type", "payload"),
+}
+
 
 def _format_dt(value: datetime | None) -> str | None:
     if not value:
@@ -23,56 +44,97 @@ def _format_dt(value: datetime | None) -> str | None:
     return value.isoformat()
 
 
-def build_conversation_timeline(db: Session, conversation: Conversation) -> list[dict[str, Any]]:
-    items: list[dict[str, Any]] = []
+def timeline_item(source) -> dict[str, Any]:
+    """The JSON shown for ``source``; ``created_at`` is kept on the entry row instead."""
+    if isinstance(source, Message):
+        return {
+            "type": "ai_reply" if source.direction == "outbound" else "message",
+            "direction": source.direction,
+            "body": source.body,
+            "ai_classification": source.ai_classification,
+        }
+    if isinstance(source, AIEvent):
+        return {
+            "type": TIMELINE_TYPE_MAP.get(source.event_type, "ai_event"),
+            "event_type": source.event_type,
+            "payload": source.payload,
+        }
+    item = {
+        "type": "task",
+        "source": "lead" if isinstance(source, LeadTask) else "general",
+        "title": source.title,
+        "status": source.status,
+        "priority": source.priority,
+        "due_date": source.due_date.isoformat() if source.due_date else None,
+    }
+    if isinstance(source, LeadTask):
+        item["assignee_id"] = str(source.assignee_id) if source.assignee_id else None
+    return item
 
-    for message in conversation.messages:
-        items.append(
-            {
-                "type": "ai_reply" if message.direction == "outbound" else "message",
-                "direction": message.direction,
-                "body": message.body,
-                "created_at": _format_dt(message.created_at),
-                "ai_classification": message.ai_classification,
-            }
-        )
 
-    for task in db.query(Task).filter(Task.conversation_id == conversation.id).all():
-        items.append(
-            {
-                "type": "task",
-                "source": "general",
-                "title": task.title,
-                "status": task.status,
-                "priority": task.priority,
-                "due_date": task.due_date.isoformat() if task.due_date else None,
-                "created_at": _format_dt(task.created_at),
-            }
-        )
+def _changed(source) -> bool:
+    state = inspect(source)
+    return any(state.attrs[name].history.has_changes() for name in SHOWN_FIELDS[type(source)])
+
 
-    for task in db.query(LeadTask).filter(LeadTask.conversation_id == conversation.id).all():
-        items.append(
+@event.listens_for(Session, "after_flush")
+def _materialize_timeline(session: Session, flush_context) -> None:
+    upserts: list[dict] = []
+    removed: list[tuple[str, uuid.UUID]] = []
+    changed = [source for source in session.dirty if type(source) in SOURCE_TYPES and _changed(source)]
+    for source in [*session.new, *changed]:
+        source_type = SOURCE_TYPES.get(type(source))
+        if source_type is None:
+            continue
+        if source.conversation_id is None:
+            # Only a source moved out of its conversation can have an entry to drop.
+            if source in changed:
+                removed.append((source_type, source.id))
+            continue
+        upserts.append(
             {
-                "type": "task",
-                "source": "lead",
-                "title": task.title,
-                "status": task.status,
-                "priority": task.priority,
-                "due_date": task.due_date.isoformat() if task.due_date else None,
-                "assignee_id": str(task.assignee_id) if task.assignee_id else None,
-                "created_at": _format_dt(task.created_at),
+                "id": uuid.uuid4(),
+                "conversation_id": source.conversation_id,
+                "source_type": source_type,
+                "source_id": source.id,
+                "created_at": source.created_at,
+                "item": timeline_item(source),
             }
         )
+    removed.extend(
+        (SOURCE_TYPES[type(source)], source.id) for source in session.deleted if type(source) in SOURCE_TYPES
+    )
 
-    for event in db.query(AIEvent).filter(AIEvent.conversation_id == conversation.id).all():
-        items.append(
-            {
-                "type": TIMELINE_TYPE_MAP.get(event.event_type, "ai_event"),
-                "event_type": event.event_type,
-                "payload": event.payload,
-                "created_at": _format_dt(event.created_at),
-            }
+    if upserts:
+        statement = insert(TimelineEntry)
+        session.connection().execute(
+            statement.on_conflict_do_update(
+                constraint="uq_timeline_entry_source",
+                set_={"conversation_id": statement.excluded.conversation_id, "item": statement.excluded.item},
+            ),
+            upserts,
+        )
+    if removed:
+        session.connection().execute(
+            delete(TimelineEntry).where(tuple_(TimelineEntry.source_type, TimelineEntry.source_id).in_(removed))
         )
 
-    items.sort(key=lambda entry: entry.get("created_at") or "")
-    return items
+
+def timeline_query(conversation_id) -> Select:
+    return select(TimelineEntry.id, TimelineEntry.created_at, TimelineEntry.item).where(
+        TimelineEntry.conversation_id == conversation_id
+    )
+
+
+def timeline_items(rows) -> list[dict[str, Any]]:
+    return [{**row.item, "created_at": _format_dt(row.created_at)} for row in rows]
+
+
+def build_conversation_timeline(db: Session, conversation_id, limit: Optional[int] = None) -> list[dict[str, Any]]:
+    """The latest ``limit`` timeline items (all of them when ``limit`` is None), oldest first."""
+    statement = timeline_query(conversation_id).order_by(TimelineEntry.created_at.desc(), TimelineEntry.id.desc())
+    if limit is not None:
+        statement = statement.limit(limit)
+    rows = db.execute(statement).all()
+    rows.reverse()
+    return timeline_items(rows)
@@ -0,0 +1,83 @@
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from core.cache import LRUCache
+from core.config import get_settings
+from db.models import InboundMessageReceipt
+
+
+class InboundDedupe:
+    """Remembers provider message ids so redeliveries exit before any write.
+
+    The in-process LRU answers hot redeliveries without touching the database;
+    misses fall back to a primary-key lookup on ``inbound_message_receipts``,
+    whose key also rejects concurrent duplicates at commit time.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None) -> None:
+        self._cache = LRUCache(maxsize or get_settings().ingest_dedupe_cache_size)
+
+    @staticmethod
+    def _key(user_id, channel_type: str, channel_message_id: str) -> tuple:
+        return (str(user_id), channel_type, channel_message_id)
+
+    def lookup(self, db: Session, user_id, channel_type: str, channel_message_id: Optional[str]) -> Optional[str]:
+        if not channel_message_id:
+            return None
+        key = self._key(user_id, channel_type, channel_message_id)
+        cached = self._cache.get(key)
+        if cached:
+            return cached
+        receipt = db.get(InboundMessageReceipt, (user_id, channel_type, channel_message_id))
+        if not receipt:
+            return None
+        message_id = str(receipt.message_id)
+        self._cache.set(key, message_id)
+        return message_id
+
+    def lookup_many(self, db: Session, user_id, channel_type: str, channel_message_ids: Iterable[str]) -> dict[str, str]:
+        found: dict[str, str] = {}
+        missing: list[str] = []
+        for channel_message_id in set(channel_message_ids):
+            cached = self._cache.get(self._key(user_id, channel_type, channel_message_id))
+            if cached:
+                found[channel_message_id] = cached
+            else:
+                missing.append(channel_message_id)
+        if missing:
+            receipts = (
+                db.query(InboundMessageReceipt)
+                .filter(
+                    InboundMessageReceipt.user_id == user_id,
+                    InboundMessageReceipt.channel_type == channel_type,
+                    InboundMessageReceipt.channel_message_id.in_(missing),
+                )
+                .all()
+            )
+            for receipt in receipts:
+                found[receipt.channel_message_id] = str(receipt.message_id)
+                self._cache.set(self._key(user_id, channel_type, receipt.channel_message_id), str(receipt.message_id))
+        return found
+
+    def record(self, db: Session, user_id, channel_type: str, channel_message_id: Optional[str], message_id) -> None:
+        if not channel_message_id:
+            return
+        db.add(
+            InboundMessageReceipt(
+                user_id=user_id,
+                channel_type=channel_type,
+                channel_message_id=channel_message_id,
+                message_id=message_id,
+            )
+        )
+
+    def remember(self, user_id, channel_type: str, channel_message_id: Optional[str], message_id) -> None:
+        if channel_message_id:
+            self._cache.set(self._key(user_id, channel_type, channel_message_id), str(message_id))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+inbound_dedupe = InboundDedupe()
@@ -0,0 +1,253 @@
+import uuid
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.cache import LRUCache
+from core.config import get_settings
+from db.models import Channel, Contact, ContactSettings, Conversation
+
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+@dataclass(frozen=True)
+class Identity:
+    channel_id: uuid.UUID
+    contact_id: uuid.UUID
+    conversation_id: uuid.UUID
+    contact_created: bool = False
+    conversation_created: bool = False
+
+
+class IdentityCache:
+    """Tenant-scoped id lookups for channel, contact and conversation resolution."""
+
+    def __init__(self, maxsize: Optional[int] = None, ttl_seconds: Optional[float] = None) -> None:
+        settings = get_settings()
+        maxsize = maxsize or settings.ingest_identity_cache_size
+        ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.ingest_identity_cache_ttl_seconds
+        self.channels = LRUCache(maxsize, ttl_seconds)
+        self.contacts = LRUCache(maxsize, ttl_seconds)
+        self.conversations = LRUCache(maxsize, ttl_seconds)
+
+    def remember(self, user_id, channel_type: str, handle: str, identity: Identity) -> None:
+        tenant = str(user_id)
+        self.channels.set((tenant, channel_type), identity.channel_id)
+        self.contacts.set((tenant, handle), identity.contact_id)
+        self.conversations.set((tenant, identity.contact_id, identity.channel_id), identity.conversation_id)
+
+    def forget_channel(self, user_id, channel_type: str, channel_id) -> None:
+        self.channels.pop((str(user_id), channel_type))
+        self.conversations.pop_where(lambda key: key[2] == channel_id)
+
+    def forget_contact(self, user_id, handle: str, contact_id) -> None:
+        self.contacts.pop((str(user_id), handle))
+        self.conversations.pop_where(lambda key: key[1] == contact_id)
+
+    def forget_conversation(self, user_id, contact_id, channel_id) -> None:
+        self.conversations.pop((str(user_id), contact_id, channel_id))
+
+    def forget_tenant(self, user_id) -> None:
+        tenant = str(user_id)
+        for cache in (self.channels, self.contacts, self.conversations):
+            cache.pop_where(lambda key: key[0] == tenant)
+
+    def clear(self) -> None:
+        self.channels.clear()
+        self.contacts.clear()
+        self.conversations.clear()
+
+
+identity_cache = IdentityCache()
+
+
+def resolve_channel_id(db: Session, user_id, channel_type: str) -> uuid.UUID:
+    cached = identity_cache.channels.get((str(user_id), channel_type))
+    if cached:
+        return cached
+    channel_id = db.execute(
+        select(Channel.id).where(Channel.user_id == user_id, Channel.type == channel_type)
+    ).scalar_one_or_none()
+    if channel_id:
+        return channel_id
+    channel_id = db.execute(
+        insert(Channel)
+        .values(id=uuid.uuid4(), user_id=user_id, type=channel_type)
+        .on_conflict_do_nothing(constraint="uq_channel_user_type")
+        .returning(Channel.id)
+    ).scalar_one_or_none()
+    if channel_id:
+        return channel_id
+    # Lost the race against a concurrent first message on this channel.
+    return db.execute(
+        select(Channel.id).where(Channel.user_id == user_id, Channel.type == channel_type)
+    ).scalar_one()
+
+
+def _select_contact_ids(db: Session, user_id, handles: Iterable[str]) -> dict[str, uuid.UUID]:
+    rows = db.execute(
+        select(Contact.handle, Contact.id).where(Contact.user_id == user_id, Contact.handle.in_(list(handles)))
+    ).all()
+    return {handle: contact_id for handle, contact_id in rows}
+
+
+def _insert_contacts(db: Session, user_id, items: list[dict]) -> dict[str, uuid.UUID]:
+    rows = db.execute(
+        insert(Contact)
+        .values(
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "user_id": user_id,
+                    "name": item.get("name") or item["handle"],
+                    "handle": item["handle"],
+                    "avatar_url": item.get("avatar_url"),
+                    "tags": [],
+                }
+                for item in items
+            ]
+        )
+        .on_conflict_do_nothing(constraint="uq_contact_handle")
+        .returning(Contact.handle, Contact.id)
+    ).all()
+    created = {handle: contact_id for handle, contact_id in rows}
+    if created:
+        db.execute(
+            insert(ContactSettings)
+            .values([{"contact_id": contact_id} for contact_id in created.values()])
+            .on_conflict_do_nothing(index_elements=["contact_id"])
+        )
+    return created
+
+
+def _select_conversation_ids(db: Session, user_id, channel_id, contact_ids: Iterable[uuid.UUID]) -> dict[uuid.UUID, uuid.UUID]:
+    rows = db.execute(
+        select(Conversation.contact_id, Conversation.id).where(
+            Conversation.user_id == user_id,
+            Conversation.channel_id == channel_id,
+            Conversation.contact_id.in_(list(contact_ids)),
+        )
+    ).all()
+    return {contact_id: conversation_id for contact_id, conversation_id in rows}
+
+
+def _insert_conversations(db: Session, user_id, channel_id, contact_ids: list[uuid.UUID], opened_at) -> dict[uuid.UUID, uuid.UUID]:
+    rows = db.execute(
+        insert(Conversation)
+        .values(
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "user_id": user_id,
+                    "contact_id": contact_id,
+                    "channel_id": channel_id,
+                    "status": "open",
+                    "unread_count": 0,
+                    "last_message_at": opened_at,
+                }
+                for contact_id in contact_ids
+            ]
+        )
+        .on_conflict_do_nothing(constraint="uq_conversation_contact_channel")
+        .returning(Conversation.contact_id, Conversation.id)
+    ).all()
+    return {contact_id: conversation_id for contact_id, conversation_id in rows}
+
+
+def resolve_identities(db: Session, user_id, channel_type: str, normalized_items: list[dict], opened_at=None) -> dict[str, Identity]:
+    tenant = str(user_id)
+    channel_id = resolve_channel_id(db, user_id, channel_type)
+
+    items_by_handle: dict[str, dict] = {}
+    for item in normalized_items:
+        items_by_handle.setdefault(item["handle"], item)
+
+    contact_ids: dict[str, uuid.UUID] = {}
+    for handle in items_by_handle:
+        cached = identity_cache.contacts.get((tenant, handle))
+        if cached:
+            contact_ids[handle] = cached
+    missing = [handle for handle in items_by_handle if handle not in contact_ids]
+    created_contacts: set[uuid.UUID] = set()
+    if missing:
+        contact_ids.update(_select_contact_ids(db, user_id, missing))
+        missing = [handle for handle in missing if handle not in contact_ids]
+    if missing:
+        inserted = _insert_contacts(db, user_id, [items_by_handle[handle] for handle in missing])
+        contact_ids.update(inserted)
+        created_contacts.update(inserted.values())
+        raced = [handle for handle in missing if handle not in inserted]
+        if raced:
+            contact_ids.update(_select_contact_ids(db, user_id, raced))
+
+    conversation_ids: dict[uuid.UUID, uuid.UUID] = {}
+    for contact_id in set(contact_ids.values()):
+        cached = identity_cache.conversations.get((tenant, contact_id, channel_id))
+        if cached:
+            conversation_ids[contact_id] = cached
+    missing_contacts = [contact_id for contact_id in set(contact_ids.values()) if contact_id not in conversation_ids]
+    created_conversations: set[uuid.UUID] = set()
+    if missing_contacts:
+        conversation_ids.update(_select_conversation_ids(db, user_id, channel_id, missing_contacts))
+        missing_contacts = [contact_id for contact_id in missing_contacts if contact_id not in conversation_ids]
+    if missing_contacts:
+        inserted = _insert_conversations(db, user_id, channel_id, missing_contacts, opened_at)
+        conversation_ids.update(inserted)
+        created_conversations.update(inserted.values())
+        raced = [contact_id for contact_id in missing_contacts if contact_id not in inserted]
+        if raced:
+            conversation_ids.update(_select_conversation_ids(db, user_id, channel_id, raced))
+
+    identities: dict[str, Identity] = {}
+    for handle, contact_id in contact_ids.items():
+        conversation_id = conversation_ids[contact_id]
+        identities[handle] = Identity(
+            channel_id=channel_id,
+            contact_id=contact_id,
+            conversation_id=conversation_id,
+            contact_created=contact_id in created_contacts,
+            conversation_created=conversation_id in created_conversations,
+        )
+    return identities
+
+
+def remember_identities(user_id, channel_type: str, identities: dict[str, Identity]) -> None:
+    # Only called after commit so the cache never points at rows that were rolled back.
+    for handle, identity in identities.items():
+        identity_cache.remember(user_id, channel_type, handle, identity)
+
+
+def forget_identities(user_id) -> None:
+    identity_cache.forget_tenant(user_id)
+
+
+def is_stale_identity_error(exc: IntegrityError) -> bool:
+    # Deletes on another replica only evict that replica's cache, so a cached id can outlive its row
+    # until the TTL runs out; the insert that references it then fails on the foreign key.
+    return getattr(exc.orig, "pgcode", None) == FOREIGN_KEY_VIOLATION
+
+
+@event.listens_for(Channel, "after_delete")
+def _forget_deleted_channel(mapper, connection, target: Channel) -> None:
+    identity_cache.forget_channel(target.user_id, target.type, target.id)
+
+
+@event.listens_for(Contact, "after_delete")
+def _forget_deleted_contact(mapper, connection, target: Contact) -> None:
+    identity_cache.forget_contact(target.user_id, target.handle, target.id)
+
+
+@event.listens_for(Contact, "after_update")
+def _forget_renamed_contact(mapper, connection, target: Contact) -> None:
+    history = inspect(target).attrs.handle.history
+    for old_handle in history.deleted or ():
+        identity_cache.forget_contact(target.user_id, old_handle, target.id)
+
+
+@event.listens_for(Conversation, "after_delete")
+def _forget_deleted_conversation(mapper, connection, target: Conversation) -> None:
+    identity_cache.forget_conversation(target.user_id, target.contact_id, target.channel_id)
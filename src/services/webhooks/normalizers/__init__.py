@@ -0,0 +1,10 @@
+from typing import Callable, Dict
+
+from services.webhooks.normalizers import email, instagram, messenger, whatsapp
+
+NORMALIZERS: Dict[str, Callable[[dict], dict]] = {
+    "whatsapp": whatsapp.normalize,
+    "instagram": instagram.normalize,
+    "messenger": messenger.normalize,
+    "email": email.normalize,
+}
@@ -0,0 +1,463 @@
+import queue
+import threading
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from core.logging import get_logger
+from db.models import AIEvent, Channel, Contact, Conversation, Message, Notification, Task
+from db.session import SessionLocal
+from services.ai import get_ai_provider
+from services.automation.publisher import publish_event
+from services.automation.keyword_matcher import KeywordHits, keyword_index
+from services.automation_builder import run_enabled_automations
+from services.inbox import record_last_body, record_last_classification
+from services.webhooks.normalizers import NORMALIZERS
+
+logger = get_logger(__name__)
+
+STAGES = ("transcription", "classification", "events", "rules", "automations")
+AUDIO_PLACEHOLDER = "[áudio recebido]"
+
+
+class PipelineFullError(Exception):
+    pass
+
+
+@dataclass
+class IngestJob:
+    user_id: uuid.UUID
+    message_id: uuid.UUID
+    conversation_id: uuid.UUID
+    contact_id: uuid.UUID
+    channel_type: str
+    contact_created: bool = False
+    conversation_created: bool = False
+    audio_base64: Optional[str] = None
+    classification: Dict[str, Any] = field(default_factory=dict)
+    keyword_hits: Optional[KeywordHits] = None
+    attempts: int = 0
+
+
+def transcribe_stage(db: Session, job: IngestJob) -> None:
+    if not job.audio_base64:
+        return
+    message = db.get(Message, job.message_id)
+    transcription = get_ai_provider().transcribe_audio(job.audio_base64)
+    if transcription.get("transcription"):
+        message.body = transcription["transcription"]
+        record_last_body(db, message)
+    db.add(
+        AIEvent(
+            user_id=job.user_id,
+            conversation_id=job.conversation_id,
+            event_type="voice.transcribed",
+            payload=transcription,
+        )
+    )
+    job.audio_base64 = None
+
+
+def classify_stage(db: Session, job: IngestJob) -> None:
+    message = db.get(Message, job.message_id)
+    classification = get_ai_provider().classify_message(message.body, history=None)
+    message.ai_classification = classification
+    record_last_classification(db, message)
+    db.add(AIEvent(user_id=job.user_id, conversation_id=job.conversation_id, event_type="message.received", payload=classification))
+    job.classification = classification
+
+
+def publish_stage(db: Session, job: IngestJob) -> None:
+    tenant_id = str(job.user_id)
+    message = db.get(Message, job.message_id)
+    classification = job.classification
+
+    if job.contact_created:
+        contact = db.get(Contact, job.contact_id)
+        publish_event(
+            db,
+            tenant_id,
+            "contact.created",
+            {"contact_id": str(contact.id), "name": contact.name, "handle": contact.handle},
+            source_event_id=str(contact.id),
+        )
+
+    if job.conversation_created:
+        conversation = db.get(Conversation, job.conversation_id)
+        publish_event(
+            db,
+            tenant_id,
+            "conversation.created",
+            {
+                "conversation_id": str(conversation.id),
+                "contact_id": str(job.contact_id),
+                "channel": job.channel_type,
+                "status": conversation.status,
+            },
+            source_event_id=str(conversation.id),
+        )
+
+    publish_event(
+        db,
+        tenant_id,
+        "message.ingested",
+        {
+            "message_id": str(message.id),
+            "conversation_id": str(job.conversation_id),
+            "body": message.body,
+            "channel": job.channel_type,
+            "classification": classification,
+        },
+        source_event_id=message.channel_message_id or str(message.id),
+    )
+
+    if classification.get("affordability_score") is not None:
+        publish_event(
+            db,
+            tenant_id,
+            "lead.score_changed",
+            {
+                "conversation_id": str(job.conversation_id),
+                "contact_id": str(job.contact_id),
+                "score": classification.get("affordability_score"),
+            },
+            source_event_id=f"{message.id}:lead_score",
+        )
+
+
+def rules_stage(db: Session, job: IngestJob) -> None:
+    message = db.get(Message, job.message_id)
+    classification = job.classification
+
+    # One scan covers the rules here and the contains_text conditions of the automations stage.
+    job.keyword_hits = keyword_index.for_tenant(db, job.user_id).scan(message.body)
+    for rule_id in sorted(job.keyword_hits.rule_ids, key=str):
+        db.add(AIEvent(user_id=job.user_id, conversation_id=job.conversation_id, event_type="rule.matched", payload={"rule_id": str(rule_id)}))
+        db.add(
+            Notification(
+                user_id=job.user_id,
+                type="rule_match",
+                entity_type="rule",
+                entity_id=rule_id,
+            )
+        )
+
+    if classification.get("urgency") == "high" or classification.get("sentiment") in {"irritated", "anxious", "frustrated"}:
+        db.add(
+            Notification(
+                user_id=job.user_id,
+                type="urgent_message",
+                entity_type="conversation",
+                entity_id=job.conversation_id,
+            )
+        )
+
+    if classification.get("should_create_task"):
+        contact = db.get(Contact, job.contact_id)
+        task = Task(
+            id=uuid.uuid4(),
+            user_id=job.user_id,
+            conversation_id=job.conversation_id,
+            title=f"Follow up with {contact.name}",
+            due_date=datetime.now(timezone.utc).date() + timedelta(days=1),
+        )
+        db.add(task)
+        db.add(
+            Notification(
+                user_id=job.user_id,
+                type="overdue_task",
+                entity_type="task",
+                entity_id=task.id,
+            )
+        )
+
+
+def automations_stage(db: Session, job: IngestJob) -> None:
+    message = db.get(Message, job.message_id)
+    classification = job.classification
+    keyword_hits = job.keyword_hits or keyword_index.for_tenant(db, job.user_id).scan(message.body)
+    run_enabled_automations(
+        db=db,
+        user_id=job.user_id,
+        event_type="message.ingested",
+        event_payload={
+            "message_id": str(message.id),
+            "conversation_id": str(job.conversation_id),
+            "contact_id": str(job.contact_id),
+            "message": {"id": str(message.id), "text": message.body},
+            "body": message.body,
+            "channel": {"type": job.channel_type},
+            "urgency": classification.get("urgency"),
+            "lead": {"score": classification.get("affordability_score")},
+            "classification": classification,
+        },
+        source_event_id=str(message.id),
+        keyword_hits=keyword_hits,
+    )
+
+
+STAGE_HANDLERS: Dict[str, Callable[[Session, IngestJob], None]] = {
+    "transcription": transcribe_stage,
+    "classification": classify_stage,
+    "events": publish_stage,
+    "rules": rules_stage,
+    "automations": automations_stage,
+}
+
+
+def advance_stage(db: Session, job: IngestJob, stage: str) -> None:
+    """Move the message's stage marker past ``stage`` in the stage's own transaction."""
+    index = STAGES.index(stage) + 1
+    db.execute(
+        update(Message)
+        .where(Message.id == job.message_id)
+        .values(pipeline_stage=STAGES[index] if index < len(STAGES) else None, pipeline_updated_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def default_stage_concurrency() -> Dict[str, int]:
+    settings = get_settings()
+    return {
+        "transcription": settings.ingest_transcription_workers,
+        "classification": settings.ingest_classification_workers,
+        "events": settings.ingest_events_workers,
+        "rules": settings.ingest_rules_workers,
+        "automations": settings.ingest_automations_workers,
+    }
+
+
+class _StageStats:
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+
+
+class IngestionPipeline:
+    """Runs the post-persist ingestion steps as a chain of queues.
+
+    Each stage owns a bounded queue and its own pool of worker threads; a job
+    moves to the next stage once the current one has committed. The message's
+    ``pipeline_stage`` marker advances in the same commit, so :meth:`recover`
+    can requeue work lost with a restart or left behind by a failing stage.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        concurrency: Optional[Dict[str, int]] = None,
+        max_backlog: Optional[int] = None,
+        handlers: Optional[Dict[str, Callable[[Session, IngestJob], None]]] = None,
+    ) -> None:
+        self._session_factory = session_factory
+        self._concurrency = concurrency
+        self._max_backlog = max_backlog
+        self._handlers = handlers or STAGE_HANDLERS
+        self._queues: Dict[str, queue.Queue] = {}
+        self._stats: Dict[str, _StageStats] = {stage: _StageStats() for stage in STAGES}
+        self._workers: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._started = False
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            concurrency = self._concurrency or default_stage_concurrency()
+            max_backlog = self._max_backlog if self._max_backlog is not None else get_settings().ingest_pipeline_max_backlog
+            self._concurrency = concurrency
+            for stage in STAGES:
+                self._queues[stage] = queue.Queue(maxsize=max_backlog)
+                for index in range(max(concurrency.get(stage, 1), 1)):
+                    worker = threading.Thread(
+                        target=self._work,
+                        args=(stage,),
+                        name=f"ingest-{stage}-{index}",
+                        daemon=True,
+                    )
+                    worker.start()
+                    self._workers.append(worker)
+            self._started = True
+
+    def stop(self, timeout: float = 10.0) -> None:
+        with self._lock:
+            if not self._started:
+                return
+            for stage in STAGES:
+                self._queues[stage].join()
+            for stage in STAGES:
+                for _ in range(max(self._concurrency.get(stage, 1), 1)):
+                    self._queues[stage].put(None)
+            for worker in self._workers:
+                worker.join(timeout)
+            self._workers = []
+            self._started = False
+
+    def is_saturated(self) -> bool:
+        first = self._queues.get(STAGES[0])
+        return first is not None and first.full()
+
+    def submit(self, job: IngestJob, timeout: Optional[float] = None, stage: str = STAGES[0]) -> None:
+        """Queue ``job`` at ``stage``, waiting at most ``timeout`` seconds (``INGEST_SUBMIT_TIMEOUT_SECONDS``) for room."""
+        self.start()
+        if timeout is None:
+            timeout = get_settings().ingest_submit_timeout_seconds
+        try:
+            self._queues[stage].put(job, timeout=timeout)
+        except queue.Full as exc:
+            raise PipelineFullError("Ingestion backlog is full") from exc
+
+    def run_inline(self, db: Session, job: IngestJob, first_stage: str = STAGES[0]) -> None:
+        for stage in STAGES[STAGES.index(first_stage) :]:
+            self._handlers[stage](db, job)
+            advance_stage(db, job, stage)
+            db.commit()
+
+    def recover(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Requeue messages whose stage marker has not moved for ``INGEST_RECOVERY_GRACE_SECONDS``.
+
+        Markers are claimed with ``SKIP LOCKED`` and pushed forward, so replicas
+        sweeping together do not requeue the same message. Messages older than
+        ``INGEST_RECOVERY_WINDOW_HOURS`` are given up on. Returns how many were claimed.
+        """
+        settings = get_settings()
+        now = now or datetime.now(timezone.utc)
+        stalled = (
+            select(Message.id)
+            .where(
+                Message.pipeline_stage.isnot(None),
+                Message.pipeline_updated_at < now - timedelta(seconds=settings.ingest_recovery_grace_seconds),
+                Message.created_at > now - timedelta(hours=settings.ingest_recovery_window_hours),
+            )
+            .order_by(Message.pipeline_updated_at)
+            .limit(settings.ingest_recovery_batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        rows = db.execute(
+            update(Message)
+            .where(Message.id.in_(stalled.scalar_subquery()))
+            .values(pipeline_updated_at=now)
+            .returning(
+                Message.id,
+                Message.conversation_id,
+                Message.pipeline_stage,
+                Message.raw_payload,
+                Message.ai_classification,
+                Message.pipeline_contact_created,
+                Message.pipeline_conversation_created,
+            )
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.commit()
+        if not rows:
+            return 0
+
+        conversations = {
+            row.id: row
+            for row in db.execute(
+                select(Conversation.id, Conversation.user_id, Conversation.contact_id, Channel.type)
+                .join(Channel, Channel.id == Conversation.channel_id)
+                .where(Conversation.id.in_({row.conversation_id for row in rows}))
+            ).all()
+        }
+        for row in rows:
+            conversation = conversations.get(row.conversation_id)
+            if conversation is None or row.pipeline_stage not in STAGES:
+                continue
+            normalize = NORMALIZERS.get(conversation.type)
+            job = IngestJob(
+                user_id=conversation.user_id,
+                message_id=row.id,
+                conversation_id=row.conversation_id,
+                contact_id=conversation.contact_id,
+                channel_type=conversation.type,
+                contact_created=row.pipeline_contact_created,
+                conversation_created=row.pipeline_conversation_created,
+                audio_base64=(
+                    normalize(row.raw_payload).get("audio_base64")
+                    if normalize and row.pipeline_stage == STAGES[0]
+                    else None
+                ),
+                classification=row.ai_classification or {},
+            )
+            if not settings.ingest_pipeline_enabled:
+                self.run_inline(db, job, first_stage=row.pipeline_stage)
+                continue
+            try:
+                self.submit(job, timeout=0, stage=row.pipeline_stage)
+            except PipelineFullError:
+                # The rest were claimed too and come due again after the grace period.
+                break
+        return len(rows)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        concurrency = self._concurrency or default_stage_concurrency()
+        return {
+            stage: {
+                "backlog": self._queues[stage].qsize() if stage in self._queues else 0,
+                "workers": max(concurrency.get(stage, 1), 1),
+                "in_flight": self._stats[stage].in_flight,
+                "processed": self._stats[stage].processed,
+                "failed": self._stats[stage].failed,
+            }
+            for stage in STAGES
+        }
+
+    def _work(self, stage: str) -> None:
+        stage_queue = self._queues[stage]
+        next_index = STAGES.index(stage) + 1
+        while True:
+            job = stage_queue.get()
+            if job is None:
+                stage_queue.task_done()
+                return
+            stats = self._stats[stage]
+            with self._stats_lock:
+                stats.in_flight += 1
+            db = self._session_factory()
+            try:
+                self._handlers[stage](db, job)
+                advance_stage(db, job, stage)
+                db.commit()
+            except Exception:
+                db.rollback()
+                logger.exception(
+                    "Ingestion stage failed",
+                    extra={"stage": stage, "message_id": str(job.message_id), "user_id": str(job.user_id)},
+                )
+                with self._stats_lock:
+                    stats.in_flight -= 1
+                    stats.failed += 1
+                self._retry(stage, job)
+                stage_queue.task_done()
+                continue
+            finally:
+                db.close()
+            with self._stats_lock:
+                stats.in_flight -= 1
+                stats.processed += 1
+            job.attempts = 0
+            if next_index < len(STAGES):
+                # Downstream stages block rather than drop work when they fall behind.
+                self._queues[STAGES[next_index]].put(job)
+            stage_queue.task_done()
+
+    def _retry(self, stage: str, job: IngestJob) -> None:
+        job.attempts += 1
+        if job.attempts >= get_settings().ingest_stage_max_attempts:
+            # The message keeps its stage marker, so recover() tries again later.
+            return
+        try:
+            self._queues[stage].put_nowait(job)
+        except queue.Full:
+            pass
+
+
+ingestion_pipeline = IngestionPipeline()
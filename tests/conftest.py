@@ -1,7 +1,90 @@
 import sys
 from pathlib import Path
 
+import pytest
+
 root = Path(__file__).resolve().parents[1]
 src_path = root / "src"
 if str(src_path) not in sys.path:
     sys.path.insert(0, str(src_path))
+
+
+@pytest.fixture(autouse=True)
+def fresh_settings(monkeypatch):
+    """Settings are cached per process; re-read them whenever a test changes the environment."""
+    from core.config import get_settings
+
+    def clearing(method):
+        def wrapper(*args, **kwargs):
+            method(*args, **kwargs)
+            get_settings.cache_clear()
+
+        return wrapper
+
+    monkeypatch.setattr(monkeypatch, "setenv", clearing(monkeypatch.setenv))
+    monkeypatch.setattr(monkeypatch, "delenv", clearing(monkeypatch.delenv))
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+class FakeQuery:
+    def __init__(self, items):
+        self.items = items
+
+    def filter(self, *args, **kwargs):
+        return self
+
+    def all(self):
+        return list(self.items)
+
+
+class FakeDB:
+    """Session stand-in: serves ``rows`` by primary key and records what a test writes.
+
+    A rollback discards the writes made since the last commit, like a real session.
+    """
+
+    def __init__(self, rows=None):
+        self.rows = rows or {}
+        self.added = []
+        self.executed = []
+        self.gets = 0
+        self.queries = 0
+        self.flushes = 0
+        self.commits = 0
+        self.rollbacks = 0
+
+    def get(self, model, key):
+        self.gets += 1
+        return self.rows.get(key)
+
+    def query(self, model):
+        self.queries += 1
+        return FakeQuery(self.rows.values())
+
+    def add(self, item):
+        self.added.append(item)
+
+    def add_all(self, items):
+        self.added.extend(items)
+
+    def execute(self, statement):
+        self.executed.append(statement)
+
+    def flush(self):
+        self.flushes += 1
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.added = []
+        self.executed = []
+
+
+@pytest.fixture
+def fake_db():
+    """The :class:`FakeDB` class; call it for a session, or subclass it to make commits fail."""
+    return FakeDB
@@ -0,0 +1,69 @@
+import uuid
+
+import pytest
+
+from services.audit import AuditWriter
+from services.buffered_writer import BufferedWriter
+
+
+class RecordingSession:
+    batches = []
+
+    def execute(self, statement):
+        self.batches.append(len(statement._multi_values[0]))
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_entries_are_written_in_multi_row_batches_and_flushed_on_stop():
+    RecordingSession.batches = []
+    writer = AuditWriter(max_buffer=100, batch_size=4, flush_interval=60, session_factory=RecordingSession)
+    user_id = uuid.uuid4()
+
+    for index in range(10):
+        writer.record(user_id, f"GET /api/v1/conversations/{index}")
+    writer.stop()
+
+    assert sum(RecordingSession.batches) == 10
+    assert max(RecordingSession.batches) <= 4
+    assert writer.stats() == {"buffered": 0, "written": 10, "failed": 0}
+
+
+def test_offer_reports_a_full_buffer_instead_of_blocking(monkeypatch):
+    writer = AuditWriter(max_buffer=1, batch_size=10, flush_interval=1, session_factory=RecordingSession)
+    monkeypatch.setattr(writer, "start", lambda: True)
+
+    assert writer.offer(uuid.uuid4(), "GET /api/v1/me") is True
+    assert writer.offer(uuid.uuid4(), "GET /api/v1/me") is False
+
+
+def test_entries_after_stop_are_written_inline_without_restarting(monkeypatch):
+    RecordingSession.batches = []
+    registered = []
+    monkeypatch.setattr("services.buffered_writer.atexit.register", registered.append)
+    writer = AuditWriter(max_buffer=100, batch_size=4, flush_interval=60, session_factory=RecordingSession)
+    writer.record(uuid.uuid4(), "GET /api/v1/me")
+    writer.stop()
+
+    assert writer.offer(uuid.uuid4(), "GET /api/v1/me") is True
+    writer.record(uuid.uuid4(), "GET /api/v1/me")
+
+    assert writer._thread is None
+    assert len(registered) == 1
+    assert RecordingSession.batches == [1, 1, 1]
+    assert writer.stats()["written"] == 3
+
+
+def test_writer_without_write_fails_when_built():
+    class Incomplete(BufferedWriter):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete(max_buffer=1, batch_size=1, flush_interval=1)
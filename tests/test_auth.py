@@ -1,12 +1,20 @@
+import uuid
 from datetime import timedelta
+from types import SimpleNamespace
 
-from sqlalchemy import create_engine
+from fastapi import Depends, FastAPI, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 
+from api import deps
+from api.deps import CurrentUser, get_current_user, request_user_id
 from api.routers.auth import LoginRequest, RegisterRequest, login, register
 from core.security import create_token, decode_token, get_password_hash, verify_password
 from db.base import Base
 from db.models import Notification, User
+from db.session import get_db
 
 
 def test_password_hash_roundtrip():
@@ -66,3 +74,75 @@ def test_login_only_creates_welcome_once():
             assert notifications[0].type == "onboarding"
     finally:
         engine.dispose()
+
+
+def test_current_user_is_decoded_once_and_cached_until_changed(monkeypatch):
+    # Endpoints run in a worker thread, so every thread must share the one in-memory database.
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[User.__table__])
+    TestingSession = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    decodes, selects = [], []
+    event.listen(engine, "before_cursor_execute", lambda *args: selects.append(args[2]) if "FROM users" in args[2] else None)
+    real_decode = deps.decode_token
+    monkeypatch.setattr(deps, "decode_token", lambda *args, **kwargs: decodes.append(args) or real_decode(*args, **kwargs))
+    try:
+        with TestingSession() as db:  # type: Session
+            user = User(name="Grace", email="grace@example.com", password_hash="x", role="agent")
+            db.add(user)
+            db.commit()
+            user_id = user.id
+        selects.clear()
+
+        app = FastAPI()
+        seen = []
+
+        @app.middleware("http")
+        async def audit(request: Request, call_next):
+            response = await call_next(request)
+            seen.append(request_user_id(request, "unused"))
+            return response
+
+        @app.get("/me")
+        def me(current_user: CurrentUser = Depends(get_current_user)):
+            return {"role": current_user.role}
+
+        def testing_db():
+            with TestingSession() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = testing_db
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {create_token(str(user_id), timedelta(minutes=5), 'access')}"}
+
+        assert client.get("/me", headers=headers).json() == {"role": "agent"}
+        assert client.get("/me", headers=headers).json() == {"role": "agent"}
+        # One decode per request, shared with the middleware; one user lookup in total.
+        assert len(decodes) == 2
+        assert seen == [str(user_id), str(user_id)]
+        assert len(selects) == 1
+
+        with TestingSession() as db:  # type: Session
+            db.get(User, user_id).role = "admin"
+            db.commit()
+        assert client.get("/me", headers=headers).json() == {"role": "admin"}
+    finally:
+        deps.user_cache.clear()
+        engine.dispose()
+
+
+def test_user_cache_limits_follow_a_settings_reload(monkeypatch):
+    monkeypatch.setattr(deps.user_cache, "ttl_seconds", deps.user_cache.ttl_seconds)
+    monkeypatch.setattr(deps.user_cache, "maxsize", deps.user_cache.maxsize)
+    monkeypatch.setenv("AUTH_USER_CACHE_TTL_SECONDS", "5")
+    monkeypatch.setenv("AUTH_USER_CACHE_SIZE", "7")
+    user_id = uuid.uuid4()
+    row = SimpleNamespace(id=user_id, name="Grace", email="grace@example.com", role="agent")
+    db = SimpleNamespace(query=lambda *columns: SimpleNamespace(filter=lambda *args: SimpleNamespace(first=lambda: row)))
+    request = SimpleNamespace(state=SimpleNamespace(user_id=str(user_id)))
+    try:
+        get_current_user(request, SimpleNamespace(credentials="unused"), db)
+
+        assert (deps.user_cache.ttl_seconds, deps.user_cache.maxsize) == (5, 7)
+        assert deps.user_cache.get(str(user_id)).id == user_id
+    finally:
+        deps.user_cache.clear()
@@ -0,0 +1,126 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import requests
+
+from services.automation import audit as automation_audit
+from services.automation import publisher
+from services.automation.signing import verify_signature
+
+
+class DummyDB:
+    def __init__(self):
+        self.commits = 0
+
+    def execute(self, statement):
+        return SimpleNamespace(scalar_one=lambda: 1, rowcount=1)
+
+    def commit(self):
+        self.commits += 1
+
+
+def make_batch(size):
+    tenant_id = str(uuid.uuid4())
+    destination = SimpleNamespace(
+        id=uuid.uuid4(),
+        user_id=tenant_id,
+        url="https://hooks.example.com/batch",
+        secret_env_key="AUTOMATION_DESTINATION_SECRET_BATCH",
+        secret_encrypted=None,
+        circuit_failures=0,
+        circuit_open_until=None,
+    )
+    deliveries = [
+        SimpleNamespace(
+            attempts=0,
+            last_error=None,
+            next_retry_at=None,
+            status="pending",
+            event=SimpleNamespace(
+                id=uuid.uuid4(),
+                user_id=tenant_id,
+                type="message.ingested",
+                payload={"index": index},
+                occurred_at=datetime.now(timezone.utc),
+            ),
+        )
+        for index in range(size)
+    ]
+    return destination, deliveries
+
+
+def test_batch_is_one_signed_request_with_per_event_status(monkeypatch):
+    monkeypatch.setenv("AUTOMATION_RATE_LIMIT_PER_MINUTE", "100")
+    monkeypatch.setenv("AUTOMATION_DESTINATION_SECRET_BATCH", "secret")
+    calls = []
+
+    def fake_post(self, url, data=None, headers=None, timeout=None):
+        calls.append((data, headers))
+        return SimpleNamespace(raise_for_status=lambda: None)
+
+    monkeypatch.setattr(requests.Session, "post", fake_post)
+    audited = []
+    monkeypatch.setattr(automation_audit, "audit_writer", SimpleNamespace(record=lambda *args: audited.append(args)))
+    destination, deliveries = make_batch(3)
+
+    assert publisher.send_batch(DummyDB(), deliveries, destination) is True
+
+    assert len(calls) == 1
+    body, headers = calls[0]
+    assert [event["payload"]["index"] for event in json.loads(body)["events"]] == [0, 1, 2]
+    assert headers["X-Alfred-Batch-Size"] == "3"
+    assert headers["X-Alfred-Event-Id"] == headers["X-Alfred-Batch-Id"]
+    assert verify_signature(
+        "secret", headers["X-Alfred-Timestamp"], headers["X-Alfred-Batch-Id"], destination.user_id, body, headers["X-Alfred-Signature"]
+    )
+    assert {delivery.status for delivery in deliveries} == {"sent"}
+    assert [action.split(" | ")[0] for _, action, _ in audited] == ["automation_batch_sent"]
+
+
+def test_failed_batch_schedules_every_event_for_retry(monkeypatch):
+    monkeypatch.setenv("AUTOMATION_RATE_LIMIT_PER_MINUTE", "100")
+    monkeypatch.setenv("AUTOMATION_MAX_ATTEMPTS", "3")
+    monkeypatch.setenv("AUTOMATION_DESTINATION_SECRET_BATCH", "secret")
+
+    def fake_post(self, *args, **kwargs):
+        raise requests.RequestException("boom")
+
+    monkeypatch.setattr(requests.Session, "post", fake_post)
+    destination, deliveries = make_batch(2)
+
+    assert publisher.send_batch(DummyDB(), deliveries, destination) is False
+    assert [(delivery.status, delivery.attempts) for delivery in deliveries] == [("pending", 1), ("pending", 1)]
+    assert all(delivery.next_retry_at for delivery in deliveries)
+
+
+def test_sweep_groups_batch_destinations_into_chunks(monkeypatch):
+    batch_destination, single_destination = uuid.uuid4(), uuid.uuid4()
+    claimed = [(uuid.uuid4(), batch_destination) for _ in range(5)] + [(uuid.uuid4(), single_destination)]
+    rows = [
+        SimpleNamespace(id=batch_destination, max_concurrency=None, batch_enabled=True, batch_max_size=2),
+        SimpleNamespace(id=single_destination, max_concurrency=None, batch_enabled=False, batch_max_size=100),
+    ]
+
+    class FakeSession:
+        def query(self, *columns):
+            return SimpleNamespace(filter=lambda *args: SimpleNamespace(all=lambda: rows))
+
+        def close(self):
+            pass
+
+    submitted = []
+    monkeypatch.setenv("AUTOMATION_ENABLED", "true")
+    monkeypatch.setattr(publisher, "SessionLocal", FakeSession)
+    monkeypatch.setattr(publisher, "claim_due_deliveries", lambda db, limit: ("token", claimed))
+    monkeypatch.setattr(publisher.delivery_engine, "_max_workers", 4)
+    monkeypatch.setattr(
+        publisher.delivery_engine, "submit", lambda key, task_id, fn, limit: submitted.append((key, fn.func.__name__, fn.args[0]))
+    )
+
+    publisher.process_pending_deliveries()
+
+    batches = [len(ids) for key, name, ids in submitted if name == "deliver_pending_batch"]
+    assert batches == [2, 2, 1]
+    assert [ids for key, name, ids in submitted if name == "deliver_pending"] == [claimed[-1][0]]
@@ -1,7 +1,8 @@
 import uuid
+from datetime import datetime
+from types import SimpleNamespace
 
 from services import automation_builder as ab
-from contextlib import contextmanager
 
 from services.automation_builder import (
     AutomationFlow,
@@ -18,42 +19,6 @@ from services.automation_builder import (
 
 class DummyDB:
     pass
-)
-from db.models import Conversation
-
-
-class FakeQuery:
-    def __init__(self, items):
-        self.items = items
-
-    def filter(self, *args, **kwargs):
-        return self
-
-    def first(self):
-        return self.items[0] if self.items else None
-
-
-class FakeDB:
-    def __init__(self, conversation):
-        self.added = []
-        self.conversation = conversation
-
-    def add(self, item):
-        self.added.append(item)
-
-    def flush(self):
-        for item in self.added:
-            if hasattr(item, "id") and getattr(item, "id") is None:
-                item.id = uuid.uuid4()
-
-    @contextmanager
-    def begin_nested(self):
-        yield
-
-    def query(self, model):
-        if model.__name__ == "Conversation":
-            return FakeQuery([self.conversation])
-        return FakeQuery([])
 
 
 def test_flow_schema_validation_requires_actions():
@@ -86,10 +51,6 @@ def test_execute_actions_create_task_and_update_conversation_status(monkeypatch)
         return {"ok": True}
 
     monkeypatch.setattr(ab, "execute_action", fake_execute_action)
-def test_execute_actions_create_task_and_update_conversation_status():
-    user_id = uuid.uuid4()
-    conversation = Conversation(id=uuid.uuid4(), user_id=user_id, contact_id=uuid.uuid4(), channel_id=uuid.uuid4(), status="open")
-    db = FakeDB(conversation)
 
     actions = [
         ActionCreateTask(type="create_task", title="Retornar cliente", priority="high"),
@@ -108,6 +69,10 @@ def test_execute_actions_create_task_and_update_conversation_status():
     assert calls[1][0] == "update_conversation_status"
     assert executed[0]["type"] == "create_task"
     assert results["actions"][1]["status"] == "closed"
+    assert results["tasks"] == ["task-1"]
+    assert results["conversation_status"] == "closed"
+    # Each action is carried out once, through the shared callback executor.
+    assert len(calls) == len(executed) == 2
 
 
 def test_builder_catalog_is_frontend_ready():
@@ -115,14 +80,85 @@ def test_builder_catalog_is_frontend_ready():
     assert catalog["ui"]["frontend_ready"] is True
     assert any(item["type"] == "message.ingested" for item in catalog["triggers"])
     assert any(item["type"] == "create_task" for item in catalog["actions"])
-        db=db,
-        user_id=user_id,
-        actions=actions,
-        event_payload={"conversation_id": str(conversation.id)},
-        source_event_id="msg-1",
-    )
 
-    assert any(a["type"] == "create_task" for a in executed)
-    assert any(a["type"] == "update_conversation_status" and a["status"] == "closed" for a in executed)
-    assert results["conversation_status"] == "closed"
-    assert conversation.status == "closed"
+
+FLOW = {
+    "trigger": {"type": "message.ingested"},
+    "conditions": [{"type": "contains_text", "text": "PIX"}, {"type": "urgency_is", "value": "high"}],
+    "actions": [{"type": "create_task", "title": "Retornar"}],
+}
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def filter(self, *criteria):
+        for criterion in criteria:
+            ids = getattr(getattr(criterion, "right", None), "value", None)
+            if isinstance(ids, list):
+                self.rows = [row for row in self.rows if row.id in ids]
+        return self
+
+    def order_by(self, *args):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class AutomationDB:
+    """Serves the version query (id, updated_at) and the flow_json query for stale ids."""
+
+    def __init__(self, automations):
+        self.automations = automations
+        self.queries = []
+
+    def query(self, *columns):
+        self.queries.append(len(columns))
+        if len(columns) == 2:
+            return FakeQuery([SimpleNamespace(id=a.id, updated_at=a.updated_at) for a in self.automations])
+        return FakeQuery(self.automations)
+
+
+def automation(flow_json=FLOW, updated_at=datetime(2026, 1, 1)):
+    return SimpleNamespace(id=uuid.uuid4(), updated_at=updated_at, flow_json=flow_json)
+
+
+def test_compiled_conditions_match_on_pre_lowercased_text():
+    flow = ab.compile_flow(uuid.uuid4(), None, FLOW)
+    matched, details = ab.check_conditions(flow.conditions, ab.event_facts({"body": "Aceita pix?", "urgency": "high"}))
+
+    assert flow.conditions[0].spec == {"type": "contains_text", "text": "PIX"}
+    assert matched is True and [item["passed"] for item in details] == [True, True]
+    assert ab.check_conditions(flow.conditions, ab.event_facts({"body": "Oi", "urgency": "high"}))[0] is False
+
+
+def test_registry_compiles_each_automation_version_once(monkeypatch):
+    validations = []
+    original = AutomationFlow.model_validate
+    monkeypatch.setattr(AutomationFlow, "model_validate", lambda data: validations.append(1) or original(data))
+    registry = ab.FlowRegistry(maxsize=10, ttl_seconds=60, compiled_size=10)
+    tenant = uuid.uuid4()
+    first, second = automation(), automation()
+    db = AutomationDB([first, second])
+
+    assert [flow.automation_id for flow in registry.flows(db, tenant, "message.ingested")] == [first.id, second.id]
+    assert db.queries == [2, 3] and len(validations) == 2
+
+    registry.flows(db, tenant, "message.ingested")
+    assert db.queries == [2, 3]
+
+    # After an edit only the changed automation's flow is fetched and validated again.
+    second.updated_at = datetime(2026, 1, 2)
+    registry.invalidate(tenant)
+    registry.flows(db, tenant, "message.ingested")
+    assert db.queries == [2, 3, 2, 3] and len(validations) == 3
+
+
+def test_registry_skips_automations_with_invalid_flows():
+    registry = ab.FlowRegistry(maxsize=10, ttl_seconds=60, compiled_size=10)
+    valid = automation()
+    db = AutomationDB([automation(flow_json={"trigger": {"type": "message.ingested"}, "actions": []}), valid])
+
+    assert [flow.automation_id for flow in registry.flows(db, uuid.uuid4(), "message.ingested")] == [valid.id]
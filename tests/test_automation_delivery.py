@@ -1,15 +1,22 @@
+import uuid
 from datetime import datetime, timezone
 from types import SimpleNamespace
 
 import requests
+from sqlalchemy.dialects import postgresql
 
-from services.automation.publisher import send_delivery
+from db.models import AutomationDelivery
+from services.automation import audit as automation_audit
+from services.automation.publisher import enqueue_deliveries, send_delivery
 
 
 class DummyDB:
     def __init__(self):
         self.commits = 0
 
+    def execute(self, statement):
+        return SimpleNamespace(scalar_one=lambda: 1, rowcount=1)
+
     def commit(self):
         self.commits += 1
 
@@ -26,7 +33,9 @@ def test_send_delivery_success(monkeypatch):
     monkeypatch.setenv("AUTOMATION_RATE_LIMIT_PER_MINUTE", "100")
     monkeypatch.setenv("AUTOMATION_ENABLED", "true")
     monkeypatch.setenv("AUTOMATION_DESTINATION_SECRET_TEST", "secret")
-    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(requests.Session, "post", fake_post)
+    audited = []
+    monkeypatch.setattr(automation_audit, "audit_writer", SimpleNamespace(record=lambda *args: audited.append(args)))
 
     db = DummyDB()
     event = SimpleNamespace(
@@ -50,6 +59,7 @@ def test_send_delivery_success(monkeypatch):
 
     assert send_delivery(db, delivery, destination, event) is True
     assert delivery.status == "sent"
+    assert [action.split(" | ")[0] for _, action, _ in audited] == ["automation_event_sent"]
 
 
 def test_send_delivery_failure_sets_retry(monkeypatch):
@@ -62,7 +72,7 @@ def test_send_delivery_failure_sets_retry(monkeypatch):
     monkeypatch.setenv("AUTOMATION_RATE_LIMIT_PER_MINUTE", "100")
     monkeypatch.setenv("AUTOMATION_ENABLED", "true")
     monkeypatch.setenv("AUTOMATION_DESTINATION_SECRET_TEST", "secret")
-    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(requests.Session, "post", fake_post)
 
     db = DummyDB()
     event = SimpleNamespace(
@@ -89,3 +99,31 @@ def test_send_delivery_failure_sets_retry(monkeypatch):
     assert delivery.attempts == 1
     if delivery.status == "pending":
         assert delivery.next_retry_at is not None
+
+
+def test_enqueue_deliveries_is_one_statement_per_event():
+    destinations = [SimpleNamespace(id=uuid.uuid4(), batch_enabled=False) for _ in range(10)]
+    event = SimpleNamespace(id=uuid.uuid4(), user_id=uuid.uuid4())
+    statements = []
+
+    class EnqueueDB(DummyDB):
+        def scalars(self, statement):
+            statements.append(statement)
+            # The first destination already had a delivery for this event.
+            inserted = [
+                AutomationDelivery(id=uuid.uuid4(), destination_id=destination.id, event_id=event.id)
+                for destination in destinations[1:]
+            ]
+            return SimpleNamespace(all=lambda: inserted)
+
+    db = EnqueueDB()
+    deliveries = enqueue_deliveries(db, event, destinations)
+
+    assert len(statements) == 1
+    assert db.commits == 1
+    sql = str(statements[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT ON CONSTRAINT uq_automation_delivery_event_destination DO NOTHING" in sql
+    assert "RETURNING" in sql
+    assert len(statements[0]._multi_values[0]) == 10
+    assert [delivery.destination_id for delivery in deliveries] == [destination.id for destination in destinations[1:]]
+    assert all(delivery.event is event for delivery in deliveries)
@@ -1,43 +1,56 @@
 from types import SimpleNamespace
 
-from sqlalchemy.exc import IntegrityError
-
-from services.automation.publisher import create_event
+from db.models import AutomationEvent
+from services.automation import publisher
+from services.automation.publisher import create_event, publish_event
 
 
 class FakeQuery:
-    def __init__(self, existing):
-        self.existing = existing
+    def __init__(self, rows):
+        self.rows = rows
 
     def filter(self, *args, **kwargs):
         return self
 
-    def first(self):
-        return self.existing
+    def one(self):
+        return self.rows[0]
+
+    def all(self):
+        return self.rows
+
+
+class FakeScalars:
+    def __init__(self, row):
+        self.row = row
+
+    def one_or_none(self):
+        return self.row
 
 
 class FakeDB:
-    def __init__(self, existing):
+    """Keeps pending changes until commit; a rollback throws them away."""
+
+    def __init__(self, existing, inserted=None):
         self.existing = existing
-        self.commit_calls = 0
+        self.inserted = inserted
+        self.pending = []
+        self.committed = []
         self.rollback_calls = 0
 
-    def add(self, item):
-        self.added = item
+    def scalars(self, statement):
+        return FakeScalars(self.inserted)
+
+    def query(self, model):
+        assert model is AutomationEvent
+        return FakeQuery([self.existing])
 
     def commit(self):
-        self.commit_calls += 1
-        if self.commit_calls == 1:
-            raise IntegrityError("stmt", "params", Exception("duplicate"))
+        self.committed.extend(self.pending)
+        self.pending = []
 
     def rollback(self):
         self.rollback_calls += 1
-
-    def query(self, model):
-        return FakeQuery(self.existing)
-
-    def refresh(self, item):
-        return None
+        self.pending = []
 
 
 def test_create_event_returns_existing_on_duplicate_source_event_id():
@@ -53,4 +66,26 @@ def test_create_event_returns_existing_on_duplicate_source_event_id():
     )
 
     assert result is existing
-    assert db.rollback_calls == 1
+    assert db.rollback_calls == 0
+
+
+def test_repeated_conversation_status_keeps_the_callers_change(monkeypatch):
+    # open -> closed -> open -> closed publishes "<id>:closed" twice.
+    existing = SimpleNamespace(id="event-from-first-close")
+    db = FakeDB(existing=existing)
+    db.pending.append(("conversation.status", "closed"))
+    routes = SimpleNamespace(for_event=lambda event_type: [SimpleNamespace(id="destination-1")])
+    monkeypatch.setattr(publisher.destination_cache, "routes", lambda db, tenant_id: routes)
+    monkeypatch.setattr(publisher, "enqueue_deliveries", lambda db, event, destinations: [])
+    monkeypatch.setattr(publisher, "dispatch_deliveries", lambda db, deliveries, routes: None)
+    monkeypatch.setattr(
+        publisher,
+        "get_settings",
+        lambda: SimpleNamespace(automation_enabled=True, automation_outbox_enabled=False),
+    )
+
+    event_id = publish_event(db, "tenant-1", "conversation.updated", {"status": "closed"}, source_event_id="c-1:closed")
+
+    assert event_id == "event-from-first-close"
+    assert db.rollback_calls == 0
+    assert ("conversation.status", "closed") in db.committed
@@ -0,0 +1,77 @@
+import uuid
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from services.automation import publisher
+from services.automation.publisher import publish_event
+
+
+class FakeQuery:
+    def __init__(self, items):
+        self.items = items
+
+    def filter(self, *args, **kwargs):
+        return self
+
+    def all(self):
+        return list(self.items)
+
+
+class FakeDB:
+    def __init__(self, destinations, event_id):
+        self.destinations = destinations
+        self.event_id = event_id
+        self.statements = []
+        self.commits = 0
+
+    def query(self, *columns):
+        return FakeQuery(self.destinations)
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        return SimpleNamespace(scalar_one_or_none=lambda: self.event_id)
+
+    def commit(self):
+        self.commits += 1
+
+
+def compiled(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def destinations():
+    return [
+        SimpleNamespace(id=uuid.uuid4(), event_types=["*"], batch_enabled=False, batch_linger_seconds=2, max_concurrency=None),
+        SimpleNamespace(id=uuid.uuid4(), event_types=["task.created"], batch_enabled=False, batch_linger_seconds=2, max_concurrency=None),
+        SimpleNamespace(id=uuid.uuid4(), event_types=["message.sent"], batch_enabled=False, batch_linger_seconds=2, max_concurrency=None),
+    ]
+
+
+def test_outbox_stages_event_and_deliveries_in_callers_transaction(monkeypatch):
+    monkeypatch.setenv("AUTOMATION_ENABLED", "true")
+    monkeypatch.setenv("AUTOMATION_OUTBOX_ENABLED", "true")
+    monkeypatch.setattr(publisher, "send_delivery", lambda *args: (_ for _ in ()).throw(AssertionError("no inline send")))
+    event_id = uuid.uuid4()
+    db = FakeDB(destinations(), event_id)
+
+    result = publish_event(db, str(uuid.uuid4()), "task.created", {"task_id": "t-1"}, source_event_id="t-1")
+
+    assert result == event_id
+    assert db.commits == 0
+    event_insert, deliveries_insert, notify = db.statements
+    assert "ON CONFLICT ON CONSTRAINT uq_automation_event_source DO NOTHING" in compiled(event_insert)
+    # Both eligible destinations are written by a single multi-row INSERT.
+    assert compiled(deliveries_insert).count("VALUES") == 1
+    assert len(deliveries_insert._multi_values[0]) == 2
+    assert "pg_notify" in compiled(notify)
+
+
+def test_outbox_skips_deliveries_for_an_already_staged_source_event(monkeypatch):
+    monkeypatch.setenv("AUTOMATION_ENABLED", "true")
+    monkeypatch.setenv("AUTOMATION_OUTBOX_ENABLED", "true")
+    db = FakeDB(destinations(), None)
+
+    assert publish_event(db, str(uuid.uuid4()), "task.created", {"task_id": "t-1"}, source_event_id="t-1") is None
+    assert len(db.statements) == 1
+    assert db.commits == 0
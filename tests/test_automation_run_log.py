@@ -0,0 +1,133 @@
+import uuid
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+from sqlalchemy.dialects import postgresql
+
+from services import automation_builder
+from services.automation_builder import CompiledFlow, event_facts, run_compiled_flow
+from services.automation_run_log import RunLogWriter, UnmatchedRun
+
+
+class FakeDB:
+    def __init__(self):
+        self.added = []
+        self.commits = 0
+        self.statements = []
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def begin_nested(self):
+        return nullcontext()
+
+    def execute(self, statement):
+        self.statements.append(statement)
+
+
+def _flow(conditions=()):
+    return CompiledFlow(
+        automation_id=uuid.uuid4(),
+        updated_at=None,
+        trigger_type="message.ingested",
+        conditions=tuple(conditions),
+        actions=(),
+    )
+
+
+def _writer(monkeypatch, **kwargs):
+    writer = RunLogWriter(max_buffer=100, batch_size=10, flush_interval=60, **kwargs)
+    monkeypatch.setattr(writer, "start", lambda: True)
+    monkeypatch.setattr(automation_builder, "run_log_writer", writer)
+    return writer
+
+
+def _drain(writer):
+    items = []
+    while not writer._queue.empty():
+        items.append(writer._queue.get_nowait())
+    return items
+
+
+def test_run_triggered_by_a_message_keeps_its_payload(monkeypatch):
+    writer = _writer(monkeypatch, sample_rate=0.0)
+    db = FakeDB()
+    payload = {"message_id": "m-1", "body": "oi"}
+
+    output = run_compiled_flow(
+        db, uuid.uuid4(), _flow(), "message.ingested", payload, event_facts(payload), source_event_id="m-1"
+    )
+
+    assert output["matched"] is True
+    assert len(db.added) == 1 and db.commits == 1
+    assert db.added[0].source_event_id == "m-1"
+    assert db.added[0].event_payload == payload
+    assert output["run_id"] == str(db.added[0].id)
+    assert _drain(writer) == []
+
+
+def test_run_for_a_stored_event_keeps_only_the_reference(monkeypatch):
+    _writer(monkeypatch, sample_rate=0.0)
+    db = FakeDB()
+
+    run_compiled_flow(
+        db,
+        uuid.uuid4(),
+        _flow(),
+        "message.ingested",
+        {"body": "oi"},
+        event_facts({"body": "oi"}),
+        source_event_id="event-1",
+        event_stored=True,
+    )
+
+    assert db.added[0].source_event_id == "event-1"
+    assert db.added[0].event_payload is None
+
+
+def test_unmatched_run_is_counted_without_touching_the_session(monkeypatch):
+    writer = _writer(monkeypatch, sample_rate=0.0)
+    db = FakeDB()
+
+    output = run_compiled_flow(db, uuid.uuid4(), _flow(), "conversation.updated", {}, event_facts({}))
+
+    assert output["matched"] is False and output["run_id"] is None
+    assert db.added == [] and db.commits == 0
+    assert [type(item) for item in _drain(writer)] == [UnmatchedRun]
+
+
+def test_sampled_unmatched_runs_are_buffered_as_rows(monkeypatch):
+    writer = _writer(monkeypatch, sample_rate=0.5, sample=lambda: 0.1)
+    payload = {"body": "oi"}
+
+    output = run_compiled_flow(FakeDB(), uuid.uuid4(), _flow(), "conversation.updated", payload, event_facts(payload))
+
+    unmatched, row = _drain(writer)
+    assert isinstance(unmatched, UnmatchedRun)
+    assert row["matched"] is False and row["event_payload"] == payload
+    assert output["run_id"] == str(row["id"])
+
+
+def test_counters_are_aggregated_into_one_upsert():
+    writer = RunLogWriter(max_buffer=10, batch_size=10, flush_interval=60, sample_rate=0.0)
+    db = FakeDB()
+    user_id, automation_id = uuid.uuid4(), uuid.uuid4()
+    other = uuid.uuid4()
+    bucket = datetime(2026, 10, 17, 9, tzinfo=timezone.utc)
+    batch = [UnmatchedRun(user_id, automation_id, "conversation.updated", bucket)] * 3 + [
+        UnmatchedRun(user_id, other, "conversation.updated", bucket)
+    ]
+
+    writer.write(db, batch)
+
+    assert len(db.statements) == 1
+    sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (automation_id, event_type, bucket) DO UPDATE" in sql
+    params = db.statements[0].compile(dialect=postgresql.dialect()).params
+    assert sorted(value for key, value in params.items() if key.startswith("unmatched")) == [1, 3]
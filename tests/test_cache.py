@@ -0,0 +1,42 @@
+from core.cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_expires_entries_after_ttl():
+    clock = FakeClock()
+    cache = LRUCache(maxsize=10, ttl_seconds=5, clock=clock)
+    cache.set("a", 1)
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    clock.now = 5.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_pop_where_removes_matching_keys():
+    cache = LRUCache(maxsize=10)
+    cache.set(("tenant-1", "x"), 1)
+    cache.set(("tenant-1", "y"), 2)
+    cache.set(("tenant-2", "x"), 3)
+
+    assert cache.pop_where(lambda key: key[0] == "tenant-1") == 2
+    assert cache.get(("tenant-2", "x")) == 3
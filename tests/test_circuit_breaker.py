@@ -0,0 +1,75 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from services.automation import circuit_breaker
+from services.automation.publisher import send_delivery
+
+
+class FakeDB:
+    def __init__(self, failures=1, rowcount=1):
+        self.failures = failures
+        self.rowcount = rowcount
+        self.executed = 0
+        self.commits = 0
+
+    def execute(self, statement):
+        self.executed += 1
+        return SimpleNamespace(scalar_one=lambda: self.failures, rowcount=self.rowcount)
+
+    def commit(self):
+        self.commits += 1
+
+
+def destination(failures=0, open_until=None):
+    return SimpleNamespace(id=uuid.uuid4(), circuit_failures=failures, circuit_open_until=open_until)
+
+
+def test_circuit_states(monkeypatch):
+    monkeypatch.setenv("AUTOMATION_CIRCUIT_FAILURE_THRESHOLD", "3")
+    now = datetime.now(timezone.utc)
+
+    assert circuit_breaker.circuit_state(destination(2)) == circuit_breaker.CLOSED
+    assert circuit_breaker.circuit_state(destination(3, now + timedelta(seconds=30))) == circuit_breaker.OPEN
+    assert circuit_breaker.circuit_state(destination(3, now - timedelta(seconds=1))) == circuit_breaker.HALF_OPEN
+
+
+def test_only_one_worker_wins_the_half_open_probe(monkeypatch):
+    monkeypatch.setenv("AUTOMATION_CIRCUIT_FAILURE_THRESHOLD", "3")
+    expired = datetime.now(timezone.utc) - timedelta(seconds=1)
+
+    assert circuit_breaker.acquire(FakeDB(rowcount=1), destination(3, expired)) is True
+    loser = destination(3, expired)
+    assert circuit_breaker.acquire(FakeDB(rowcount=0), loser) is False
+    assert circuit_breaker.circuit_state(loser) == circuit_breaker.OPEN
+
+
+def test_failures_open_the_circuit_with_growing_capped_backoff(monkeypatch):
+    monkeypatch.setenv("AUTOMATION_CIRCUIT_FAILURE_THRESHOLD", "3")
+    monkeypatch.setenv("AUTOMATION_CIRCUIT_OPEN_SECONDS", "10")
+    monkeypatch.setenv("AUTOMATION_CIRCUIT_MAX_OPEN_SECONDS", "60")
+    monkeypatch.setattr(circuit_breaker, "with_jitter", lambda seconds: seconds)
+
+    assert circuit_breaker.record_failure(FakeDB(failures=2), destination(1)) is None
+    assert circuit_breaker.open_duration(3) == timedelta(seconds=10)
+    assert circuit_breaker.open_duration(4) == timedelta(seconds=20)
+    assert circuit_breaker.open_duration(10) == timedelta(seconds=60)
+
+    target = destination(2)
+    reopen_at = circuit_breaker.record_failure(FakeDB(failures=3), target)
+    assert reopen_at is not None
+    assert target.circuit_open_until == reopen_at
+
+
+def test_open_circuit_defers_delivery_without_spending_an_attempt(monkeypatch):
+    monkeypatch.setenv("AUTOMATION_CIRCUIT_FAILURE_THRESHOLD", "3")
+    open_until = datetime.now(timezone.utc) + timedelta(minutes=5)
+    delivery = SimpleNamespace(attempts=2, last_error=None, next_retry_at=None, status="pending")
+    event = SimpleNamespace(id="event-1", user_id="tenant-1", type="message.sent", payload={}, occurred_at=datetime.now(timezone.utc))
+    db = FakeDB()
+
+    assert send_delivery(db, delivery, destination(3, open_until), event) is False
+    assert delivery.attempts == 2
+    assert delivery.last_error == "circuit_open"
+    assert delivery.next_retry_at == open_until
+    assert db.executed == 0
@@ -0,0 +1,51 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from api.pagination import encode_cursor, encode_rank_cursor
+from api.routers.contacts import build_contact_query
+from services import contact_search
+
+
+def compiled(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_query_matches_through_the_trigram_indexed_expression():
+    cursor = encode_rank_cursor(1.25, uuid.uuid4())
+    sql = compiled(build_contact_query(uuid.uuid4(), "Ana", cursor=cursor, limit=20))
+
+    assert "contact_search_text(contacts.name, contacts.handle, contacts.tags) LIKE '%%ana%%'" in sql
+    assert "'ana' <%% contact_search_text(" in sql
+    assert "word_similarity('ana', contact_search_text(" in sql
+    assert "lower(contacts.name) LIKE 'ana%%'" in sql
+    assert "ILIKE" not in sql
+    assert "1.25" in sql
+    assert "LIMIT 21" in sql
+
+
+def test_typeahead_returns_only_ids_and_names():
+    statement = build_contact_query(uuid.uuid4(), "an", typeahead=True, limit=10)
+
+    assert [column.key for column in statement.selected_columns] == ["id", "name", "rank"]
+
+
+def test_browse_pages_newest_first_on_created_at():
+    cursor = encode_cursor(datetime(2026, 1, 1, tzinfo=timezone.utc), uuid.uuid4())
+    sql = compiled(build_contact_query(uuid.uuid4(), cursor=cursor))
+
+    assert "(contacts.created_at, contacts.id) < (" in sql
+    assert "ORDER BY contacts.created_at DESC, contacts.id DESC" in sql
+    assert "contact_search_text" not in sql
+
+
+def test_like_wildcards_in_the_query_are_escaped():
+    assert contact_search.escape_like("50%_off") == "50\\%\\_off"
+
+
+def test_rank_cursor_must_be_well_formed():
+    with pytest.raises(HTTPException):
+        build_contact_query(uuid.uuid4(), "ana", cursor=encode_cursor(None, uuid.uuid4()))
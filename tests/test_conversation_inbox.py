@@ -0,0 +1,125 @@
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+from sqlalchemy.schema import CreateIndex
+
+from api.pagination import decode_cursor, encode_cursor
+from api.routers import webhooks
+from api.routers.conversations import list_conversations
+from db.models import Conversation, Message
+from services.webhooks import pipeline
+
+
+class CapturingDB:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    def query(self, *entities):
+        db = self
+
+        class CapturedQuery(Query):
+            def all(self):
+                db.statements.append(self.statement)
+                return list(db.rows[: self._limit_clause.value])
+
+        return CapturedQuery(entities)
+
+
+def row(at):
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        unread_count=1,
+        last_message_at=at,
+        last_message_body="Oi",
+        last_message_direction="inbound",
+        last_sentiment="positive",
+        last_urgency="high",
+        contact_name="Ana",
+        contact_avatar_url=None,
+        channel_type="whatsapp",
+    )
+
+
+def test_cursor_round_trips_and_rejects_garbage():
+    at, row_id = datetime(2026, 10, 17, tzinfo=timezone.utc), uuid.uuid4()
+
+    assert decode_cursor(encode_cursor(at, row_id)) == (at, row_id)
+    assert decode_cursor(encode_cursor(None, row_id)) == (None, row_id)
+    with pytest.raises(HTTPException):
+        decode_cursor("not-a-cursor")
+
+
+def test_inbox_is_one_keyset_query_without_loading_messages():
+    now = datetime.now(timezone.utc)
+    db = CapturingDB([row(now), row(now), row(now)])
+    response = Response()
+    cursor = encode_cursor(now, uuid.uuid4())
+
+    summaries = list_conversations(
+        response, SimpleNamespace(id=uuid.uuid4()), db, None, None, None, False, "positive", None, cursor, 2
+    )
+
+    assert [summary.last_message for summary in summaries] == ["Oi", "Oi"]
+    assert summaries[0].urgency == "high"
+    assert decode_cursor(response.headers["X-Next-Cursor"]) == (now, uuid.UUID(summaries[-1].id))
+    (statement,) = db.statements
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "(conversations.last_message_at, conversations.id) < (" in sql
+    assert "ORDER BY conversations.last_message_at DESC NULLS LAST, conversations.id DESC" in sql
+    assert "conversations.last_sentiment = " in sql
+    assert "FROM messages" not in sql
+
+
+def test_ingest_writes_the_latest_message_onto_the_conversation():
+    statements = []
+    db = SimpleNamespace(execute=statements.append)
+    conversation_id = uuid.uuid4()
+    first = Message(id=uuid.uuid4(), conversation_id=conversation_id, direction="inbound", body="first")
+    second = Message(id=uuid.uuid4(), conversation_id=conversation_id, direction="inbound", body="second")
+
+    webhooks._touch_conversations(db, Counter({conversation_id: 2}), {conversation_id: second}, datetime.now(timezone.utc))
+
+    (statement,) = statements
+    params = statement.compile(dialect=postgresql.dialect()).params
+    assert params["last_message_body"] == "second"
+    assert params["last_message_id"] == second.id
+    assert first.body not in params.values()
+
+
+def test_transcription_replaces_the_audio_placeholder_on_the_conversation(monkeypatch):
+    statements = []
+    message = Message(id=uuid.uuid4(), conversation_id=uuid.uuid4(), direction="inbound", body=pipeline.AUDIO_PLACEHOLDER)
+    db = SimpleNamespace(get=lambda model, key: message, add=lambda item: None, execute=statements.append)
+    provider = SimpleNamespace(transcribe_audio=lambda audio: {"transcription": "call me back"})
+    monkeypatch.setattr(pipeline, "get_ai_provider", lambda: provider)
+    job = pipeline.IngestJob(
+        user_id=uuid.uuid4(),
+        message_id=message.id,
+        conversation_id=message.conversation_id,
+        contact_id=uuid.uuid4(),
+        channel_type="whatsapp",
+        audio_base64="AAAA",
+    )
+
+    pipeline.transcribe_stage(db, job)
+
+    (statement,) = statements
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "conversations.last_message_id = %(last_message_id_1)s" in sql
+    params = statement.compile(dialect=postgresql.dialect()).params
+    assert params["last_message_body"] == "call me back"
+    assert params["last_message_id_1"] == message.id
+
+
+def test_inbox_index_matches_the_inbox_order():
+    (index,) = [index for index in Conversation.__table__.indexes if index.name == "ix_conversations_user_last"]
+
+    sql = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+    assert "(user_id, last_message_at DESC NULLS LAST, id DESC)" in sql
@@ -0,0 +1,85 @@
+import uuid
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from services.automation import publisher
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def filter(self, *args, **kwargs):
+        return self
+
+    def all(self):
+        return list(self.rows)
+
+
+class FakeSession:
+    def __init__(self, rows=None, delivery=None):
+        self.rows = rows or []
+        self.delivery = delivery
+        self.statements = []
+        self.commits = 0
+        self.closed = False
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        return SimpleNamespace(all=lambda: list(self.rows), rowcount=0)
+
+    def query(self, *columns):
+        return FakeQuery([])
+
+    def get(self, model, key):
+        return self.delivery
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        self.closed = True
+
+
+def test_claim_skips_rows_locked_by_other_dispatchers():
+    db = FakeSession()
+
+    token, claimed = publisher.claim_due_deliveries(db, 25)
+
+    sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "ORDER BY automation_deliveries.next_retry_at" in sql
+    assert "RETURNING automation_deliveries.id, automation_deliveries.destination_id" in sql
+    assert isinstance(token, uuid.UUID)
+    assert claimed == []
+    assert db.commits == 1
+
+
+def test_sweep_submits_claimed_rows_with_their_lease(monkeypatch):
+    delivery_id, destination_id = uuid.uuid4(), uuid.uuid4()
+    token = uuid.uuid4()
+    submitted = []
+    monkeypatch.setenv("AUTOMATION_ENABLED", "true")
+    monkeypatch.setenv("AUTOMATION_DISPATCH_BATCH_SIZE", "10")
+    monkeypatch.setattr(publisher, "SessionLocal", lambda: FakeSession())
+    monkeypatch.setattr(publisher, "claim_due_deliveries", lambda db, limit: (token, [(delivery_id, destination_id)]))
+    monkeypatch.setattr(
+        publisher.delivery_engine,
+        "submit",
+        lambda key, task_id, fn, limit: submitted.append((key, task_id, fn.args, limit)),
+    )
+    monkeypatch.setattr(publisher.delivery_engine, "_max_workers", 4)
+
+    publisher.process_pending_deliveries()
+
+    assert submitted == [(destination_id, delivery_id, (delivery_id, token), 4)]
+
+
+def test_lost_lease_is_not_sent(monkeypatch):
+    session = FakeSession(delivery=SimpleNamespace(status="pending"))
+    monkeypatch.setattr(publisher, "SessionLocal", lambda: session)
+    monkeypatch.setattr(publisher, "send_delivery", lambda *args: (_ for _ in ()).throw(AssertionError("double send")))
+
+    assert publisher.deliver_pending(uuid.uuid4(), uuid.uuid4()) is False
+    assert session.closed is True
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from services.automation.delivery import DeliveryEngine, HostSessionPool
+
+
+def test_engine_caps_in_flight_work_per_destination():
+    engine = DeliveryEngine(max_workers=8)
+    lock = threading.Lock()
+    running = {"slow": 0, "fast": 0}
+    peak = {"slow": 0, "fast": 0}
+
+    def task(key):
+        def run():
+            with lock:
+                running[key] += 1
+                peak[key] = max(peak[key], running[key])
+            time.sleep(0.02)
+            with lock:
+                running[key] -= 1
+
+        return run
+
+    for index in range(6):
+        engine.submit("slow", f"slow-{index}", task("slow"), limit=2)
+        engine.submit("fast", f"fast-{index}", task("fast"), limit=6)
+
+    assert engine.wait(timeout=5)
+    assert peak["slow"] == 2
+    assert peak["fast"] > 2
+    assert engine.stats()["completed"] == 12
+    engine.stop()
+
+
+def test_engine_skips_tasks_that_are_already_queued():
+    engine = DeliveryEngine(max_workers=1)
+    release = threading.Event()
+    calls = []
+
+    assert engine.submit("dest", "delivery-1", lambda: release.wait(5) and calls.append(1), limit=1) is True
+    assert engine.submit("dest", "delivery-1", lambda: calls.append(2), limit=1) is False
+    release.set()
+
+    assert engine.wait(timeout=5)
+    assert calls == [1]
+    engine.stop()
+
+
+def test_engine_keeps_running_after_a_failed_task():
+    engine = DeliveryEngine(max_workers=1)
+    calls = []
+
+    def boom():
+        raise RuntimeError("boom")
+
+    engine.submit("dest", "delivery-1", boom, limit=1)
+    engine.submit("dest", "delivery-2", lambda: calls.append("ok"), limit=1)
+
+    assert engine.wait(timeout=5)
+    assert calls == ["ok"]
+    assert engine.stats()["failed"] == 1
+    engine.stop()
+
+
+def test_sessions_are_shared_per_origin():
+    pool = HostSessionPool(pool_maxsize=4)
+
+    first = pool.session_for("https://hooks.example.com/a")
+    assert pool.session_for("https://hooks.example.com/b?x=1") is first
+    assert pool.session_for("https://other.example.com/a") is not first
+    pool.close()
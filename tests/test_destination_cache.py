@@ -0,0 +1,83 @@
+import uuid
+from types import SimpleNamespace
+
+from services.automation import publisher
+from services.automation.destination_cache import DestinationCache, DestinationCacheListener, build_routes
+
+
+class CountingDB:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def query(self, *columns):
+        self.queries += 1
+        return SimpleNamespace(filter=lambda *args: SimpleNamespace(all=lambda: list(self.rows)))
+
+
+def row(event_types, batch_enabled=False, max_concurrency=None):
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        event_types=event_types,
+        batch_enabled=batch_enabled,
+        batch_linger_seconds=2,
+        max_concurrency=max_concurrency,
+    )
+
+
+def test_routes_fold_wildcard_destinations_into_every_event_type():
+    catch_all, tasks, messages = row(["*"]), row(["task.created", "task.created"]), row(["message.sent"], batch_enabled=True)
+
+    routes = build_routes([catch_all, tasks, messages])
+
+    assert [route.id for route in routes.for_event("task.created")] == [tasks.id, catch_all.id]
+    assert [route.id for route in routes.for_event("message.sent")] == [messages.id, catch_all.id]
+    assert [route.id for route in routes.for_event("contact.created")] == [catch_all.id]
+    assert routes.for_event("message.sent")[0].batch_enabled is True
+    assert build_routes([row([])]).for_event("task.created") == ()
+
+
+def test_cache_hits_skip_the_database_until_invalidated():
+    cache = DestinationCache(maxsize=10, ttl_seconds=60)
+    tenant_id = uuid.uuid4()
+    db = CountingDB([row(["*"])])
+
+    cache.routes(db, tenant_id)
+    cache.routes(db, str(tenant_id))
+    assert db.queries == 1
+
+    DestinationCacheListener(cache).handle(str(tenant_id))
+    cache.routes(db, tenant_id)
+    assert db.queries == 2
+
+
+def test_tenant_without_destinations_costs_one_query(monkeypatch):
+    monkeypatch.setenv("AUTOMATION_ENABLED", "true")
+    db = CountingDB([])
+    tenant_id = str(uuid.uuid4())
+
+    for _ in range(3):
+        assert publisher.publish_event(db, tenant_id, "message.ingested", {}) is None
+
+    assert db.queries == 1
+
+
+def test_publishing_to_cached_destinations_does_not_query_them(monkeypatch):
+    monkeypatch.setenv("AUTOMATION_ENABLED", "true")
+    tenant_id = uuid.uuid4()
+    destination = row(["message.ingested"], max_concurrency=3)
+    publisher.destination_cache.tenants.set(str(tenant_id), publisher.destination_cache.routes(CountingDB([destination]), tenant_id))
+    enqueued, dispatched = [], []
+    monkeypatch.setattr(publisher, "create_event", lambda db, *args, **kwargs: SimpleNamespace(id="event-1"))
+    monkeypatch.setattr(publisher, "enqueue_deliveries", lambda db, event, routes: enqueued.extend(routes) or ["delivery"])
+    monkeypatch.setattr(publisher, "dispatch_deliveries", lambda db, deliveries, routes: dispatched.append(deliveries))
+    db = CountingDB([])
+
+    try:
+        assert publisher.publish_event(db, str(tenant_id), "message.ingested", {}) == "event-1"
+    finally:
+        publisher.destination_cache.invalidate(tenant_id)
+
+    assert db.queries == 0
+    assert [(route.id, route.max_concurrency) for route in enqueued] == [(destination.id, 3)]
+    assert dispatched == [["delivery"]]
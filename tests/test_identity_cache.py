@@ -0,0 +1,117 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from services.webhooks import identity as identity_module
+from services.webhooks.identity import Identity, identity_cache, remember_identities, resolve_identities
+
+
+class RecordingDB:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        raise AssertionError("cached identities must not hit the database")
+
+
+@pytest.fixture(autouse=True)
+def clear_identity_cache():
+    identity_cache.clear()
+    yield
+    identity_cache.clear()
+
+
+def test_steady_conversation_resolves_without_queries():
+    user_id = uuid.uuid4()
+    known = Identity(channel_id=uuid.uuid4(), contact_id=uuid.uuid4(), conversation_id=uuid.uuid4())
+    remember_identities(user_id, "whatsapp", {"5511": known})
+    db = RecordingDB()
+
+    resolved = resolve_identities(db, user_id, "whatsapp", [{"handle": "5511"}])
+
+    assert resolved["5511"] == known
+    assert db.statements == []
+
+
+def test_cache_is_scoped_per_tenant():
+    known = Identity(channel_id=uuid.uuid4(), contact_id=uuid.uuid4(), conversation_id=uuid.uuid4())
+    remember_identities(uuid.uuid4(), "whatsapp", {"5511": known})
+
+    with pytest.raises(AssertionError):
+        resolve_identities(RecordingDB(), uuid.uuid4(), "whatsapp", [{"handle": "5511"}])
+
+
+def test_missing_rows_are_upserted_and_lost_races_are_reselected(monkeypatch):
+    user_id = uuid.uuid4()
+    channel_id = uuid.uuid4()
+    new_contact, raced_contact = uuid.uuid4(), uuid.uuid4()
+    new_conversation, raced_conversation = uuid.uuid4(), uuid.uuid4()
+    selects = {"contacts": 0, "conversations": 0}
+
+    def select_contacts(db, user_id, handles):
+        selects["contacts"] += 1
+        return {"222": raced_contact} if selects["contacts"] == 2 else {}
+
+    def select_conversations(db, user_id, channel_id, contact_ids):
+        selects["conversations"] += 1
+        return {raced_contact: raced_conversation} if selects["conversations"] == 2 else {}
+
+    monkeypatch.setattr(identity_module, "resolve_channel_id", lambda db, user_id, channel_type: channel_id)
+    monkeypatch.setattr(identity_module, "_select_contact_ids", select_contacts)
+    monkeypatch.setattr(identity_module, "_insert_contacts", lambda db, user_id, items: {"111": new_contact})
+    monkeypatch.setattr(identity_module, "_select_conversation_ids", select_conversations)
+    monkeypatch.setattr(
+        identity_module,
+        "_insert_conversations",
+        lambda db, user_id, channel_id, contact_ids, opened_at: {new_contact: new_conversation},
+    )
+
+    resolved = resolve_identities(None, user_id, "whatsapp", [{"handle": "111"}, {"handle": "222"}, {"handle": "111"}])
+
+    assert resolved["111"] == Identity(channel_id, new_contact, new_conversation, True, True)
+    assert resolved["222"] == Identity(channel_id, raced_contact, raced_conversation, False, False)
+    # Nothing is cached until the caller has committed.
+    assert len(identity_cache.contacts) == 0
+
+
+def test_contact_upsert_does_nothing_on_conflict():
+    captured = []
+
+    class CaptureDB:
+        def execute(self, statement):
+            captured.append(statement)
+            return SimpleNamespace(all=lambda: [])
+
+    identity_module._insert_contacts(CaptureDB(), uuid.uuid4(), [{"handle": "111"}])
+
+    sql = str(captured[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT ON CONSTRAINT uq_contact_handle DO NOTHING" in sql
+    assert "RETURNING" in sql
+
+
+def test_deleting_a_contact_evicts_its_conversations():
+    user_id = uuid.uuid4()
+    known = Identity(channel_id=uuid.uuid4(), contact_id=uuid.uuid4(), conversation_id=uuid.uuid4())
+    other = Identity(channel_id=known.channel_id, contact_id=uuid.uuid4(), conversation_id=uuid.uuid4())
+    remember_identities(user_id, "whatsapp", {"5511": known, "5522": other})
+
+    identity_module._forget_deleted_contact(None, None, SimpleNamespace(user_id=user_id, handle="5511", id=known.contact_id))
+
+    assert (str(user_id), "5511") not in identity_cache.contacts
+    assert (str(user_id), known.contact_id, known.channel_id) not in identity_cache.conversations
+    assert (str(user_id), other.contact_id, other.channel_id) in identity_cache.conversations
+
+
+def test_forgetting_a_tenant_keeps_other_tenants_cached():
+    stale_user, other_user = uuid.uuid4(), uuid.uuid4()
+    known = Identity(channel_id=uuid.uuid4(), contact_id=uuid.uuid4(), conversation_id=uuid.uuid4())
+    remember_identities(stale_user, "whatsapp", {"5511": known})
+    remember_identities(other_user, "whatsapp", {"5511": known})
+
+    identity_module.forget_identities(stale_user)
+
+    assert len(identity_cache.channels) == len(identity_cache.contacts) == len(identity_cache.conversations) == 1
+    assert resolve_identities(RecordingDB(), other_user, "whatsapp", [{"handle": "5511"}])["5511"] == known
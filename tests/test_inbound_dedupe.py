@@ -0,0 +1,53 @@
+import uuid
+from types import SimpleNamespace
+
+from api.routers import webhooks as webhooks_module
+from api.routers.webhooks import ingest_webhook
+from services.webhooks.dedupe import InboundDedupe
+
+
+def test_lookup_uses_lru_after_first_database_hit(fake_db):
+    user_id = uuid.uuid4()
+    message_id = uuid.uuid4()
+    receipt = SimpleNamespace(channel_message_id="wamid-1", message_id=message_id)
+    db = fake_db({(user_id, "whatsapp", "wamid-1"): receipt})
+    dedupe = InboundDedupe(maxsize=10)
+
+    assert dedupe.lookup(db, user_id, "whatsapp", "wamid-1") == str(message_id)
+    assert dedupe.lookup(db, user_id, "whatsapp", "wamid-1") == str(message_id)
+    assert db.gets == 1
+
+
+def test_lookup_ignores_messages_without_provider_id(fake_db):
+    db = fake_db()
+    assert InboundDedupe(maxsize=10).lookup(db, uuid.uuid4(), "email", None) is None
+    assert db.gets == 0
+
+
+def test_remember_short_circuits_lookup_many(fake_db):
+    user_id = uuid.uuid4()
+    dedupe = InboundDedupe(maxsize=10)
+    dedupe.remember(user_id, "whatsapp", "wamid-1", "message-1")
+    db = fake_db()
+
+    assert dedupe.lookup_many(db, user_id, "whatsapp", ["wamid-1"]) == {"wamid-1": "message-1"}
+    assert db.queries == 0
+
+
+def test_redelivery_exits_before_identity_resolution(monkeypatch, fake_db):
+    def fail(*args, **kwargs):
+        raise AssertionError("redelivery must not resolve identities")
+
+    monkeypatch.setattr(webhooks_module.inbound_dedupe, "lookup", lambda db, user_id, channel_type, key: "message-1")
+    monkeypatch.setattr(webhooks_module, "resolve_identities", fail)
+
+    result = ingest_webhook(
+        "whatsapp",
+        {"id": "wamid-1", "from": "5511", "message": "hi"},
+        response=SimpleNamespace(status_code=200),
+        current_user=SimpleNamespace(id=uuid.uuid4()),
+        db=fake_db(),
+    )
+
+    assert result["status"] == "duplicate"
+    assert result["message_id"] == "message-1"
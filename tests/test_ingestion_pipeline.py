@@ -0,0 +1,204 @@
+import threading
+import uuid
+from types import SimpleNamespace
+
+from services.webhooks.pipeline import STAGES, IngestionPipeline, IngestJob, PipelineFullError
+
+
+class FakeSession:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(statement)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        return None
+
+
+def _job():
+    return IngestJob(
+        user_id=uuid.uuid4(),
+        message_id=uuid.uuid4(),
+        conversation_id=uuid.uuid4(),
+        contact_id=uuid.uuid4(),
+        channel_type="whatsapp",
+    )
+
+
+def test_pipeline_runs_every_stage_in_order():
+    seen = []
+    lock = threading.Lock()
+
+    def make_handler(stage):
+        def handler(db, job):
+            with lock:
+                seen.append((stage, job.message_id))
+        return handler
+
+    pipeline = IngestionPipeline(
+        session_factory=FakeSession,
+        concurrency={stage: 2 for stage in STAGES},
+        max_backlog=10,
+        handlers={stage: make_handler(stage) for stage in STAGES},
+    )
+    job = _job()
+    pipeline.submit(job)
+    pipeline.stop()
+
+    assert [stage for stage, _ in seen] == list(STAGES)
+    stats = pipeline.stats()
+    assert all(stats[stage]["processed"] == 1 for stage in STAGES)
+    assert all(stats[stage]["backlog"] == 0 for stage in STAGES)
+
+
+def test_failed_stage_is_retried_then_stops_job():
+    calls = []
+
+    def failing(db, job):
+        raise RuntimeError("classifier down")
+
+    handlers = {stage: (lambda db, job, stage=stage: calls.append(stage)) for stage in STAGES}
+    handlers["classification"] = failing
+    pipeline = IngestionPipeline(
+        session_factory=FakeSession,
+        concurrency={stage: 1 for stage in STAGES},
+        max_backlog=10,
+        handlers=handlers,
+    )
+    pipeline.submit(_job())
+    pipeline.stop()
+
+    assert calls == ["transcription"]
+    # Retried up to INGEST_STAGE_MAX_ATTEMPTS, then left to recover() through the stage marker.
+    assert pipeline.stats()["classification"]["failed"] == 3
+    assert pipeline.stats()["events"]["processed"] == 0
+
+
+def test_run_inline_commits_after_each_stage():
+    handlers = {stage: (lambda db, job: None) for stage in STAGES}
+    pipeline = IngestionPipeline(session_factory=FakeSession, handlers=handlers)
+    db = FakeSession()
+    pipeline.run_inline(db, _job())
+    assert db.commits == len(STAGES)
+
+
+def test_submit_gives_up_when_the_backlog_stays_full():
+    release = threading.Event()
+    handlers = {stage: (lambda db, job: None) for stage in STAGES}
+    handlers["transcription"] = lambda db, job: release.wait(5)
+    pipeline = IngestionPipeline(
+        session_factory=FakeSession,
+        concurrency={stage: 1 for stage in STAGES},
+        max_backlog=1,
+        handlers=handlers,
+    )
+    pipeline.submit(_job())
+    pipeline.submit(_job(), timeout=1)
+
+    try:
+        pipeline.submit(_job(), timeout=0.05)
+    except PipelineFullError:
+        pass
+    else:
+        raise AssertionError("submit should not block past its timeout")
+    finally:
+        release.set()
+        pipeline.stop()
+
+
+def test_dispatch_falls_back_to_inline_when_the_pipeline_is_full(monkeypatch):
+    from api.routers import webhooks as webhooks_module
+
+    inline = []
+
+    def full(job):
+        raise PipelineFullError("full")
+
+    monkeypatch.setattr(webhooks_module.ingestion_pipeline, "submit", full)
+    monkeypatch.setattr(webhooks_module.ingestion_pipeline, "run_inline", lambda db, job: inline.append(job))
+    jobs = [_job(), _job()]
+
+    assert webhooks_module._dispatch_jobs(FakeSession(), jobs) is False
+    assert inline == jobs
+
+
+def test_each_stage_moves_the_message_marker_in_its_commit():
+    handlers = {stage: (lambda db, job: None) for stage in STAGES}
+    pipeline = IngestionPipeline(session_factory=FakeSession, handlers=handlers)
+    db = FakeSession()
+
+    pipeline.run_inline(db, _job(), first_stage="rules")
+
+    markers = [statement.compile().params["pipeline_stage"] for statement in db.statements]
+    assert markers == ["automations", None]
+    assert db.commits == 2
+
+
+class RecoverySession(FakeSession):
+    def __init__(self, claimed, conversations):
+        super().__init__()
+        self.results = [claimed, conversations]
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        rows = self.results.pop(0)
+        return SimpleNamespace(all=lambda: rows)
+
+
+def test_recover_requeues_stalled_messages_at_their_stage(monkeypatch):
+    user_id, contact_id, conversation_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    claimed = [
+        SimpleNamespace(
+            id=uuid.uuid4(),
+            conversation_id=conversation_id,
+            pipeline_stage="rules",
+            raw_payload={},
+            ai_classification={"urgency": "high"},
+            pipeline_contact_created=False,
+            pipeline_conversation_created=False,
+        )
+    ]
+    conversations = [SimpleNamespace(id=conversation_id, user_id=user_id, contact_id=contact_id, type="whatsapp")]
+    pipeline = IngestionPipeline(session_factory=FakeSession)
+    submitted = []
+    monkeypatch.setattr(pipeline, "submit", lambda job, timeout=None, stage=STAGES[0]: submitted.append((stage, job)))
+
+    assert pipeline.recover(RecoverySession(claimed, conversations)) == 1
+
+    (stage, job), = submitted
+    assert stage == "rules"
+    assert (job.user_id, job.contact_id, job.channel_type) == (user_id, contact_id, "whatsapp")
+    assert job.classification == {"urgency": "high"}
+
+
+def test_recover_replays_creation_events_for_a_new_contact(monkeypatch):
+    user_id, contact_id, conversation_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    claimed = [
+        SimpleNamespace(
+            id=uuid.uuid4(),
+            conversation_id=conversation_id,
+            pipeline_stage="events",
+            raw_payload={},
+            ai_classification={},
+            pipeline_contact_created=True,
+            pipeline_conversation_created=True,
+        )
+    ]
+    conversations = [SimpleNamespace(id=conversation_id, user_id=user_id, contact_id=contact_id, type="whatsapp")]
+    pipeline = IngestionPipeline(session_factory=FakeSession)
+    submitted = []
+    monkeypatch.setattr(pipeline, "submit", lambda job, timeout=None, stage=STAGES[0]: submitted.append(job))
+
+    pipeline.recover(RecoverySession(claimed, conversations))
+
+    (job,) = submitted
+    assert (job.contact_created, job.conversation_created) == (True, True)
@@ -0,0 +1,50 @@
+import random
+import uuid
+from types import SimpleNamespace
+
+from services.automation.keyword_matcher import KeywordMatcher, build_keywords
+from services.automation_builder import check_conditions, compile_flow, event_facts
+
+
+def flow_json(*needles):
+    return {
+        "trigger": {"type": "message.ingested"},
+        "conditions": [{"type": "contains_text", "text": needle} for needle in needles],
+        "actions": [{"type": "create_task", "title": "Retornar"}],
+    }
+
+
+def test_matcher_agrees_with_substring_search():
+    rng = random.Random(3)
+    needles = ["he", "she", "his", "hers", "preço", "pix", "a", "aba", "bab", ""]
+    matcher = KeywordMatcher(needles)
+    for _ in range(500):
+        text = "".join(rng.choices("abehirsx ", k=rng.randint(0, 30)))
+        assert matcher.find(text) == {needle for needle in needles if needle in text}
+    assert {"preço", "pix"} <= matcher.find("qual o preço no pix?")
+
+
+def test_one_scan_reports_rules_and_automations():
+    rule = SimpleNamespace(id=uuid.uuid4(), compiled_json={"keywords": ["Angry", "refund"]})
+    silent = SimpleNamespace(id=uuid.uuid4(), compiled_json=None)
+    flow = compile_flow(uuid.uuid4(), None, flow_json("PIX"))
+    keywords = build_keywords([rule, silent], [flow])
+
+    hits = keywords.scan("Customer is ANGRY, wants pix")
+
+    assert hits.needles == {"angry", "pix"}
+    assert hits.rule_ids == {rule.id}
+    assert hits.automation_ids == {flow.automation_id}
+    assert keywords.scan(None).needles == frozenset()
+
+
+def test_contains_text_reads_the_scan_and_falls_back_for_unindexed_needles():
+    payload = {"body": "pix ou boleto?"}
+    # The index predates the edit that added "boleto", so that needle is searched in the text directly.
+    hits = build_keywords([], [compile_flow(uuid.uuid4(), None, flow_json("pix"))]).scan(payload["body"])
+    edited = compile_flow(uuid.uuid4(), None, flow_json("pix", "boleto"))
+
+    assert "boleto" not in hits.indexed
+    assert check_conditions(edited.conditions, event_facts(payload, hits))[0] is True
+    assert event_facts({"body": "pix"}, hits).contains("pix")
+    assert not event_facts({"body": "pix"}, build_keywords([], []).scan("")).contains("boleto")
@@ -0,0 +1,103 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy.dialects import postgresql
+
+from api.pagination import decode_cursor, encode_cursor
+from api.routers.messages import build_message_page_query, list_messages
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+HISTORY = [
+    SimpleNamespace(id=uuid.UUID(int=index + 1), body=f"m{index}", direction="inbound", created_at=START + timedelta(minutes=index))
+    for index in range(7)
+]
+
+
+def compiled(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalar_one_or_none(self):
+        return self.rows[0] if self.rows else None
+
+    def all(self):
+        return list(self.rows)
+
+
+class FakeDB:
+    """Answers the ownership check, then serves the page from an in-memory history."""
+
+    def __init__(self, conversation_id):
+        self.conversation_id = conversation_id
+        self.calls = 0
+
+    def execute(self, statement):
+        self.calls += 1
+        if self.calls == 1:
+            return FakeResult([self.conversation_id])
+        params = list(statement.compile().params.values())
+        limit = next(value for value in params if isinstance(value, int))
+        at = next((value for value in params if isinstance(value, datetime)), None)
+        row_id = next((value for value in params if isinstance(value, uuid.UUID)), None)
+        ascending = "ASC" in compiled(statement)
+        rows = sorted(HISTORY, key=lambda m: (m.created_at, m.id), reverse=not ascending)
+        if at is not None:
+            if ascending:
+                rows = [m for m in rows if (m.created_at, m.id) > (at, row_id)]
+            else:
+                rows = [m for m in rows if (m.created_at, m.id) < (at, row_id)]
+        return FakeResult(rows[:limit])
+
+
+def page(**kwargs):
+    response = Response()
+    messages = list_messages(
+        "c1", response, current_user=SimpleNamespace(id="u1"), db=FakeDB("c1"), **{"before": None, "after": None, "limit": 3, **kwargs}
+    )
+    return [m.body for m in messages], response.headers
+
+
+def test_page_query_walks_the_conversation_index_with_a_keyset():
+    cursor = encode_cursor(START, uuid.uuid4())
+    before = compiled(build_message_page_query("c1", before=cursor, limit=50))
+    after = compiled(build_message_page_query("c1", after=cursor, limit=50))
+
+    assert "(messages.created_at, messages.id) < (" in before
+    assert "ORDER BY messages.created_at DESC, messages.id DESC" in before
+    assert "(messages.created_at, messages.id) > (" in after
+    assert "ORDER BY messages.created_at ASC, messages.id ASC" in after
+    assert "OFFSET" not in before + after
+
+
+def test_history_opens_on_the_latest_page_and_walks_back():
+    bodies, headers = page()
+    assert bodies == ["m4", "m5", "m6"]
+    assert decode_cursor(headers["X-After-Cursor"])[1] == HISTORY[6].id
+
+    bodies, headers = page(before=headers["X-Before-Cursor"])
+    assert bodies == ["m1", "m2", "m3"]
+
+    bodies, headers = page(before=headers["X-Before-Cursor"])
+    assert bodies == ["m0"]
+    assert "X-Before-Cursor" not in headers
+
+
+def test_after_cursor_reads_newer_messages_forward():
+    bodies, headers = page(after=encode_cursor(HISTORY[1].created_at, HISTORY[1].id))
+
+    assert bodies == ["m2", "m3", "m4"]
+    assert decode_cursor(headers["X-Before-Cursor"])[1] == HISTORY[2].id
+
+
+def test_before_and_after_together_are_rejected():
+    cursor = encode_cursor(START, uuid.uuid4())
+    with pytest.raises(HTTPException) as exc:
+        page(before=cursor, after=cursor)
+    assert exc.value.status_code == 400
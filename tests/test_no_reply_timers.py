@@ -0,0 +1,139 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.dialects import postgresql
+
+from db.models import Message
+from services.automation import no_reply_timers
+from services.automation.no_reply_timers import _track_replies, fire_due_timers
+from services.automation_builder import AutomationFlow
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(statement)
+
+
+def _session(*messages):
+    connection = RecordingConnection()
+    return SimpleNamespace(new=list(messages), connection=lambda: connection), connection
+
+
+def _message(conversation_id, direction, at):
+    return Message(id=uuid.uuid4(), conversation_id=conversation_id, direction=direction, body="oi", created_at=at)
+
+
+def _sql(statement):
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_inbound_message_arms_timers_without_moving_an_armed_one():
+    now = datetime.now(timezone.utc)
+    conversation_id = uuid.uuid4()
+    session, connection = _session(_message(conversation_id, "inbound", now))
+
+    _track_replies(session, None)
+
+    (statement,) = connection.statements
+    sql = _sql(statement)
+    assert sql.startswith("INSERT INTO no_reply_timers")
+    assert "automation_builder_automations.trigger_type = " in sql
+    assert "ON CONFLICT (automation_id, conversation_id) DO NOTHING" in sql
+    assert "CASE WHEN (jsonb_typeof(" in sql
+
+
+def test_outbound_message_cancels_and_a_later_inbound_rearms():
+    now = datetime.now(timezone.utc)
+    replied, reopened = uuid.uuid4(), uuid.uuid4()
+    session, connection = _session(
+        _message(replied, "inbound", now),
+        _message(replied, "outbound", now + timedelta(seconds=1)),
+        _message(reopened, "outbound", now),
+        _message(reopened, "inbound", now + timedelta(seconds=1)),
+    )
+
+    _track_replies(session, None)
+
+    cancel, arm = connection.statements
+    assert _sql(cancel).startswith("DELETE FROM no_reply_timers")
+    assert set(cancel.compile().params["conversation_id_1"]) == {replied, reopened}
+    armed = str(arm.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    assert str(reopened) in armed and str(replied) not in armed
+
+
+def test_flush_without_messages_issues_no_statements():
+    session, connection = _session(SimpleNamespace())
+
+    _track_replies(session, None)
+
+    assert connection.statements == []
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeDB:
+    def __init__(self, timers, messages):
+        self.results = [FakeResult(timers), FakeResult(messages)]
+        self.log = []
+
+    def execute(self, statement):
+        self.log.append("execute")
+        return self.results.pop(0)
+
+    def commit(self):
+        self.log.append("commit")
+
+
+def test_due_timers_are_claimed_then_fired_per_conversation(monkeypatch):
+    user_id, conversation_id, message_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    first, second = uuid.uuid4(), uuid.uuid4()
+    now = datetime.now(timezone.utc)
+    timers = [
+        SimpleNamespace(automation_id=automation_id, conversation_id=conversation_id, user_id=user_id, message_id=message_id, fire_at=now)
+        for automation_id in (first, second)
+    ]
+    messages = [SimpleNamespace(id=message_id, body="Preciso de ajuda", created_at=now, contact_id=uuid.uuid4())]
+    db = FakeDB(timers, messages)
+    calls = []
+    monkeypatch.setattr(
+        no_reply_timers, "run_enabled_automations", lambda **kwargs: calls.append((list(db.log), kwargs))
+    )
+
+    assert fire_due_timers(db, now=now, limit=10) == 2
+
+    (log, kwargs), = calls
+    assert log == ["execute", "commit", "execute"]
+    assert kwargs["event_type"] == "no_reply_after"
+    assert kwargs["automation_ids"] == {first, second}
+    assert kwargs["event_payload"]["body"] == "Preciso de ajuda"
+    assert kwargs["source_event_id"] == f"no_reply_after:{message_id}"
+
+
+def test_claim_reads_only_due_timers_and_skips_locked_ones():
+    sql = _sql(no_reply_timers.claim_statement(datetime.now(timezone.utc), 100))
+
+    assert "no_reply_timers.fire_at <= " in sql
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "RETURNING" in sql
+
+
+def test_no_reply_after_requires_a_positive_number_of_minutes():
+    actions = [{"type": "add_internal_comment", "text": "Sem resposta"}]
+    valid = AutomationFlow.model_validate({"trigger": {"type": "no_reply_after", "params": {"minutes": 30}}, "actions": actions})
+    assert valid.trigger.params.minutes == 30
+
+    for params in ({"minutes": "30m"}, {"minutes": "30"}, {"minutes": True}, {"minutes": 0}, {}, None):
+        with pytest.raises(ValidationError):
+            AutomationFlow.model_validate({"trigger": {"type": "no_reply_after", "params": params}, "actions": actions})
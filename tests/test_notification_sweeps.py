@@ -0,0 +1,69 @@
+from datetime import date
+
+from sqlalchemy.dialects import postgresql
+
+from db.models import Task
+from services.automation.scheduler import notify_statement, sweep_notifications
+
+
+def _sql(statement):
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_notify_statement_inserts_from_select_once_per_version():
+    sql = _sql(notify_statement(Task, Task.id, Task.due_date, [Task.status != "done"], "overdue_task", "task"))
+
+    assert sql.startswith("INSERT INTO notifications (id, user_id, type, entity_type, entity_id, dedupe_key")
+    assert "FROM tasks" in sql
+    assert "NOT (EXISTS (SELECT * \nFROM notifications \nWHERE notifications.dedupe_key = concat(" in sql
+    assert "CAST(%(param_1)s AS notification_type)" in sql
+    assert "ON CONFLICT (dedupe_key) WHERE dedupe_key IS NOT NULL DO NOTHING" in sql
+
+
+class FakeResult:
+    def __init__(self, first=None, rowcount=0):
+        self._first = first
+        self.rowcount = rowcount
+
+    def first(self):
+        return self._first
+
+
+class FakeDB:
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.statements = []
+        self.commits = 0
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        if statement.is_select:
+            return FakeResult(first=self.bounds.pop(0))
+        return FakeResult(rowcount=2)
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_sweep_walks_the_keyset_in_committed_chunks():
+    db = FakeDB([(date(2026, 1, 1), "a"), (date(2026, 2, 1), "b"), None])
+
+    created = sweep_notifications(
+        db,
+        Task,
+        keyset=(Task.due_date, Task.id),
+        version=Task.due_date,
+        conditions=[Task.status != "done"],
+        notification_type="overdue_task",
+        entity_type="task",
+        chunk_size=1000,
+    )
+
+    assert created == 6
+    assert db.commits == 3
+    bounds = [statement for statement in db.statements if statement.is_select]
+    inserts = [_sql(statement) for statement in db.statements if not statement.is_select]
+    assert "OFFSET" in _sql(bounds[0]) and bounds[0]._offset == 999
+    assert "(tasks.due_date, tasks.id) <= (" in inserts[0] and "(tasks.due_date, tasks.id) > (" not in inserts[0]
+    assert "(tasks.due_date, tasks.id) > (" in inserts[1] and "(tasks.due_date, tasks.id) <= (" in inserts[1]
+    assert "(tasks.due_date, tasks.id) > (" in inserts[2] and "(tasks.due_date, tasks.id) <= (" not in inserts[2]
@@ -0,0 +1,85 @@
+import uuid
+
+from sqlalchemy.dialects import postgresql
+
+from services.automation.rate_limit import MemoryBucketStore, PostgresBucketStore, TenantRateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_a_burst_then_reports_the_wait_for_the_next_token():
+    clock = FakeClock()
+    store = MemoryBucketStore(clock=clock)
+
+    assert [store.take("tenant:a", rate=1.0, capacity=2) for _ in range(2)] == [0.0, 0.0]
+    assert store.take("tenant:a", rate=1.0, capacity=2) == 1.0
+
+    clock.now += 1.0
+    assert store.take("tenant:a", rate=1.0, capacity=2) == 0.0
+
+
+def test_idle_buckets_are_evicted_once_full_again():
+    clock = FakeClock()
+    store = MemoryBucketStore(clock=clock)
+    store.take("tenant:idle", rate=1.0, capacity=5)
+
+    clock.now += 0.5
+    assert store.evict_idle() == 0
+    clock.now += 0.5
+    assert store.evict_idle() == 1
+    assert len(store) == 0
+
+
+def test_bucket_store_is_bounded():
+    store = MemoryBucketStore(maxsize=2, clock=FakeClock())
+    for key in ("a", "b", "c"):
+        store.take(key, rate=1.0, capacity=5)
+
+    assert len(store) == 2
+
+
+def test_destination_budget_is_checked_after_the_tenant_budget(monkeypatch):
+    monkeypatch.setenv("AUTOMATION_RATE_LIMIT_PER_MINUTE", "60")
+    monkeypatch.setenv("AUTOMATION_DESTINATION_RATE_LIMIT_PER_MINUTE", "1")
+    limiter = TenantRateLimiter(MemoryBucketStore(clock=FakeClock()))
+    tenant_id, destination_id = uuid.uuid4(), uuid.uuid4()
+
+    assert limiter.check(tenant_id, destination_id) == 0.0
+    assert limiter.check(tenant_id, destination_id) == 60.0
+    assert limiter.allow(tenant_id) is True
+
+
+def test_destination_denial_refunds_the_tenant_token(monkeypatch):
+    monkeypatch.setenv("AUTOMATION_RATE_LIMIT_PER_MINUTE", "2")
+    monkeypatch.setenv("AUTOMATION_DESTINATION_RATE_LIMIT_PER_MINUTE", "1")
+    limiter = TenantRateLimiter(MemoryBucketStore(clock=FakeClock()))
+    tenant_id, busy, idle = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+    assert limiter.check(tenant_id, busy) == 0.0
+    for _ in range(3):
+        assert limiter.check(tenant_id, busy) == 60.0
+    # Only the request that went out was charged to the tenant.
+    assert limiter.check(tenant_id, idle) == 0.0
+    assert limiter.check(tenant_id, idle) == 30.0
+
+
+def test_shared_bucket_is_a_single_upsert():
+    statement = PostgresBucketStore(bind=object()).take_statement("tenant:a", rate=1.0, capacity=60)
+
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (key) DO UPDATE" in sql
+    assert "RETURNING automation_rate_buckets.tokens, automation_rate_buckets.last_granted" in sql
+
+
+def test_shared_refund_is_capped_at_capacity():
+    statement = PostgresBucketStore(bind=object()).refund_statement("tenant:a", capacity=60)
+
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "SET tokens=least(%(least_1)s, automation_rate_buckets.tokens + %(tokens_1)s)" in sql
+    assert "WHERE automation_rate_buckets.key = %(key_1)s" in sql
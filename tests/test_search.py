@@ -0,0 +1,92 @@
+import uuid
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from api.routers.search import SEARCH_COUNT_LIMIT, build_search_count, build_search_query, global_search
+
+
+def compiled(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_text_search_uses_the_indexed_vectors_and_pages_in_sql():
+    sql = compiled(build_search_query(uuid.uuid4(), query="preço", urgency="high", score_gt=0.5, page=3, page_size=10))
+
+    assert "messages.search_vector @@ websearch_to_tsquery" in sql
+    assert "contacts.search_vector @@ websearch_to_tsquery" in sql
+    assert "ILIKE" not in sql
+    # Filters that used to run in Python are part of the statement.
+    assert "conversations.last_urgency = " in sql
+    assert "conversations.last_score > " in sql
+    # Message hits are scoped by the tenant column that leads their GIN index.
+    assert "messages.user_id = " in sql
+    assert "count(*) OVER ()" not in sql
+    assert "LIMIT" in sql and "OFFSET" in sql
+    # Highlighting runs only for the rows of the requested page.
+    assert "LEFT OUTER JOIN LATERAL (SELECT ts_headline(" in sql
+
+
+def test_browse_without_query_skips_text_matching():
+    sql = compiled(build_search_query(uuid.uuid4(), channel="whatsapp"))
+
+    assert "tsquery" not in sql
+    assert "FROM messages" not in sql
+    assert "channels.type = " in sql
+
+
+class SearchDB:
+    """Answers the page query with ``page_rows`` and the capped count with ``matching``."""
+
+    def __init__(self, matching, page_rows=()):
+        self.matching = matching
+        self.page_rows = list(page_rows)
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        if "capped" in compiled(statement):
+            return SimpleNamespace(scalar_one=lambda: self.matching)
+        return SimpleNamespace(all=lambda: self.page_rows)
+
+
+def search(db, page=1):
+    return global_search(
+        query="preço",
+        channel=None,
+        status=None,
+        urgency=None,
+        score_gt=None,
+        last_contact_days=None,
+        page=page,
+        page_size=20,
+        current_user=SimpleNamespace(id=uuid.uuid4()),
+        db=db,
+    )
+
+
+def test_count_stops_one_past_the_cap_without_ranking():
+    sql = compiled(build_search_count(uuid.uuid4(), query="preço", urgency="high"))
+
+    assert "EXISTS (SELECT messages.id" in sql
+    assert "messages.user_id = " in sql
+    assert "ts_rank_cd" not in sql and "GROUP BY" not in sql
+    params = build_search_count(uuid.uuid4(), query="preço").compile(dialect=postgresql.dialect()).params
+    assert SEARCH_COUNT_LIMIT + 1 in params.values()
+
+
+def test_total_is_reported_for_pages_past_the_end():
+    assert search(SearchDB(matching=25), page=5)["pagination"] == {
+        "page": 5,
+        "page_size": 20,
+        "total": 25,
+        "total_capped": False,
+    }
+    assert search(SearchDB(matching=0))["pagination"]["total"] == 0
+
+
+def test_total_is_capped_for_common_terms():
+    pagination = search(SearchDB(matching=SEARCH_COUNT_LIMIT + 1))["pagination"]
+
+    assert pagination["total"] == SEARCH_COUNT_LIMIT
+    assert pagination["total_capped"] is True
@@ -0,0 +1,16 @@
+import os
+
+from core.config import get_settings, reload_settings
+
+
+def test_settings_are_cached_until_reloaded():
+    settings = get_settings()
+    assert get_settings() is settings
+
+    os.environ["AUTOMATION_MAX_ATTEMPTS"] = "42"
+    try:
+        assert get_settings().automation_max_attempts == settings.automation_max_attempts
+        assert reload_settings().automation_max_attempts == 42
+        assert get_settings() is not settings
+    finally:
+        del os.environ["AUTOMATION_MAX_ATTEMPTS"]
@@ -0,0 +1,100 @@
+import uuid
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm.attributes import set_committed_value
+
+from api.pagination import encode_cursor, keyset_window
+from db.models import AIEvent, Message, Task, TimelineEntry
+from services.timeline import _materialize_timeline, timeline_items, timeline_query
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def compiled(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+class FakeConnection:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, statement, params=None):
+        self.executed.append((compiled(statement), params))
+
+
+class FakeSession:
+    def __init__(self, new=(), dirty=(), deleted=()):
+        self.new, self.dirty, self.deleted = list(new), list(dirty), list(deleted)
+        self.conn = FakeConnection()
+
+    def connection(self):
+        return self.conn
+
+
+def loaded(model, **values):
+    """An instance as if read from the database, so only later assignments count as changes."""
+    instance = model()
+    for field, value in values.items():
+        set_committed_value(instance, field, value)
+    return instance
+
+
+def test_new_sources_are_upserted_in_one_statement():
+    conversation_id = uuid.uuid4()
+    message = Message(id=uuid.uuid4(), conversation_id=conversation_id, direction="outbound", body="Oi", created_at=NOW)
+    event = AIEvent(id=uuid.uuid4(), conversation_id=conversation_id, event_type="rule.matched", payload={"rule_id": "r1"}, created_at=NOW)
+    unrelated = AIEvent(id=uuid.uuid4(), conversation_id=None, event_type="flow.created", payload={}, created_at=NOW)
+    session = FakeSession(new=[message, event, unrelated, TimelineEntry()])
+
+    _materialize_timeline(session, None)
+
+    ((upsert, rows),) = session.conn.executed
+    assert "ON CONFLICT ON CONSTRAINT uq_timeline_entry_source DO UPDATE" in upsert
+    assert [row["source_type"] for row in rows] == ["message", "ai_event"]
+    assert rows[0]["item"] == {"type": "ai_reply", "direction": "outbound", "body": "Oi", "ai_classification": None}
+    assert rows[1]["item"]["type"] == "rule"
+    assert rows[1]["created_at"] == NOW
+
+
+def test_only_changes_to_shown_fields_rewrite_an_entry():
+    task = loaded(
+        Task, id=uuid.uuid4(), conversation_id=uuid.uuid4(), title="Ligar", description="", status="todo",
+        priority="medium", due_date=date(2026, 1, 2), created_at=NOW,
+    )
+    task.description = "Cliente pediu retorno"
+    session = FakeSession(dirty=[task])
+    _materialize_timeline(session, None)
+    assert session.conn.executed == []
+
+    task.status = "done"
+    _materialize_timeline(session, None)
+    ((_, rows),) = session.conn.executed
+    assert rows[0]["item"]["status"] == "done"
+    assert rows[0]["item"]["due_date"] == "2026-01-02"
+
+
+def test_detached_and_deleted_sources_lose_their_entries():
+    task = loaded(Task, id=uuid.uuid4(), conversation_id=uuid.uuid4(), title="Ligar", created_at=NOW)
+    task.conversation_id = None
+    deleted = loaded(Message, id=uuid.uuid4(), conversation_id=uuid.uuid4())
+    session = FakeSession(dirty=[task], deleted=[deleted])
+
+    _materialize_timeline(session, None)
+
+    ((removal, _),) = session.conn.executed
+    assert "(timeline_entries.source_type, timeline_entries.source_id) IN" in removal
+
+
+def test_timeline_pages_with_a_keyset_on_the_entry_index():
+    statement = keyset_window(
+        timeline_query(uuid.uuid4()), TimelineEntry.created_at, TimelineEntry.id, encode_cursor(NOW, uuid.uuid4()), None, 50
+    )
+    sql = compiled(statement)
+
+    assert "(timeline_entries.created_at, timeline_entries.id) < (" in sql
+    assert "ORDER BY timeline_entries.created_at DESC, timeline_entries.id DESC" in sql
+    assert timeline_items([SimpleNamespace(item={"type": "task"}, created_at=NOW)]) == [
+        {"type": "task", "created_at": NOW.isoformat()}
+    ]
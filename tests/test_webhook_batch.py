@@ -0,0 +1,198 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from api.routers import webhooks as webhooks_module
+from api.routers.webhooks import ingest_webhook, ingest_webhook_batch
+from db.models import Message
+from services.webhooks.identity import Identity
+
+
+def fake_resolve_identities():
+    def resolve(db, user_id, channel_type, normalized_items, opened_at=None):
+        channel_id = uuid.uuid4()
+        identities = {}
+        for item in normalized_items:
+            identities.setdefault(
+                item["handle"],
+                Identity(
+                    channel_id=channel_id,
+                    contact_id=uuid.uuid4(),
+                    conversation_id=uuid.uuid4(),
+                    contact_created=True,
+                    conversation_created=True,
+                ),
+            )
+        return identities
+
+    return resolve
+
+
+def test_ingest_webhook_batch_reports_per_item_results_with_single_commit(monkeypatch, fake_db):
+    user = SimpleNamespace(id=uuid.uuid4())
+    db = fake_db()
+    dispatched = []
+    monkeypatch.setattr(webhooks_module, "resolve_identities", fake_resolve_identities())
+    monkeypatch.setattr(webhooks_module, "remember_identities", lambda *args: None)
+    monkeypatch.setattr(webhooks_module, "_dispatch_jobs", lambda db, jobs: dispatched.extend(jobs) or True)
+
+    response = SimpleNamespace(status_code=200)
+    result = ingest_webhook_batch(
+        "whatsapp",
+        [
+            {"id": "wamid-1", "from": "5511", "message": "hi"},
+            {"id": "wamid-2", "message": "no sender"},
+            {"id": "wamid-3", "from": "5511", "message": "call me today"},
+        ],
+        response=response,
+        current_user=user,
+        db=db,
+    )
+
+    assert response.status_code == 202
+    assert result["accepted"] == 2
+    assert result["failed"] == 1
+    assert [item["status"] for item in result["results"]] == ["ok", "error", "ok"]
+    assert result["results"][0]["conversation_id"] == result["results"][2]["conversation_id"]
+    assert db.commits == 1
+    assert sum(isinstance(item, Message) for item in db.added) == 2
+    # Both messages land in the same conversation, so its counters are bumped by one UPDATE.
+    assert len(db.executed) == 1
+    # contact.created / conversation.created are only published for the first message of the batch.
+    assert [(job.contact_created, job.conversation_created) for job in dispatched] == [(True, True), (False, False)]
+    # The stage marker keeps the same flags, so a recovered job still publishes the creation events.
+    assert [
+        (item.pipeline_contact_created, item.pipeline_conversation_created) for item in db.added if isinstance(item, Message)
+    ] == [(True, True), (False, False)]
+
+
+def test_ingest_webhook_batch_marks_redeliveries_as_duplicates(monkeypatch, fake_db):
+    user = SimpleNamespace(id=uuid.uuid4())
+    db = fake_db()
+    dispatched = []
+    monkeypatch.setattr(webhooks_module, "resolve_identities", fake_resolve_identities())
+    monkeypatch.setattr(webhooks_module, "remember_identities", lambda *args: None)
+    monkeypatch.setattr(webhooks_module, "_dispatch_jobs", lambda db, jobs: dispatched.extend(jobs) or True)
+    monkeypatch.setattr(
+        webhooks_module.inbound_dedupe,
+        "lookup_many",
+        lambda db, user_id, channel_type, keys: {"wamid-old": "message-old"},
+    )
+    monkeypatch.setattr(webhooks_module.inbound_dedupe, "remember", lambda *args: None)
+
+    result = ingest_webhook_batch(
+        "whatsapp",
+        [
+            {"id": "wamid-old", "from": "5511", "message": "hi"},
+            {"id": "wamid-new", "from": "5511", "message": "hello"},
+            {"id": "wamid-new", "from": "5511", "message": "hello"},
+        ],
+        response=SimpleNamespace(status_code=200),
+        current_user=user,
+        db=db,
+    )
+
+    assert [item["status"] for item in result["results"]] == ["duplicate", "ok", "duplicate"]
+    assert result["results"][0]["message_id"] == "message-old"
+    assert result["results"][2]["message_id"] == result["results"][1]["message_id"]
+    assert result["accepted"] == 1
+    assert result["duplicates"] == 2
+    assert result["failed"] == 0
+    assert len(dispatched) == 1
+
+
+def test_ingest_webhook_batch_reports_items_committed_concurrently_as_duplicates(monkeypatch, fake_db):
+    user = SimpleNamespace(id=uuid.uuid4())
+    dispatched = []
+    committed_elsewhere = {}
+
+    class RacingDB(fake_db):
+        def commit(self):
+            self.commits += 1
+            if self.commits == 1:
+                # Another request committed wamid-race between our lookup and our commit.
+                committed_elsewhere["wamid-race"] = "message-race"
+                raise IntegrityError("INSERT", {}, Exception("duplicate key"))
+
+    db = RacingDB()
+    monkeypatch.setattr(webhooks_module, "resolve_identities", fake_resolve_identities())
+    monkeypatch.setattr(webhooks_module, "remember_identities", lambda *args: None)
+    monkeypatch.setattr(webhooks_module, "_dispatch_jobs", lambda db, jobs: dispatched.extend(jobs) or True)
+    monkeypatch.setattr(
+        webhooks_module.inbound_dedupe, "lookup_many", lambda db, user_id, channel_type, keys: dict(committed_elsewhere)
+    )
+    monkeypatch.setattr(webhooks_module.inbound_dedupe, "remember", lambda *args: None)
+
+    result = ingest_webhook_batch(
+        "whatsapp",
+        [
+            {"id": "wamid-race", "from": "5511", "message": "hi"},
+            {"id": "wamid-fresh", "from": "5522", "message": "hello"},
+        ],
+        response=SimpleNamespace(status_code=200),
+        current_user=user,
+        db=db,
+    )
+
+    assert db.rollbacks == 1 and db.commits == 2
+    assert [item["status"] for item in result["results"]] == ["duplicate", "ok"]
+    assert result["results"][0]["message_id"] == "message-race"
+    assert result["accepted"] == 1 and result["duplicates"] == 1
+    assert [job.message_id for job in dispatched] == [item.id for item in db.added if isinstance(item, Message)]
+
+
+def test_ingest_webhook_re_resolves_identities_cached_for_a_deleted_conversation(monkeypatch, fake_db):
+    user = SimpleNamespace(id=uuid.uuid4())
+    forgotten = []
+
+    class ForeignKeyViolation(Exception):
+        pgcode = "23503"
+
+    class StaleDB(fake_db):
+        def commit(self):
+            self.commits += 1
+            if self.commits == 1:
+                # Another replica deleted the conversation this replica still had cached.
+                raise IntegrityError("INSERT", {}, ForeignKeyViolation("messages_conversation_id_fkey"))
+
+    db = StaleDB()
+    monkeypatch.setattr(webhooks_module, "resolve_identities", fake_resolve_identities())
+    monkeypatch.setattr(webhooks_module, "remember_identities", lambda *args: None)
+    monkeypatch.setattr(webhooks_module, "forget_identities", forgotten.append)
+    monkeypatch.setattr(webhooks_module, "_dispatch_jobs", lambda db, jobs: True)
+    monkeypatch.setattr(webhooks_module.inbound_dedupe, "lookup", lambda *args: None)
+    monkeypatch.setattr(webhooks_module.inbound_dedupe, "remember", lambda *args: None)
+
+    result = ingest_webhook(
+        "whatsapp",
+        {"id": "wamid-1", "from": "5511", "message": "hi"},
+        response=SimpleNamespace(status_code=200),
+        current_user=user,
+        db=db,
+    )
+
+    assert forgotten == [user.id]
+    assert db.rollbacks == 1 and db.commits == 2
+    assert result["status"] == "accepted"
+    assert result["message_id"] == str(next(item.id for item in db.added if isinstance(item, Message)))
+
+
+def test_ingest_webhook_reraises_integrity_errors_that_are_not_stale_identities(monkeypatch, fake_db):
+    class FailingDB(fake_db):
+        def commit(self):
+            raise IntegrityError("INSERT", {}, Exception("check constraint"))
+
+    monkeypatch.setattr(webhooks_module, "resolve_identities", fake_resolve_identities())
+    monkeypatch.setattr(webhooks_module, "forget_identities", lambda user_id: pytest.fail("cache evicted"))
+    monkeypatch.setattr(webhooks_module.inbound_dedupe, "lookup", lambda *args: None)
+
+    with pytest.raises(IntegrityError):
+        ingest_webhook(
+            "whatsapp",
+            {"id": "wamid-1", "from": "5511", "message": "hi"},
+            response=SimpleNamespace(status_code=200),
+            current_user=SimpleNamespace(id=uuid.uuid4()),
+            db=FailingDB(),
+        )